@@ -0,0 +1,192 @@
+"""
+Running delayed circuits inside an asyncio event loop.
+
+  scheduler = Install()
+  gate.SetDelay(2)
+  writer.SetStateWrite(PLUS)
+  state = await Changed(output_wire)
+  await scheduler.Settle()
+
+LoopScheduler keeps the Scheduler's event queue and simulated time, and wakes
+on the loop with call_at instead of being run by hand. Any number of circuits
+can share one loop and one scheduler without a thread per tick.
+"""
+import asyncio
+
+import gates
+from gates import *
+
+
+class LoopScheduler(Scheduler):
+  """
+  A Scheduler driven by an asyncio loop, by default the running one. Each
+  simulated time unit lasts `timescale` seconds of loop time; with a timescale
+  of 0 events run as soon as the loop gets to them, still in simulated time
+  order. Other tasks run between one simulated time and the next.
+  """
+  def __init__(self, loop=None, timescale=0):
+    super().__init__()
+    self._loop = loop or asyncio.get_running_loop()
+    self._timescale = timescale
+    self._origin = self._loop.time()
+    self._handle = None
+    self._armed = None
+    self._settled = []
+    self._waking = False
+
+  def _Sync(self):
+    # Stimulus from outside the queue happens at the loop's current time.
+    if self._timescale and not self._waking:
+      self._now = max(self._now, (self._loop.time() - self._origin) / self._timescale)
+
+  def _Arm(self):
+    head = self._NextTime()
+    if head is None:
+      return
+    if self._handle:
+      if self._armed <= head:
+        return
+      self._handle.cancel()
+    self._armed = head
+    self._handle = self._loop.call_at(self._origin + head * self._timescale, self._Wake)
+
+  def _Wake(self):
+    self._handle = None
+    due = self._armed
+    self._waking = True
+    try:
+      while True:
+        time = self._NextTime()
+        if time is None or time > due:
+          break
+        self.Step()
+    finally:
+      self._waking = False
+    self._Arm()
+    if not self._pending:
+      self._Release()
+
+  def _Release(self):
+    (settled, self._settled) = (self._settled, [])
+    for future in settled:
+      if not future.done():
+        future.set_result(self._now)
+
+  def ScheduleCall(self, delay, fn):
+    self._Sync()
+    super().ScheduleCall(delay, fn)
+    self._Arm()
+
+  def ScheduleWrite(self, point, state, delay, inertial=False):
+    self._Sync()
+    super().ScheduleWrite(point, state, delay, inertial)
+    self._Arm()
+
+  def Skip(self, delay):
+    super().Skip(delay)
+    if self._handle:
+      self._handle.cancel()
+      self._handle = None
+    self._Arm()
+
+  async def Settle(self):
+    """
+    Waits until no delayed writes are in flight. Clocks keep ticking, so this
+    also returns while they run. Returns the simulated time.
+    """
+    if self._pending:
+      future = self._loop.create_future()
+      self._settled.append(future)
+      await future
+    return self._now
+
+  async def Sleep(self, delay):
+    """Waits `delay` units of simulated time, in order with the gate writes."""
+    future = self._loop.create_future()
+    self.ScheduleCall(delay, lambda: future.done() or future.set_result(self._now))
+    return await future
+
+  def Close(self):
+    """Stops waking the loop. Pending events are dropped."""
+    if self._handle:
+      self._handle.cancel()
+      self._handle = None
+    self._queue = []
+    self._pending = {}
+    self._Release()
+
+
+def Install(loop=None, timescale=0):
+  """
+  Makes a new LoopScheduler the scheduler for gate delays, and turns delays on.
+  Returns the scheduler.
+  """
+  gates.SCHEDULER = LoopScheduler(loop, timescale)
+  gates.DELAY_ENABLED = True
+  return gates.SCHEDULER
+
+
+class _Watcher:
+  """Reads a wire for Changed, resolving the futures waiting on it."""
+  __slots__ = ('_input', '_waiting', '_last')
+  def __init__(self, wire):
+    driver = wire.Driver()
+    self._last = driver and driver.GetState() or NEUTRAL
+    self._input = ConnectionPoint(ConnectionPoint.READER, self, self._last)
+    self._waiting = []
+    wire.Connect(self._input)
+
+  def Update(self):
+    state = self._input.GetState()
+    if state == self._last:
+      return
+    self._last = state
+    (waiting, self._waiting) = (self._waiting, [])
+    for future in waiting:
+      if not future.done():
+        future.set_result(state)
+    if waiting:
+      # The wire is still walking its readers, so leave it afterwards.
+      waiting[0].get_loop().call_soon(self._Leave)
+
+  def _Leave(self):
+    if self._waiting or not self._input.HasWire():
+      return
+    wire = self._input._wire
+    wire.Disconnect(self._input)
+    del WATCHERS[wire]
+
+  def ConnectionPoints(self):
+    return (self._input,)
+
+WATCHERS = {}
+
+def Changed(wire):
+  """
+  A future for the next change of the state carried by `wire`, resolving to
+  the new state. It watches from the call, before it is awaited.
+  """
+  watcher = WATCHERS.get(wire)
+  if watcher is None:
+    watcher = WATCHERS[wire] = _Watcher(wire)
+  future = asyncio.get_running_loop().create_future()
+  watcher._waiting.append(future)
+  return future
+
+
+async def Clock(oscillator, cycles=None, scheduler=None):
+  """
+  Ticks an Oscillator made with timer=None from a coroutine, once per
+  period of simulated time on `scheduler` (by default the installed one), for
+  `cycles` full cycles or until cancelled. Returns the tick count.
+  """
+  scheduler = scheduler or gates.SCHEDULER
+  ticks = None
+  if cycles is not None:
+    ticks = cycles * len(Oscillator.PATTERN)
+  while ticks is None or ticks > 0:
+    await scheduler.Sleep(oscillator._period)
+    oscillator.Tick()
+    if ticks is not None:
+      ticks -= 1
+  return oscillator.Ticks()
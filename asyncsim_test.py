@@ -0,0 +1,137 @@
+from asyncsim import *
+import asyncio
+import gates
+import unittest
+
+
+class TestAsyncSim(unittest.IsolatedAsyncioTestCase):
+  async def asyncSetUp(self):
+    self.delay_enabled = gates.DELAY_ENABLED
+    self.previous = gates.SCHEDULER
+    self.scheduler = Install()
+
+  async def asyncTearDown(self):
+    self.scheduler.Close()
+    gates.DELAY_ENABLED = self.delay_enabled
+    gates.SCHEDULER = self.previous
+
+  def setupChain(self, delays):
+    writer = ConnectionPoint(ConnectionPoint.WRITER)
+    wires = [Wire()]
+    wires[0].Connect(writer)
+    for delay in delays:
+      gate = GateNegate()
+      gate.SetDelay(delay)
+      gate.SetInputWire(wires[-1])
+      wires.append(Wire())
+      gate.SetOutputWire(wires[-1])
+    return writer, wires
+
+  async def testChanged(self):
+    (writer, wires) = self.setupChain([2, 3])
+    changed = Changed(wires[-1])
+    writer.SetStateWrite(PLUS)
+    self.assertEqual(PLUS, await changed)
+    self.assertEqual(5, self.scheduler.Now())
+    await asyncio.sleep(0)
+    self.assertEqual({}, WATCHERS)
+    self.assertEqual([], wires[-1].Readers())
+
+  async def testSettle(self):
+    (writer, wires) = self.setupChain([1, 1, 1])
+    self.assertEqual(0, await self.scheduler.Settle())
+    writer.SetStateWrite(PLUS)
+    self.assertEqual(3, await self.scheduler.Settle())
+    self.assertEqual(MINUS, wires[-1].Driver().GetState())
+
+  async def testInertial_Settles(self):
+    (writer, wires) = self.setupChain([5])
+    wires[1]._driver._controller.SetDelay(5, inertial=True)
+    writer.SetStateWrite(PLUS)
+    writer.SetStateWrite(NEUTRAL)
+    self.assertEqual(0, await self.scheduler.Settle())
+    self.assertEqual(NEUTRAL, wires[1].Driver().GetState())
+
+  async def testCancelledWrite_DoesNotWakeEarly(self):
+    self.scheduler = Install(timescale=0.005)
+    (cancelled, later) = (ConnectionPoint(ConnectionPoint.WRITER), ConnectionPoint(ConnectionPoint.WRITER))
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    self.scheduler.ScheduleWrite(cancelled, PLUS, 1, inertial=True)
+    self.scheduler.ScheduleWrite(cancelled, MINUS, 20, inertial=True)
+    self.scheduler.ScheduleWrite(later, PLUS, 10)
+    await self.scheduler.Sleep(0)
+    while later.GetState() == NEUTRAL:
+      await asyncio.sleep(0.001)
+    self.assertGreaterEqual(loop.time() - start, 0.045)
+    self.assertEqual(NEUTRAL, cancelled.GetState())
+    self.assertAlmostEqual(20, await self.scheduler.Settle(), delta=1)
+    self.assertEqual(MINUS, cancelled.GetState())
+
+  async def testManyCircuits(self):
+    chains = [self.setupChain([1 + i % 7, 2]) for i in range(1000)]
+    changed = [Changed(wires[-1]) for (writer, wires) in chains]
+    for (writer, wires) in chains:
+      writer.SetStateWrite(MINUS)
+    self.assertEqual([MINUS] * 1000, await asyncio.gather(*changed))
+    self.assertEqual(9, await self.scheduler.Settle())
+
+  async def testSleep_OtherTasksRun(self):
+    (writer, wires) = self.setupChain([4])
+    seen = []
+    async def Watch():
+      seen.append(await Changed(wires[-1]))
+    task = asyncio.ensure_future(Watch())
+    await asyncio.sleep(0)
+    writer.SetStateWrite(PLUS)
+    self.assertEqual(2, await self.scheduler.Sleep(2))
+    self.assertEqual([], seen)
+    await self.scheduler.Sleep(2)
+    await task
+    self.assertEqual([MINUS], seen)
+
+  async def testTimescale(self):
+    self.scheduler = Install(timescale=0.002)
+    (writer, wires) = self.setupChain([5])
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    writer.SetStateWrite(PLUS)
+    self.assertEqual(MINUS, await Changed(wires[-1]))
+    self.assertGreaterEqual(loop.time() - start, 0.009)
+
+  async def testOscillator_OnLoop(self):
+    oscillator = Oscillator(1, timer=None, scheduler=self.scheduler)
+    wire = Wire()
+    oscillator.SetOutputWire(wire)
+    states = []
+    for i in range(4):
+      states.append(await Changed(wire))
+    self.assertEqual([PLUS, NEUTRAL, MINUS, NEUTRAL], states)
+    self.assertEqual(5, oscillator.Ticks())
+
+  async def testClock(self):
+    oscillator = Oscillator(1, timer=None)
+    wire = Wire()
+    oscillator.SetOutputWire(wire)
+    mem = GateMem()
+    (data, output) = (Wire(), Wire())
+    writer = ConnectionPoint(ConnectionPoint.WRITER)
+    data.Connect(writer)
+    mem.SetInputWire1(data)
+    mem.SetInputWire2(wire)
+    mem.SetOutputWire(output)
+    writer.SetStateWrite(PLUS)
+    self.assertEqual(9, await Clock(oscillator, cycles=2))
+    self.assertEqual(2, await self.scheduler.Settle())
+    self.assertEqual(MINUS, output.Driver().GetState())
+
+    task = asyncio.ensure_future(Clock(oscillator))
+    await self.scheduler.Sleep(10.1)
+    task.cancel()
+    with self.assertRaises(asyncio.CancelledError):
+      await task
+    self.assertEqual(49, oscillator.Ticks())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,71 @@
+import numpy
+
+from circuit import *
+
+
+class BatchEvaluator:
+  """
+  Evaluates a compiled Circuit over many input vectors at once. Each cell runs
+  as one table lookup over the whole batch, using the same tables the Circuit
+  built from the gates' LOGIC_MAPs.
+
+  Every vector is evaluated independently from the circuit's current state, so
+  GateMem cells that are not written hold their current value in every row. The
+  circuit itself is left untouched.
+  """
+  def __init__(self, circuit, chunk_size=1 << 16):
+    self._circuit = circuit
+    self._chunk_size = chunk_size
+    self._tables = [numpy.array(table, dtype=numpy.int8) for table in circuit.tables]
+    self._program = [(self._tables[code], ins, out) for (code, ins, out) in
+        zip(circuit.cell_codes, circuit.cell_inputs, circuit.cell_outputs)]
+    self._initial = numpy.array(circuit.state, dtype=numpy.int8).reshape(-1, 1)
+
+  def Evaluate(self, vectors):
+    """
+    Args:
+      vectors: An (N, inputs) array of trits.
+    Returns:
+      An (N, outputs) int8 array of trits.
+    """
+    vectors = numpy.asarray(vectors)
+    circuit = self._circuit
+    if vectors.ndim != 2 or vectors.shape[1] != len(circuit.input_ids):
+      raise ConnectionError('Expected an (N, %d) array, got %s' % (len(circuit.input_ids), vectors.shape))
+    # Checked before narrowing to int8, which would wrap values like 255.
+    bad = ~numpy.isin(vectors, TRITS)
+    if bad.any():
+      raise BadStateException(vectors[bad][0])
+    vectors = vectors.astype(numpy.int8, copy=False)
+
+    result = numpy.empty((len(vectors), len(circuit.output_ids)), dtype=numpy.int8)
+    for start in range(0, len(vectors), self._chunk_size):
+      chunk = vectors[start:start + self._chunk_size]
+      result[start:start + len(chunk)] = self._EvaluateChunk(chunk)
+    return result
+
+  def _EvaluateChunk(self, vectors):
+    circuit = self._circuit
+    # Wire major, so every wire's values for the batch are contiguous.
+    state = numpy.repeat(self._initial, len(vectors), axis=1)
+    state[circuit.input_ids] = vectors.T
+    for (table, ins, out) in self._program:
+      # Widened first, as tables of 5 or more inputs have indexes past int8.
+      idx = state[ins[0]].astype(numpy.intp)
+      idx += 1
+      for i in ins[1:]:
+        idx *= 3
+        idx += state[i]
+        idx += 1
+      state[out] = table[idx]
+    return state[circuit.output_ids].T
+
+
+def BatchEvaluate(circuit, vectors):
+  return BatchEvaluator(circuit).Evaluate(vectors)
+
+
+def AllVectors(count):
+  """Every combination of `count` trits as a (3 ** count, count) int8 array."""
+  grid = numpy.indices((3,) * count, dtype=numpy.int8).reshape(count, -1).T
+  return grid - numpy.int8(1)
@@ -0,0 +1,76 @@
+from circuit import *
+import itertools
+import random
+import unittest
+
+try:
+  from batch import *
+except ImportError:
+  numpy = None
+
+
+@unittest.skipIf(numpy is None, 'numpy is not installed')
+class TestBatchEvaluator(unittest.TestCase):
+  def assertMatchesCircuit(self, circuit, vectors):
+    results = BatchEvaluate(circuit, vectors)
+    self.assertEqual((len(vectors), len(circuit.output_ids)), results.shape)
+    for (vector, result) in zip(vectors, results):
+      self.assertEqual(circuit.Step(tuple(int(v) for v in vector)),
+          tuple(int(r) for r in result), 'Inputs %s' % vector)
+
+  def testAllVectors(self):
+    vectors = AllVectors(2)
+    self.assertEqual(9, len(vectors))
+    self.assertEqual(set(itertools.product(TRITS, repeat=2)),
+        set(tuple(int(v) for v in vector) for vector in vectors))
+
+  def testGateSum(self):
+    self.assertMatchesCircuit(CompileGate(GateSum()), AllVectors(2))
+
+  def testGateSumAlternate(self):
+    self.assertMatchesCircuit(CompileGate(GateSumAlternate()), AllVectors(2))
+
+  def testGateMem_RowsAreIndependent(self):
+    circuit = CompileGate(GateMem())
+    circuit.Step((PLUS, PLUS))
+    results = BatchEvaluate(circuit, [[MINUS, NEUTRAL], [MINUS, PLUS], [MINUS, NEUTRAL]])
+    self.assertEqual([[PLUS], [MINUS], [PLUS]], results.tolist())
+    self.assertEqual((PLUS,), circuit.ReadOutputs())
+
+  def testTryte_Chunked(self):
+    tryte = Tryte()
+    inwires = [Wire() for i in range(9)]
+    outwires = [Wire() for i in range(9)]
+    readwire = Wire()
+    tryte.SetInputWires(inwires)
+    tryte.SetOutputWires(outwires)
+    tryte.SetReadWire(readwire)
+    circuit = Compile(inwires + [readwire], outwires)
+
+    rng = random.Random(3)
+    vectors = numpy.array([[rng.choice(TRITS) for i in range(10)] for j in range(100)],
+        dtype=numpy.int8)
+    expected = BatchEvaluate(circuit, vectors)
+    self.assertEqual(expected.tolist(), BatchEvaluator(circuit, chunk_size=7).Evaluate(vectors).tolist())
+    for (vector, result) in zip(vectors, expected):
+      circuit.state = [NEUTRAL] * circuit.wire_count
+      self.assertEqual(circuit.Step(tuple(int(v) for v in vector)), tuple(int(r) for r in result))
+
+  def testBadShape_Raises(self):
+    circuit = CompileGate(GateAnd())
+    with self.assertRaises(ConnectionError):
+      BatchEvaluate(circuit, numpy.zeros((4, 3), dtype=numpy.int8))
+    for vector in ([2, 0], [255, 0], [0, -257], [0.5, 0]):
+      with self.assertRaises(BadStateException):
+        BatchEvaluate(circuit, [vector])
+
+  def testWideTable(self):
+    rng = random.Random(2)
+    circuit = CompileGate(GateTable(tuple(rng.choice(TRITS) for i in range(3 ** 6))))
+    vectors = AllVectors(6)
+    expected = [circuit.Step(tuple(int(v) for v in vector)) for vector in vectors]
+    self.assertEqual(expected, [tuple(int(r) for r in row) for row in BatchEvaluate(circuit, vectors)])
+
+
+if __name__ == '__main__':
+  unittest.main()
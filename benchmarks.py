@@ -0,0 +1,312 @@
+"""
+Performance baselines for the object model.
+
+  python benchmarks.py --scale 2 --output results.json
+  python benchmarks.py --baseline results.json
+
+Every benchmark returns metrics named by their unit: `_per_sec` is better
+higher, while `_us` and `_bytes` are better lower. Compare flags metrics that
+are worse than a baseline by more than a tolerance. Metrics without a unit,
+like sizes or the ratio of two rates, are only reported.
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import gates
+from gates import *
+
+MONADIC = [GateIdentity, GateIncrement, GateDecrement, GateNegate, GateIsHigh,
+    GateIsNeutral, GateIsLow]
+DIADIC = [GateAnd, GateNand, GateOr, GateNor, GateXor, GateXnor, GateConsensus,
+    GateSum, GateSumAlternate, GateMem]
+REPEAT = 3
+# Recursive propagation stays well inside the default recursion limit.
+RECURSIVE_STAGES = 100
+FANOUT_DEPTH = 5
+
+
+def _Best(fn):
+  """The best time of REPEAT runs of fn, in seconds."""
+  best = None
+  for i in range(REPEAT):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    best = best is None and elapsed or min(best, elapsed)
+  return best
+
+def _Writers(count):
+  """`count` writers, each on its own wire. Returns the writers and wires."""
+  writers = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(count)]
+  wires = [Wire() for i in range(count)]
+  for (writer, wire) in zip(writers, wires):
+    wire.Connect(writer)
+  return writers, wires
+
+def _Wired(cls):
+  """A gate with writers on its inputs and wires on its outputs."""
+  gate = cls()
+  if issubclass(cls, GateMonadic):
+    (writers, wires) = _Writers(1)
+    gate.SetInputWire(wires[0])
+  else:
+    (writers, wires) = _Writers(2)
+    gate.SetInputWire1(wires[0])
+    gate.SetInputWire2(wires[1])
+  gate.SetOutputWire(Wire())
+  if isinstance(gate, GateSum):
+    gate.SetOverflowWire(Wire())
+  return gate, writers
+
+def _Drive(writers, vectors, count):
+  """Writes `count` input vectors, cycling through `vectors`."""
+  def Run():
+    done = 0
+    while done < count:
+      for vector in vectors:
+        for (writer, value) in zip(writers, vector):
+          writer.SetStateWrite(value)
+      done += len(vectors)
+  return Run
+
+
+def BenchGates(scale):
+  """Input vectors evaluated per second by each gate class on its own."""
+  results = {}
+  count = 3000 * scale
+  for cls in MONADIC + DIADIC:
+    (gate, writers) = _Wired(cls)
+    vectors = list(itertools.product(TRITS, repeat=len(writers)))
+    results['%s_per_sec' % cls.__name__] = count / _Best(_Drive(writers, vectors, count))
+  return results
+
+def BenchSum(scale):
+  """GateSum against the GateSumAlternate built from 13 gates."""
+  count = 3000 * scale
+  vectors = list(itertools.product(TRITS, repeat=2))
+  rates = []
+  for cls in (GateSum, GateSumAlternate):
+    (gate, writers) = _Wired(cls)
+    rates.append(count / _Best(_Drive(writers, vectors, count)))
+  return {
+    'GateSum_per_sec': rates[0],
+    'GateSumAlternate_per_sec': rates[1],
+    # Rises when GateSum gets faster, so it is not compared.
+    'alternate_slowdown': rates[0] / rates[1],
+  }
+
+def _Chain(length):
+  """A writer driving a chain of `length` GateNegates."""
+  (writers, wires) = _Writers(1)
+  for i in range(length):
+    gate = GateNegate()
+    gate.SetInputWire(wires[-1])
+    wires.append(Wire())
+    gate.SetOutputWire(wires[-1])
+  return writers
+
+def BenchChain(scale):
+  """
+  A write propagating down a chain of GateNegates. Recursive propagation
+  nests a few frames per stage, so it runs on a chain of at most
+  RECURSIVE_STAGES; the worklist runs the chain at full length.
+  """
+  length = 100 * scale
+  count = 200
+  recursive = min(length, RECURSIVE_STAGES)
+  elapsed = _Best(_Drive(_Chain(recursive), [(PLUS,), (MINUS,)], count))
+  results = {
+    'stages': recursive,
+    'write_us': elapsed / count * 1e6,
+    'gate_updates_per_sec': count * recursive / elapsed,
+    'worklist_stages': length,
+  }
+  writers = _Chain(length)
+  worklist_enabled = gates.WORKLIST_ENABLED
+  gates.WORKLIST_ENABLED = True
+  try:
+    elapsed = _Best(_Drive(writers, [(PLUS,), (MINUS,)], count))
+  finally:
+    gates.WORKLIST_ENABLED = worklist_enabled
+  results['worklist_write_us'] = elapsed / count * 1e6
+  results['worklist_gate_updates_per_sec'] = count * length / elapsed
+  return results
+
+def BenchFanout(scale):
+  """
+  A write propagating through `scale` trees of GateIdentities, each driving
+  three, FANOUT_DEPTH levels deep.
+  """
+  (writers, wires) = _Writers(1)
+  gates_count = 0
+  for tree in range(scale):
+    level = wires
+    for d in range(FANOUT_DEPTH):
+      next_level = []
+      for wire in level:
+        for i in range(3):
+          gate = GateIdentity()
+          gate.SetInputWire(wire)
+          next_level.append(Wire())
+          gate.SetOutputWire(next_level[-1])
+          gates_count += 1
+      level = next_level
+  count = 20
+  elapsed = _Best(_Drive(writers, [(PLUS,), (MINUS,)], count))
+  return {
+    'gates': gates_count,
+    'write_us': elapsed / count * 1e6,
+    'gate_updates_per_sec': count * gates_count / elapsed,
+  }
+
+def BenchTryte(scale):
+  """Storing a word in a Tryte and reading it back."""
+  tryte = Tryte()
+  (writers, inputs) = _Writers(9)
+  (read, read_wires) = _Writers(1)
+  readers = [ConnectionPoint(ConnectionPoint.READER) for i in range(9)]
+  outputs = [Wire() for i in range(9)]
+  for (reader, wire) in zip(readers, outputs):
+    wire.Connect(reader)
+  tryte.SetInputWires(inputs)
+  tryte.SetOutputWires(outputs)
+  tryte.SetReadWire(read_wires[0])
+  words = [[(i + j) % 3 - 1 for j in range(9)] for i in range(3)]
+  count = 300 * scale
+
+  def Run():
+    for i in range(count):
+      for (writer, value) in zip(writers, words[i % 3]):
+        writer.SetStateWrite(value)
+      read[0].SetStateWrite(PLUS)
+      read[0].SetStateWrite(NEUTRAL)
+      [reader.GetState() for reader in readers]
+  return {'words_per_sec': count / _Best(Run)}
+
+
+class _MockTimer:
+  """Stands in for threading.Timer, as in the tests: start() only records."""
+  pending = None
+  def __init__(self, period, fn):
+    self.fn = fn
+  def start(self):
+    _MockTimer.pending = self.fn
+
+def BenchOscillator(scale):
+  """Ticks per second of an Oscillator clocking a GateMem, using a mock timer."""
+  oscillator = Oscillator(1, _MockTimer)
+  wire = Wire()
+  oscillator.SetOutputWire(wire)
+  mem = GateMem()
+  (writers, wires) = _Writers(1)
+  writers[0].SetStateWrite(PLUS)
+  mem.SetInputWire1(wires[0])
+  mem.SetInputWire2(wire)
+  mem.SetOutputWire(Wire())
+  count = 5000 * scale
+
+  def Run():
+    for i in range(count):
+      _MockTimer.pending()
+  return {'ticks_per_sec': count / _Best(Run)}
+
+def BenchConstruction(scale):
+  """Time and memory to construct each gate class."""
+  results = {}
+  count = 200 * scale
+  for cls in MONADIC + DIADIC + [Tryte]:
+    elapsed = _Best(lambda: [cls() for i in range(count)])
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = [cls() for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    results['%s_construct_us' % cls.__name__] = elapsed / count * 1e6
+    results['%s_bytes' % cls.__name__] = (after - before) / count
+  return results
+
+
+BENCHMARKS = {
+  'gates': BenchGates,
+  'sum': BenchSum,
+  'chain': BenchChain,
+  'fanout': BenchFanout,
+  'tryte': BenchTryte,
+  'oscillator': BenchOscillator,
+  'construction': BenchConstruction,
+}
+
+
+def Run(scale=1, names=None):
+  """Runs the named benchmarks, or all of them. Returns JSON-ready results."""
+  results = {}
+  for name in names or BENCHMARKS:
+    if name not in BENCHMARKS:
+      raise ValueError('Unknown benchmark: %s' % name)
+    results[name] = BENCHMARKS[name](scale)
+  return {
+    'scale': scale,
+    'python': platform.python_version(),
+    'results': results,
+  }
+
+def HigherIsBetter(metric):
+  return metric.endswith('_per_sec')
+
+def Compare(current, baseline, tolerance=0.1):
+  """
+  Lists the metrics in both `current` and `baseline` that are worse by more
+  than `tolerance`, as (benchmark, metric, baseline value, current value).
+  Metrics without a unit are not compared.
+  """
+  regressions = []
+  for (name, metrics) in sorted(current['results'].items()):
+    old_metrics = baseline['results'].get(name, {})
+    for (metric, value) in sorted(metrics.items()):
+      old = old_metrics.get(metric)
+      if not old:
+        continue
+      if HigherIsBetter(metric):
+        worse = value < old * (1 - tolerance)
+      elif metric.endswith(('_us', '_bytes')):
+        worse = value > old * (1 + tolerance)
+      else:
+        continue
+      if worse:
+        regressions.append((name, metric, old, value))
+  return regressions
+
+
+def Main(argv):
+  parser = argparse.ArgumentParser(description='Ternary gate benchmarks')
+  parser.add_argument('--scale', type=int, default=1, help='Size multiplier')
+  parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS), help='Benchmarks to run')
+  parser.add_argument('--output', help='Write results as JSON to this file')
+  parser.add_argument('--baseline', help='Compare against results saved with --output')
+  parser.add_argument('--tolerance', type=float, default=0.1,
+      help='Allowed fraction worse than the baseline')
+  args = parser.parse_args(argv)
+
+  results = Run(args.scale, args.only)
+  if args.output:
+    with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+  else:
+    json.dump(results, sys.stdout, indent=2, sort_keys=True)
+    print()
+  if args.baseline:
+    with open(args.baseline) as f:
+      regressions = Compare(results, json.load(f), args.tolerance)
+    for (name, metric, old, new) in regressions:
+      print('REGRESSION %s.%s: %.4g -> %.4g' % (name, metric, old, new), file=sys.stderr)
+    return regressions and 1 or 0
+  return 0
+
+
+if __name__ == '__main__':
+  sys.exit(Main(sys.argv[1:]))
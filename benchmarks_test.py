@@ -0,0 +1,62 @@
+from benchmarks import *
+import gates
+import json
+import os
+import tempfile
+import unittest
+
+
+class TestBenchmarks(unittest.TestCase):
+  def testRun(self):
+    results = Run(1, ['sum', 'oscillator'])
+    self.assertEqual(['oscillator', 'sum'], sorted(results['results']))
+    self.assertGreater(results['results']['oscillator']['ticks_per_sec'], 0)
+    self.assertGreater(results['results']['sum']['alternate_slowdown'], 1)
+    with self.assertRaises(ValueError):
+      Run(1, ['missing'])
+
+  def testScale_GrowsLinearly(self):
+    results = [Run(scale, ['chain', 'fanout'])['results'] for scale in (1, 2)]
+    self.assertEqual([363, 726], [r['fanout']['gates'] for r in results])
+    self.assertEqual([100, 100], [r['chain']['stages'] for r in results])
+    self.assertEqual([100, 200], [r['chain']['worklist_stages'] for r in results])
+    self.assertFalse(gates.WORKLIST_ENABLED)
+
+  def testCompare(self):
+    baseline = {'results': {'chain': {'write_us': 100, 'gate_updates_per_sec': 1000, 'stages': 10}}}
+    current = {'results': {'chain': {'write_us': 105, 'gate_updates_per_sec': 800, 'stages': 20},
+        'tryte': {'words_per_sec': 1}}}
+    self.assertEqual([('chain', 'gate_updates_per_sec', 1000, 800)], Compare(current, baseline))
+    self.assertEqual([('chain', 'gate_updates_per_sec', 1000, 800), ('chain', 'write_us', 100, 105)],
+        Compare(current, baseline, tolerance=0.01))
+
+  def testCompare_FasterGateSumIsNoRegression(self):
+    baseline = {'results': {'sum': {'GateSum_per_sec': 1000, 'GateSumAlternate_per_sec': 100,
+        'alternate_slowdown': 10}}}
+    current = {'results': {'sum': {'GateSum_per_sec': 2000, 'GateSumAlternate_per_sec': 100,
+        'alternate_slowdown': 20}}}
+    self.assertEqual([], Compare(current, baseline))
+
+  def testMain_FlagsRegressions(self):
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'baseline.json')
+      self.assertEqual(0, Main(['--only', 'tryte', '--output', path]))
+      with open(path) as f:
+        baseline = json.load(f)
+      self.assertIn('words_per_sec', baseline['results']['tryte'])
+
+      baseline['results']['tryte']['words_per_sec'] *= 100
+      with open(path, 'w') as f:
+        json.dump(baseline, f)
+      output = os.path.join(directory, 'current.json')
+      with open(os.devnull, 'w') as devnull:
+        stderr = sys.stderr
+        sys.stderr = devnull
+        try:
+          self.assertEqual(1, Main(['--only', 'tryte', '--output', output, '--baseline', path]))
+        finally:
+          sys.stderr = stderr
+
+
+if __name__ == '__main__':
+  unittest.main()
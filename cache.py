@@ -0,0 +1,202 @@
+import array
+import hashlib
+import marshal
+import os
+import tempfile
+
+from netlist import *
+from optimizer import Optimize
+
+# Bump when the compiler or optimizer changes what they produce.
+CACHE_VERSION = 2
+LIBRARY_FILE = 'LIBRARY'
+SUFFIX = '.circuit'
+# Netlist sections holding states rather than structure.
+STATE_SECTIONS = ('port_states', 'wire_states')
+
+
+def LibraryFingerprint():
+  """
+  A hash of the gate library: the class name and truth table of every gate that
+  can be saved in a netlist, GateMem's table and the cache version. Changing a
+  LOGIC_MAP or adding, removing or renaming a gate class changes it.
+  """
+  digest = hashlib.sha256(b'%d' % CACHE_VERSION)
+  for name in sorted(GATE_TYPES):
+    cls = GATE_TYPES[name]
+    table = cls is not GateTable and TruthTable(cls) or ()
+    digest.update(('%s:%s:%s\n' % (name, [c.__name__ for c in cls.__mro__], table)).encode('utf-8'))
+  digest.update(repr(MEM_TABLE).encode('utf-8'))
+  return digest.hexdigest()
+
+
+class CircuitCache:
+  """
+  A directory of compiled, and optionally optimized, circuits keyed by a hash
+  of the structure of their saved netlist, so identical graphs share an entry
+  whatever state they are in. Entries are dropped when the gate library
+  changes, and the least recently used are evicted once the directory holds
+  more than `max_bytes`.
+  """
+  def __init__(self, directory, max_bytes=256 << 20):
+    self._directory = directory
+    self._max_bytes = max_bytes
+    self._fingerprint = LibraryFingerprint()
+    self._hits = 0
+    self._misses = 0
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, LIBRARY_FILE)
+    try:
+      with open(path) as f:
+        current = f.read()
+    except FileNotFoundError:
+      current = None
+    if current != self._fingerprint:
+      self.Clear()
+      self._Write(path, self._fingerprint.encode('utf-8'))
+
+  def Hits(self):
+    return self._hits
+
+  def Misses(self):
+    return self._misses
+
+  def Key(self, data, optimize, max_support):
+    """
+    The cache key for a netlist as saved by Dump: its gate types, tables,
+    delays and connections, and the states of the wires no gate drives, which
+    compile to constants. The states of inputs and gate outputs are left out.
+    """
+    netlist = Netlist(data)
+    digest = hashlib.sha256(self._fingerprint.encode('utf-8'))
+    digest.update(b'%d:%d:' % (bool(optimize), max_support))
+    digest.update('\n'.join(netlist.names).encode('utf-8'))
+    for (name, code) in SECTIONS:
+      if name != 'names' and name not in STATE_SECTIONS:
+        digest.update(b'|%s:' % name.encode('utf-8'))
+        digest.update(bytes(getattr(netlist, name)))
+    digest.update(b'|constants:')
+    digest.update(array.array('b', _ConstantStates(netlist)).tobytes())
+    return digest.hexdigest()
+
+  def Get(self, inputs, outputs, optimize=True, max_support=4):
+    """
+    The Circuit for the gates reachable from the `inputs` and `outputs` wires,
+    as Compile and then Optimize would make it, from the cache if present.
+    """
+    (data, wires) = Serialize(inputs, outputs)
+    key = self.Key(data, optimize, max_support)
+    states = []
+    for wire in wires:
+      driver = wire.Driver()
+      states.append(driver and driver.GetState() or NEUTRAL)
+    path = os.path.join(self._directory, key + SUFFIX)
+    try:
+      with open(path, 'rb') as f:
+        entry = marshal.load(f)
+      os.utime(path)
+    except (FileNotFoundError, EOFError, ValueError, TypeError):
+      entry = None
+    if entry is not None:
+      self._hits += 1
+      return _FromEntry(entry, wires, states)
+
+    self._misses += 1
+    circuit = compiled = Compile(inputs, outputs)
+    if optimize:
+      (circuit, report) = Optimize(circuit, max_support)
+    self._Write(path, marshal.dumps(_ToEntry(circuit, compiled, wires)))
+    self.Evict()
+    return circuit
+
+  def Entries(self):
+    """The (path, size, last used) of every entry, least recently used first."""
+    entries = []
+    for name in os.listdir(self._directory):
+      if not name.endswith(SUFFIX):
+        continue
+      path = os.path.join(self._directory, name)
+      try:
+        stat = os.stat(path)
+      except FileNotFoundError:
+        continue
+      entries.append((path, stat.st_size, stat.st_mtime_ns))
+    entries.sort(key=lambda entry: entry[2])
+    return entries
+
+  def Size(self):
+    return sum(size for (path, size, used) in self.Entries())
+
+  def Evict(self):
+    """Removes the least recently used entries until the cache fits."""
+    entries = self.Entries()
+    total = sum(size for (path, size, used) in entries)
+    for (path, size, used) in entries:
+      if total <= self._max_bytes:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      total -= size
+
+  def Clear(self):
+    for (path, size, used) in self.Entries():
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+
+  def _Write(self, path, data):
+    # Written aside and renamed, so other processes never read a partial entry.
+    (fd, temp) = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+      f.write(data)
+    os.replace(temp, path)
+
+
+def _ConstantStates(netlist):
+  """
+  The states compiled to constants: of wires that are not an input and have
+  no gate writing them, and of gate inputs without a wire.
+  """
+  inputs = set(netlist.inputs)
+  wire_ports = netlist.wire_ports
+  wire_points = netlist.wire_points
+  port_io = netlist.port_io
+  wired = set()
+  states = []
+  for i in range(netlist.WireCount()):
+    ports = wire_points[wire_ports[i]:wire_ports[i + 1]]
+    wired.update(ports)
+    if i not in inputs and all(port_io[p] != ConnectionPoint.WRITER for p in ports):
+      states.append(netlist.wire_states[i])
+  for (port, io) in enumerate(port_io):
+    if port not in wired and io == ConnectionPoint.READER:
+      states.append(netlist.port_states[port])
+  return states
+
+def _ToEntry(circuit, compiled, wires):
+  # Wires are saved with their ids before and after optimizing, so the states
+  # they had when compiled can be put back where Compile would have.
+  return (circuit.wire_count, [tuple(t) for t in circuit.tables], circuit.cell_codes,
+      circuit.cell_inputs, circuit.cell_outputs, circuit.levels, circuit.input_ids,
+      circuit.output_ids, circuit.state, [circuit._wire_ids.get(w, -1) for w in wires],
+      [compiled._wire_ids.get(w, -1) for w in wires])
+
+def _FromEntry(entry, wires, states):
+  """
+  The Circuit saved in `entry`, for `wires` currently in `states`. Inputs and
+  wires written by a cell take their current state; the others are constants,
+  which the key covers, or unused.
+  """
+  (wire_count, tables, codes, ins, outs, levels, input_ids, output_ids, state, ids,
+      compiled_ids) = entry
+  live = set(input_ids)
+  live.update(outs)
+  for (idx, wire_state) in zip(compiled_ids, states):
+    if idx in live:
+      state[idx] = wire_state
+  wire_ids = dict((wire, idx) for (wire, idx) in zip(wires, ids) if idx >= 0)
+  return Circuit(wire_count, tables, codes, ins, outs, input_ids, output_ids,
+      state, wire_ids, levels)
@@ -0,0 +1,126 @@
+from cache import *
+import itertools
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class TestCircuitCache(unittest.TestCase):
+  def setUp(self):
+    self.directory = tempfile.TemporaryDirectory()
+    self.path = self.directory.name
+
+  def tearDown(self):
+    self.directory.cleanup()
+
+  def setupSum(self):
+    gate = GateSumAlternate()
+    inputs = [Wire(), Wire()]
+    outputs = [Wire(), Wire()]
+    gate.SetInputWire1(inputs[0])
+    gate.SetInputWire2(inputs[1])
+    gate.SetOutputWire(outputs[0])
+    gate.SetOverflowWire(outputs[1])
+    return inputs, outputs
+
+  def testHit_MatchesCompile(self):
+    cache = CircuitCache(self.path)
+    (inputs, outputs) = self.setupSum()
+    first = cache.Get(inputs, outputs)
+    self.assertEqual((0, 1), (cache.Hits(), cache.Misses()))
+
+    # A separately built but identical graph shares the entry.
+    (inputs, outputs) = self.setupSum()
+    second = CircuitCache(self.path).Get(inputs, outputs)
+    expected = Compile(inputs, outputs)
+    self.assertEqual(first.cell_inputs, second.cell_inputs)
+    self.assertEqual(2, second.CellCount())
+    for values in itertools.product(TRITS, repeat=2):
+      self.assertEqual(expected.Step(values), second.Step(values))
+    self.assertEqual(second.output_ids[0], second.WireId(outputs[0]))
+
+  def setupTryte(self):
+    tryte = Tryte()
+    inputs = [Wire() for i in range(10)]
+    outputs = [Wire() for i in range(9)]
+    writers = [ConnectionPoint(ConnectionPoint.WRITER) for wire in inputs]
+    for (wire, writer) in zip(inputs, writers):
+      wire.Connect(writer)
+    tryte.SetInputWires(inputs[:9])
+    tryte.SetReadWire(inputs[9])
+    tryte.SetOutputWires(outputs)
+    return inputs, outputs, writers
+
+  def testState_SharesEntry(self):
+    cache = CircuitCache(self.path)
+    cache.Get(*self.setupTryte()[:2])
+    (inputs, outputs, writers) = self.setupTryte()
+    cache.Get(inputs, outputs)
+    self.assertEqual((1, 1), (cache.Hits(), cache.Misses()))
+
+    # Storing a word changes the state of the graph, not its structure.
+    for writer in writers[:9]:
+      writer.SetStateWrite(MINUS)
+    writers[9].SetStateWrite(PLUS)
+    writers[9].SetStateWrite(NEUTRAL)
+    circuit = cache.Get(inputs, outputs)
+    self.assertEqual((2, 1), (cache.Hits(), cache.Misses()))
+    self.assertEqual((MINUS,) * 9, circuit.ReadOutputs())
+    expected = Optimize(Compile(inputs, outputs))[0]
+    for values in [(PLUS,) * 9 + (NEUTRAL,), (PLUS,) * 10, (NEUTRAL,) * 10, (MINUS,) * 10]:
+      self.assertEqual(expected.Step(values), circuit.Step(values), values)
+
+  def testConstants_AreSeparateEntries(self):
+    cache = CircuitCache(self.path)
+    for state in (MINUS, PLUS, MINUS):
+      (wire_in, wire_const, wire_out) = (Wire(), Wire(), Wire())
+      wire_const.Connect(ConnectionPoint(ConnectionPoint.WRITER, state=state))
+      gate = GateOr()
+      gate.SetInputWire1(wire_in)
+      gate.SetInputWire2(wire_const)
+      gate.SetOutputWire(wire_out)
+      circuit = cache.Get([wire_in], [wire_out])
+      self.assertEqual([max(t, state) for t in TRITS], [circuit.Step((t,))[0] for t in TRITS])
+    self.assertEqual((1, 2), (cache.Hits(), cache.Misses()))
+
+  def testOptions_AreSeparateEntries(self):
+    cache = CircuitCache(self.path)
+    (inputs, outputs) = self.setupSum()
+    self.assertEqual(13, cache.Get(inputs, outputs, optimize=False).CellCount())
+    self.assertEqual(2, cache.Get(inputs, outputs).CellCount())
+    self.assertEqual(2, len(cache.Entries()))
+
+  def testLibraryChange_Clears(self):
+    CircuitCache(self.path).Get(*self.setupSum())
+    with mock.patch.dict(TRUTH_TABLES, {GateAnd: TruthTable(GateOr)}):
+      cache = CircuitCache(self.path)
+      self.assertEqual([], cache.Entries())
+      cache.Get(*self.setupSum())
+      self.assertEqual(1, cache.Misses())
+
+  def testEvict_LeastRecentlyUsed(self):
+    cache = CircuitCache(self.path)
+    graphs = [self.setupSum() for i in range(3)]
+    cache.Get(*graphs[0], optimize=False)
+    cache.Get(*graphs[0])
+    (path, size, used) = cache.Entries()[0]
+    os.utime(path, ns=(used - 10 ** 9, used - 10 ** 9))
+
+    cache._max_bytes = cache.Size()
+    cache.Get(*graphs[1], max_support=3)
+    self.assertEqual(2, len(cache.Entries()))
+    self.assertNotIn(path, [entry[0] for entry in cache.Entries()])
+
+  def testCorruptEntry_Recompiles(self):
+    cache = CircuitCache(self.path)
+    (inputs, outputs) = self.setupSum()
+    cache.Get(inputs, outputs)
+    with open(cache.Entries()[0][0], 'wb') as f:
+      f.write(b'junk')
+    self.assertEqual(2, cache.Get(inputs, outputs).CellCount())
+    self.assertEqual(2, cache.Misses())
+
+
+if __name__ == '__main__':
+  unittest.main()
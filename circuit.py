@@ -0,0 +1,284 @@
+from gates import *
+
+
+class CompileError(ValueError):
+  pass
+
+
+def _MonadicCells(gate):
+  return [(TruthTable(type(gate)), (gate._input,), gate._output)]
+
+def _DiadicCells(gate):
+  return [(TruthTable(type(gate)), (gate._input1, gate._input2), gate._output)]
+
+def _SumCells(gate):
+  return [
+    (TruthTable(GateSum), (gate._input1, gate._input2), gate._output),
+    (TruthTable(GateConsensus), (gate._input1, gate._input2), gate._overflow),
+  ]
+
+def _MemCells(gate):
+  # The held value is read back from the gate's own output.
+  return [(MEM_TABLE, (gate._input1, gate._input2, gate._output), gate._output)]
+
+def _TableCells(gate):
+  return [(gate.Table(), gate._inputs, gate._output)]
+
+CELL_BUILDERS = {
+  GateMonadic: _MonadicCells,
+  GateDiadic: _DiadicCells,
+  GateSum: _SumCells,
+  GateMem: _MemCells,
+  GateTable: _TableCells,
+}
+
+def GateCells(gate):
+  """
+  Returns the cells of a gate as a list of (table, input points, output point).
+  Raises CompileError for gates that cannot be compiled.
+  """
+  try:
+    for cls in type(gate).__mro__:
+      if cls in CELL_BUILDERS:
+        return CELL_BUILDERS[cls](gate)
+  except KeyError:
+    # A gate class without a truth table.
+    pass
+  raise CompileError('Cannot compile %s' % gate)
+
+
+class Circuit:
+  """
+  A flat, levelized form of a graph of gates and wires.
+
+  Every wire is an integer id into `state`. Every gate is broken into cells,
+  one per output, each of which is a lookup into `tables[cell_codes[i]]` indexed
+  by the base 3 encoding of the states of `cell_inputs[i]` and written to
+  `cell_outputs[i]`. A cell may read its own output, which is how GateMem holds
+  its value. Cells are stored in level order so that a single pass settles
+  every wire. Given the `levels` of cells that are already in level order, as
+  those of another Circuit, levelizing is skipped.
+  """
+  def __init__(self, wire_count, tables, cell_codes, cell_inputs, cell_outputs,
+      input_ids, output_ids, state=None, wire_ids=None, levels=None):
+    self.wire_count = wire_count
+    self.tables = list(tables)
+    self.input_ids = list(input_ids)
+    self.output_ids = list(output_ids)
+    self.state = list(state or [NEUTRAL] * wire_count)
+    self._wire_ids = wire_ids or {}
+
+    if levels is None:
+      order, levels = Levelize(wire_count, cell_inputs, cell_outputs)
+    else:
+      order = range(len(cell_codes))
+    self.cell_codes = [cell_codes[i] for i in order]
+    self.cell_inputs = [tuple(cell_inputs[i]) for i in order]
+    self.cell_outputs = [cell_outputs[i] for i in order]
+    self.levels = [levels[i] for i in order]
+    self._program = [(self.tables[code], ins, out) for (code, ins, out) in
+        zip(self.cell_codes, self.cell_inputs, self.cell_outputs)]
+
+  def __getstate__(self):
+    # Wires stay behind when a Circuit is sent to another process.
+    state = dict(self.__dict__)
+    state['_wire_ids'] = {}
+    return state
+
+  def CellCount(self):
+    return len(self.cell_codes)
+
+  def LevelCount(self):
+    return self.levels and self.levels[-1] + 1 or 0
+
+  def SetInputs(self, values):
+    if len(values) != len(self.input_ids):
+      raise ConnectionError('Expected %d inputs, got %d' % (len(self.input_ids), len(values)))
+    state = self.state
+    for (idx, value) in zip(self.input_ids, values):
+      if value not in VALID_STATES:
+        raise BadStateException(value)
+      state[idx] = value
+
+  def Evaluate(self):
+    state = self.state
+    for (table, ins, out) in self._program:
+      if len(ins) == 1:
+        state[out] = table[state[ins[0]] + 1]
+      elif len(ins) == 2:
+        state[out] = table[3 * state[ins[0]] + state[ins[1]] + 4]
+      else:
+        idx = 0
+        for i in ins:
+          idx = 3 * idx + state[i] + 1
+        state[out] = table[idx]
+
+  def ReadOutputs(self):
+    state = self.state
+    return tuple(state[idx] for idx in self.output_ids)
+
+  def Step(self, values):
+    """Sets the inputs, settles every wire and returns the outputs."""
+    self.SetInputs(values)
+    self.Evaluate()
+    return self.ReadOutputs()
+
+  def WireId(self, wire):
+    try:
+      return self._wire_ids[wire]
+    except KeyError:
+      raise ConnectionError('%s is not part of this circuit' % wire)
+
+  def GetState(self, wire):
+    return self.state[self.WireId(wire)]
+
+  def __str__(self):
+    return '%s<%d wires, %d cells, %d levels>' % \
+        (type(self).__name__, self.wire_count, self.CellCount(), self.LevelCount())
+
+
+def Levelize(wire_count, cell_inputs, cell_outputs):
+  """
+  Topologically sorts cells so that every cell comes after the cells driving
+  its inputs. Returns the order and the level of each cell.
+  """
+  driver = [None] * wire_count
+  for (i, out) in enumerate(cell_outputs):
+    driver[out] = i
+
+  fanout = [[] for _ in cell_outputs]
+  waiting = [0] * len(cell_outputs)
+  for (i, ins) in enumerate(cell_inputs):
+    for w in set(ins):
+      d = driver[w]
+      if d is not None and d != i:
+        fanout[d].append(i)
+        waiting[i] += 1
+
+  levels = [0] * len(cell_outputs)
+  ready = [i for (i, count) in enumerate(waiting) if not count]
+  order = []
+  while ready:
+    order.extend(ready)
+    next_ready = []
+    for i in ready:
+      for j in fanout[i]:
+        levels[j] = max(levels[j], levels[i] + 1)
+        waiting[j] -= 1
+        if not waiting[j]:
+          next_ready.append(j)
+    ready = next_ready
+
+  if len(order) != len(cell_outputs):
+    raise CompileError('Combinational loop through %d cells' % (len(cell_outputs) - len(order)))
+  order.sort(key=lambda i: levels[i])
+  return order, levels
+
+
+def CollectGates(wires):
+  """
+  Walks every wire and gate reachable from `wires`. Returns the gates and
+  wires found, both in discovery order.
+  """
+  gates = {}
+  seen = {}
+  pending = list(wires)
+  while pending:
+    wire = pending.pop()
+    if wire in seen:
+      continue
+    seen[wire] = None
+    for point in wire._connections:
+      gate = point._controller
+      if not gate or gate in gates:
+        continue
+      gates[gate] = None
+      for (table, ins, out) in GateCells(gate):
+        for p in ins + (out,):
+          if p.HasWire() and p._wire not in seen:
+            pending.append(p._wire)
+  return list(gates), list(seen)
+
+
+def Compile(inputs, outputs):
+  """
+  Compiles the gates reachable from the `inputs` and `outputs` wires into a
+  Circuit. The state of every wire is taken from the object model, so gates
+  that hold state (GateMem) carry it over.
+
+  Wires are read from the first writer connected to them, as Wire.Update does.
+  Wires that are not driven by a gate and are not an input keep the state of
+  their writer, or (0) if they have none.
+
+  Evaluating the circuit settles every gate, while the object model only
+  updates gates whose inputs have been written since they were built.
+  """
+  gates, wires = CollectGates(list(inputs) + list(outputs))
+
+  wire_ids = {}
+  state = []
+  def Id(key, value):
+    if key not in wire_ids:
+      wire_ids[key] = len(state)
+      state.append(value)
+    return wire_ids[key]
+
+  input_set = set(inputs)
+  for wire in inputs:
+    if wire in wire_ids:
+      raise CompileError('%s is listed as an input twice' % wire)
+    driver = wire.Driver()
+    Id(wire, driver and driver.GetState() or NEUTRAL)
+
+  # Only the first writer on a wire is ever read.
+  drivers = {}
+  for wire in wires:
+    driver = wire.Driver()
+    if driver:
+      drivers[driver] = wire
+    Id(wire, driver and driver.GetState() or NEUTRAL)
+
+  tables = []
+  codes = {}
+  cell_codes = []
+  cell_inputs = []
+  cell_outputs = []
+  for gate in gates:
+    for (table, ins, out) in GateCells(gate):
+      if out not in drivers or drivers[out] in input_set:
+        continue
+      if table not in codes:
+        codes[table] = len(tables)
+        tables.append(table)
+      cell_codes.append(codes[table])
+      # An input point without a wire keeps reading its own state.
+      cell_inputs.append(tuple(Id(p._wire or p, p.GetState()) for p in ins))
+      cell_outputs.append(wire_ids[out._wire])
+
+  return Circuit(len(state), tables, cell_codes, cell_inputs, cell_outputs,
+      [wire_ids[w] for w in inputs], [wire_ids[w] for w in outputs],
+      state, wire_ids)
+
+
+def CompileGate(gate):
+  """
+  Attaches fresh wires to every port of a single gate and compiles it. The
+  inputs are ordered (input,), (input1, input2) or as a GateTable's, and the
+  outputs are (output,) or (output, overflow) for a GateSum.
+  """
+  if isinstance(gate, GateMonadic):
+    inputs = [Wire()]
+    gate.SetInputWire(inputs[0])
+  elif isinstance(gate, GateTable):
+    inputs = [Wire() for i in range(gate.InputCount())]
+    gate.SetInputWires(inputs)
+  else:
+    inputs = [Wire(), Wire()]
+    gate.SetInputWire1(inputs[0])
+    gate.SetInputWire2(inputs[1])
+  outputs = [Wire()]
+  gate.SetOutputWire(outputs[0])
+  if isinstance(gate, GateSum):
+    outputs.append(Wire())
+    gate.SetOverflowWire(outputs[1])
+  return Compile(inputs, outputs)
@@ -0,0 +1,141 @@
+from circuit import *
+import itertools
+import unittest
+
+MONADIC_GATES = [GateIdentity, GateIncrement, GateDecrement, GateNegate,
+    GateIsHigh, GateIsNeutral, GateIsLow]
+DIADIC_GATES = [GateAnd, GateNand, GateOr, GateNor, GateXor, GateXnor,
+    GateConsensus, GateSum, GateSumAlternate]
+
+
+def AttachPorts(inputs, outputs):
+  writers = [ConnectionPoint(ConnectionPoint.WRITER) for _ in inputs]
+  readers = [ConnectionPoint(ConnectionPoint.READER) for _ in outputs]
+  for (writer, wire) in zip(writers, inputs):
+    wire.Connect(writer)
+  for (reader, wire) in zip(readers, outputs):
+    wire.Connect(reader)
+  return writers, readers
+
+
+class TestCompile(unittest.TestCase):
+  def assertMatchesObjectModel(self, gate_type, arity):
+    gate = gate_type()
+    circuit = CompileGate(gate)
+    wires = {idx: wire for (wire, idx) in circuit._wire_ids.items()}
+    inputs = [wires[idx] for idx in circuit.input_ids]
+    outputs = [wires[idx] for idx in circuit.output_ids]
+    writers, readers = AttachPorts(inputs, outputs)
+    for values in itertools.product(TRITS, repeat=arity):
+      for (writer, value) in zip(writers, values):
+        writer.SetStateWrite(value)
+      expected = tuple(reader.GetState() for reader in readers)
+      self.assertEqual(expected, circuit.Step(values), '%s with inputs %s' % (gate, values))
+
+  def testMonadicGates(self):
+    for gate_type in MONADIC_GATES:
+      self.assertMatchesObjectModel(gate_type, 1)
+
+  def testDiadicGates(self):
+    for gate_type in DIADIC_GATES:
+      self.assertMatchesObjectModel(gate_type, 2)
+
+  def testGateTable(self):
+    table = [min(a, b, c) for a in TRITS for b in TRITS for c in TRITS]
+    circuit = CompileGate(GateTable(table))
+    for values in itertools.product(TRITS, repeat=3):
+      self.assertEqual((min(values),), circuit.Step(values))
+
+  def testGateSumAlternate_Levelized(self):
+    circuit = CompileGate(GateSumAlternate())
+    self.assertEqual(13, circuit.CellCount())
+    self.assertEqual(5, circuit.LevelCount())
+    self.assertEqual(sorted(circuit.levels), circuit.levels)
+
+  def testGateMem_HoldsState(self):
+    circuit = CompileGate(GateMem())
+    expectations = [
+        (PLUS,    NEUTRAL, NEUTRAL),
+        (PLUS,    PLUS,    PLUS),
+        (NEUTRAL, NEUTRAL, PLUS),
+        (PLUS,    MINUS,   MINUS),
+        (MINUS,   NEUTRAL, MINUS),
+    ]
+    for (in1, in2, out) in expectations:
+      self.assertEqual((out,), circuit.Step((in1, in2)))
+
+  def testTryte(self):
+    tryte = Tryte()
+    inwires = [Wire() for i in range(9)]
+    outwires = [Wire() for i in range(9)]
+    readwire = Wire()
+    tryte.SetInputWires(inwires)
+    tryte.SetOutputWires(outwires)
+    tryte.SetReadWire(readwire)
+    circuit = Compile(inwires + [readwire], outwires)
+
+    word = (PLUS, MINUS, NEUTRAL) * 3
+    self.assertEqual(word, circuit.Step(word + (PLUS,)))
+    self.assertEqual(word, circuit.Step((NEUTRAL,) * 9 + (NEUTRAL,)))
+    self.assertEqual(tuple(-t for t in word), circuit.Step(word + (MINUS,)))
+
+  def testChain_MatchesObjectModel(self):
+    wires = [Wire() for i in range(31)]
+    gates = [(GateIncrement, GateNegate, GateIsNeutral)[i % 3]() for i in range(30)]
+    for (i, gate) in enumerate(gates):
+      gate.SetInputWire(wires[i])
+      gate.SetOutputWire(wires[i + 1])
+    # The object model only settles gates whose inputs change.
+    for gate in gates:
+      gate.Update()
+    circuit = Compile(wires[:1], wires[-1:])
+    self.assertEqual(30, circuit.LevelCount())
+
+    writers, readers = AttachPorts(wires[:1], wires[-1:])
+    for value in TRITS:
+      writers[0].SetStateWrite(value)
+      self.assertEqual((readers[0].GetState(),), circuit.Step((value,)))
+      self.assertEqual(readers[0].GetState(), circuit.GetState(wires[-1]))
+
+  def testUndrivenWire_KeepsWriterState(self):
+    wire_in, wire_const, wire_out = Wire(), Wire(), Wire()
+    constant = ConnectionPoint(ConnectionPoint.WRITER, state=PLUS)
+    wire_const.Connect(constant)
+    gate = GateAnd()
+    gate.SetInputWire1(wire_in)
+    gate.SetInputWire2(wire_const)
+    gate.SetOutputWire(wire_out)
+    circuit = Compile([wire_in], [wire_out])
+    for value in TRITS:
+      self.assertEqual((value,), circuit.Step((value,)))
+
+  def testLoop_Raises(self):
+    wire_1, wire_2 = Wire(), Wire()
+    negate_1, negate_2 = GateNegate(), GateNegate()
+    negate_1.SetInputWire(wire_1)
+    negate_1.SetOutputWire(wire_2)
+    negate_2.SetInputWire(wire_2)
+    negate_2.SetOutputWire(wire_1)
+    with self.assertRaises(CompileError):
+      Compile([], [wire_1])
+
+  def testNoTable_Raises(self):
+    class GateCustom(GateMonadic):
+      __slots__ = ()
+    gate = GateCustom()
+    (wire_in, wire_out) = (Wire(), Wire())
+    gate.SetInputWire(wire_in)
+    gate.SetOutputWire(wire_out)
+    with self.assertRaises(CompileError):
+      Compile([wire_in], [wire_out])
+
+  def testBadInput_Raises(self):
+    circuit = CompileGate(GateAnd())
+    with self.assertRaises(ConnectionError):
+      circuit.Step((PLUS,))
+    with self.assertRaises(BadStateException):
+      circuit.Step((PLUS, 2))
+
+
+if __name__ == '__main__':
+  unittest.main()
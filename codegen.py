@@ -0,0 +1,199 @@
+"""
+Straight-line Python for compiled circuits.
+
+  evaluate = Build(Compile(inputs, outputs))
+  outputs = evaluate(PLUS, MINUS)
+
+Every cell becomes one assignment indexing its truth table, in level order,
+so a vector is evaluated with a single call and no loops. Cells holding state,
+like GateMem, read it from extra arguments and return it updated.
+"""
+import hashlib
+import linecache
+import random
+import time
+
+from circuit import *
+
+# Generated functions by a hash of their source.
+CODE_CACHE = {}
+
+
+def StateIds(circuit):
+  """The wires of cells reading their own output, in cell order."""
+  return [out for (ins, out) in zip(circuit.cell_inputs, circuit.cell_outputs) if out in ins]
+
+def Generate(circuit, name='Evaluate'):
+  """
+  Python source for a function `name` evaluating `circuit` once. It takes one
+  argument per input and then one per wire in StateIds. Without state it
+  returns the tuple of outputs; with state, the outputs and the new state.
+  Wires driven by nothing keep their current state as constants.
+  """
+  names = {}
+  for (k, idx) in enumerate(circuit.input_ids):
+    names[idx] = 'i%d' % k
+  state_ids = StateIds(circuit)
+  for (k, idx) in enumerate(state_ids):
+    names[idx] = 's%d' % k
+
+  tables = {}
+  body = []
+  for (code, ins, out) in zip(circuit.cell_codes, circuit.cell_inputs, circuit.cell_outputs):
+    table = tuple(circuit.tables[code])
+    terms = []
+    offset = (3 ** len(ins) - 1) // 2
+    for (k, w) in enumerate(ins):
+      weight = 3 ** (len(ins) - 1 - k)
+      if w in names:
+        terms.append(weight == 1 and names[w] or '%d*%s' % (weight, names[w]))
+      else:
+        offset += weight * circuit.state[w]
+    if out not in names:
+      names[out] = 'v%d' % len(body)
+    if not terms:
+      value = '%d' % table[offset]
+    elif len(ins) == 1 and table == TruthTable(GateIdentity):
+      value = terms[0]
+    elif len(ins) == 1 and table == NEGATE_TABLE:
+      value = '-%s' % terms[0]
+    else:
+      if table not in tables:
+        tables[table] = '_T%d' % len(tables)
+      index = ' + '.join(terms)
+      if offset:
+        index += offset > 0 and ' + %d' % offset or ' - %d' % -offset
+      value = '%s[%s]' % (tables[table], index)
+    body.append('  %s = %s' % (names[out], value))
+
+  outputs = [names.get(idx, '%d' % circuit.state[idx]) for idx in circuit.output_ids]
+  result = '(%s)' % ''.join('%s, ' % name for name in outputs)
+  if state_ids:
+    result += ', (%s)' % ''.join('%s, ' % names[idx] for idx in state_ids)
+  args = ['i%d' % k for k in range(len(circuit.input_ids))]
+  args += ['s%d' % k for k in range(len(state_ids))]
+  args += ['%s=%s' % (table_name, table_name) for table_name in tables.values()]
+
+  lines = ['%s = %r' % (table_name, table) for (table, table_name) in tables.items()]
+  lines.append('')
+  lines.append('def %s(%s):' % (name, ', '.join(args)))
+  lines.extend(body)
+  lines.append('  return %s' % result)
+  return '\n'.join(lines) + '\n'
+
+def Build(circuit):
+  """
+  The generated function for `circuit`, compiled once per distinct
+  structure and shared from CODE_CACHE afterwards.
+  """
+  source = Generate(circuit)
+  key = hashlib.sha256(source.encode('utf-8')).hexdigest()
+  fn = CODE_CACHE.get(key)
+  if fn is None:
+    filename = '<circuit %s>' % key[:12]
+    # Lets tracebacks and inspect show the generated source.
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    namespace = {}
+    exec(compile(source, filename, 'exec'), namespace)
+    fn = CODE_CACHE[key] = namespace['Evaluate']
+  return fn
+
+
+class GeneratedCircuit:
+  """
+  Steps a circuit through its generated function, keeping the state of its
+  GateMem cells between steps as Circuit does.
+  """
+  def __init__(self, circuit):
+    self.function = Build(circuit)
+    self._input_count = len(circuit.input_ids)
+    self.state_ids = StateIds(circuit)
+    self.state = tuple(circuit.state[idx] for idx in self.state_ids)
+
+  def Step(self, values):
+    """Evaluates the circuit for input `values` and returns the outputs."""
+    if len(values) != self._input_count:
+      raise ConnectionError('Expected %d inputs, got %d' % (self._input_count, len(values)))
+    if not self.state_ids:
+      return self.function(*values)
+    (outputs, self.state) = self.function(*values, *self.state)
+    return outputs
+
+  def __str__(self):
+    return '%s<%d inputs, %d state>' % (type(self).__name__, self._input_count, len(self.state_ids))
+
+
+def Benchmark(build, count=2000, seed=25):
+  """
+  Random vectors per second through the object model, Circuit.Step and the
+  generated function, for the circuit `build` returns as (input wires, output
+  wires).
+  """
+  def Rate(fn):
+    best = None
+    for i in range(3):
+      start = time.perf_counter()
+      fn()
+      elapsed = time.perf_counter() - start
+      best = best is None and elapsed or min(best, elapsed)
+    return len(vectors) / best
+
+  (inputs, outputs) = build()
+  rng = random.Random(seed)
+  vectors = [tuple(rng.choice(TRITS) for wire in inputs) for i in range(count)]
+  writers = [wire.Driver() for wire in inputs]
+  def Objects():
+    for vector in vectors:
+      for (writer, value) in zip(writers, vector):
+        writer.SetStateWrite(value)
+  circuit = Compile(inputs, outputs)
+  def Compiled():
+    for vector in vectors:
+      circuit.Step(vector)
+  generated = GeneratedCircuit(circuit)
+  def Generated():
+    for vector in vectors:
+      generated.Step(vector)
+  fn = generated.function
+  def Direct():
+    for vector in vectors:
+      fn(*vector)
+
+  start = time.perf_counter()
+  CODE_CACHE.clear()
+  Build(circuit)
+  results = {'build_ms': (time.perf_counter() - start) * 1e3}
+  results.update({
+    'objects_per_sec': Rate(Objects),
+    'circuit_per_sec': Rate(Compiled),
+    'generated_per_sec': Rate(Generated),
+  })
+  if not generated.state_ids:
+    results['direct_per_sec'] = Rate(Direct)
+  return results
+
+
+if __name__ == '__main__':
+  from datapath import RippleAdder, STRUCTURAL
+
+  def Builder(cls):
+    def BuildGate():
+      gate = cls()
+      inputs = [Wire(), Wire()]
+      outputs = [Wire(), Wire()]
+      for wire in inputs:
+        wire.Connect(ConnectionPoint(ConnectionPoint.WRITER))
+      gate.SetInputWire1(inputs[0])
+      gate.SetInputWire2(inputs[1])
+      gate.SetOutputWire(outputs[0])
+      gate.SetOverflowWire(outputs[1])
+      return inputs, outputs
+    return BuildGate
+
+  def BuildAdder():
+    adder = RippleAdder(27, STRUCTURAL)
+    return ([point._wire for point in adder._writers], [point._wire for point in adder._readers])
+
+  for (name, build) in [('GateSum', Builder(GateSum)),
+      ('GateSumAlternate', Builder(GateSumAlternate)), ('RippleAdder(27)', BuildAdder)]:
+    print('%s: %s' % (name, ', '.join('%s %.1f' % item for item in Benchmark(build).items())))
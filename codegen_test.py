@@ -0,0 +1,106 @@
+from codegen import *
+from circuit_test import MONADIC_GATES, DIADIC_GATES
+import itertools
+import random
+import unittest
+
+
+class TestCodegen(unittest.TestCase):
+  def assertMatchesCircuit(self, circuit, vectors):
+    generated = GeneratedCircuit(circuit)
+    for vector in vectors:
+      self.assertEqual(circuit.Step(vector), generated.Step(vector), vector)
+
+  def testGates(self):
+    for gate_type in MONADIC_GATES + DIADIC_GATES + [GateMem]:
+      circuit = CompileGate(gate_type())
+      arity = len(circuit.input_ids)
+      self.assertMatchesCircuit(circuit, list(itertools.product(TRITS, repeat=arity)) * 2)
+
+  def testGateTable(self):
+    rng = random.Random(25)
+    circuit = CompileGate(GateTable(tuple(rng.choice(TRITS) for i in range(81))))
+    self.assertMatchesCircuit(circuit, itertools.product(TRITS, repeat=4))
+
+  def testSource(self):
+    source = Generate(CompileGate(GateSum()))
+    self.assertEqual(
+        '_T0 = %r\n'
+        '_T1 = %r\n'
+        '\n'
+        'def Evaluate(i0, i1, _T0=_T0, _T1=_T1):\n'
+        '  v0 = _T0[3*i0 + i1 + 4]\n'
+        '  v1 = _T1[3*i0 + i1 + 4]\n'
+        '  return (v0, v1, )\n' % (TruthTable(GateSum), TruthTable(GateConsensus)),
+        source)
+    self.assertIn('  v0 = -i0\n', Generate(CompileGate(GateNegate())))
+    self.assertIn('  v0 = i0\n', Generate(CompileGate(GateIdentity())))
+
+  def testMem_StateArguments(self):
+    circuit = CompileGate(GateMem())
+    evaluate = Build(circuit)
+    source = Generate(circuit)
+    self.assertIn('def Evaluate(i0, i1, s0, ', source)
+    self.assertIn('  s0 = _T0[9*i0 + 3*i1 + s0 + 13]\n', source)
+    self.assertIn('  return (s0, ), (s0, )\n', source)
+    self.assertEqual(((PLUS,), (PLUS,)), evaluate(PLUS, PLUS, MINUS))
+    self.assertEqual(((MINUS,), (MINUS,)), evaluate(PLUS, NEUTRAL, MINUS))
+    self.assertEqual(((PLUS,), (PLUS,)), evaluate(MINUS, MINUS, NEUTRAL))
+
+  def testTryte(self):
+    tryte = Tryte()
+    inwires = [Wire() for i in range(9)]
+    outwires = [Wire() for i in range(9)]
+    readwire = Wire()
+    tryte.SetInputWires(inwires)
+    tryte.SetOutputWires(outwires)
+    tryte.SetReadWire(readwire)
+    circuit = Compile(inwires + [readwire], outwires)
+    self.assertEqual(9, len(StateIds(circuit)))
+    rng = random.Random(25)
+    self.assertMatchesCircuit(circuit, [tuple(rng.choice(TRITS) for i in range(10)) for j in range(200)])
+
+  def testConstantWire(self):
+    wire_in, wire_const, wire_out = Wire(), Wire(), Wire()
+    wire_const.Connect(ConnectionPoint(ConnectionPoint.WRITER, state=MINUS))
+    gate = GateOr()
+    gate.SetInputWire1(wire_in)
+    gate.SetInputWire2(wire_const)
+    gate.SetOutputWire(wire_out)
+    circuit = Compile([wire_in], [wire_out])
+    self.assertIn('_T0[3*i0 + 3]', Generate(circuit))
+    self.assertMatchesCircuit(circuit, [(t,) for t in TRITS])
+
+  def testCache_SharedByStructure(self):
+    CODE_CACHE.clear()
+    first = Build(CompileGate(GateSumAlternate()))
+    self.assertIs(first, Build(CompileGate(GateSumAlternate())))
+    self.assertIsNot(first, Build(CompileGate(GateSum())))
+    self.assertEqual(2, len(CODE_CACHE))
+    self.assertIn('Evaluate', ''.join(linecache.getlines(first.__code__.co_filename)))
+
+  def testBadInputs_Raise(self):
+    generated = GeneratedCircuit(CompileGate(GateAnd()))
+    self.assertIn('2 inputs, 0 state', str(generated))
+    with self.assertRaises(ConnectionError):
+      generated.Step((PLUS,))
+
+  def testBenchmark(self):
+    def BuildSum():
+      inputs = [Wire(), Wire()]
+      outputs = [Wire(), Wire()]
+      for wire in inputs:
+        wire.Connect(ConnectionPoint(ConnectionPoint.WRITER))
+      gate = GateSum()
+      gate.SetInputWire1(inputs[0])
+      gate.SetInputWire2(inputs[1])
+      gate.SetOutputWire(outputs[0])
+      gate.SetOverflowWire(outputs[1])
+      return inputs, outputs
+    results = Benchmark(BuildSum, count=50)
+    self.assertEqual(['build_ms', 'objects_per_sec', 'circuit_per_sec', 'generated_per_sec',
+        'direct_per_sec'], list(results))
+
+
+if __name__ == '__main__':
+  unittest.main()
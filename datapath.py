@@ -0,0 +1,230 @@
+from gates import *
+
+STRUCTURAL = 'structural'
+BEHAVIOURAL = 'behavioural'
+CROSS_CHECK = 'cross_check'
+MODES = {STRUCTURAL, BEHAVIOURAL, CROSS_CHECK}
+
+
+class MismatchError(ValueError):
+  pass
+
+
+def ToTrits(value, width):
+  """Balanced ternary digits of `value`, least significant first."""
+  trits = []
+  for i in range(width):
+    trit = (value + 1) % 3 - 1
+    trits.append(trit)
+    value = (value - trit) // 3
+  if value:
+    raise OverflowError('Value does not fit in %d trits' % width)
+  return trits
+
+def TritsValue(trits):
+  """The value of balanced ternary digits, least significant first."""
+  value = 0
+  for trit in reversed(trits):
+    if trit not in VALID_STATES:
+      raise BadStateException(trit)
+    value = 3 * value + trit
+  return value
+
+def FromTrits(trits):
+  return TritWord(TritsValue(trits), len(trits))
+
+
+class TritWord:
+  """
+  An immutable word of balanced ternary trits, stored as its integer value.
+  Trit 0 is the least significant.
+  """
+  __slots__ = ('_value', '_width')
+  def __init__(self, value=0, width=9):
+    limit = (3 ** width - 1) // 2
+    if not -limit <= value <= limit:
+      raise OverflowError('%d does not fit in %d trits' % (value, width))
+    self._value = value
+    self._width = width
+
+  def Value(self):
+    return self._value
+
+  def Width(self):
+    return self._width
+
+  def Trits(self):
+    return ToTrits(self._value, self._width)
+
+  def Trit(self, idx):
+    if not 0 <= idx < self._width:
+      raise IndexError('Index not in range [0,%d]: %d' % (self._width - 1, idx))
+    return (self._value // 3 ** idx + 1) % 3 - 1
+
+  def __int__(self):
+    return self._value
+
+  def __neg__(self):
+    return type(self)(-self._value, self._width)
+
+  def __eq__(self, other):
+    return isinstance(other, TritWord) and \
+        (self._value, self._width) == (other._value, other._width)
+
+  def __hash__(self):
+    return hash((self._value, self._width))
+
+  def __str__(self):
+    return '%s<%s>' % (type(self).__name__,
+        ''.join(STATE_NAME[t][1] for t in reversed(self.Trits())))
+
+
+class TryteWord(TritWord):
+  __slots__ = ()
+  def __init__(self, value=0, width=9):
+    if width != 9:
+      raise ValueError('A tryte is 9 trits, not %d' % width)
+    super().__init__(value, 9)
+
+
+def _Word(cls, value, width):
+  """A word of type `cls` for a value already known to fit, skipping the check."""
+  word = object.__new__(cls)
+  word._value = value
+  word._width = width
+  return word
+
+def CompareValues(a, b):
+  return (a > b) - (a < b)
+
+
+class _Datapath:
+  """Drives a structural block built from gates through writers and readers."""
+  def __init__(self, width=9, mode=BEHAVIOURAL):
+    if mode not in MODES:
+      raise ValueError('Unknown mode: %s' % mode)
+    self._width = width
+    self._mode = mode
+    self._modulus = 3 ** width
+    self._limit = (self._modulus - 1) // 2
+    self._writers = []
+    self._readers = []
+    if mode != BEHAVIOURAL:
+      self._Build()
+
+  def _Wire(self, io):
+    wire = Wire()
+    point = ConnectionPoint(io)
+    wire.Connect(point)
+    if io == ConnectionPoint.WRITER:
+      self._writers.append(point)
+    else:
+      self._readers.append(point)
+    return wire
+
+  def _Drive(self, values):
+    for (writer, value) in zip(self._writers, values):
+      if writer.GetState() != value:
+        writer.SetStateWrite(value)
+    return [reader.GetState() for reader in self._readers]
+
+  def _Check(self, structural, behavioural, operands):
+    if structural != behavioural:
+      raise MismatchError('Structural %s and behavioural %s differ for %s' %
+          (structural, behavioural, operands))
+
+
+class RippleAdder(_Datapath):
+  """
+  An N-trit ripple carry adder. In STRUCTURAL mode every trit is a full adder
+  of three GateSums: the two input trits are summed, the partial sum is added
+  to the carry in, and the two overflows are summed into the carry out (they
+  never have the same sign, so that sum cannot overflow). BEHAVIOURAL mode
+  does the same with integers, and CROSS_CHECK runs both and raises
+  MismatchError if they differ.
+  """
+  def _Build(self):
+    a = [self._Wire(ConnectionPoint.WRITER) for i in range(self._width)]
+    b = [self._Wire(ConnectionPoint.WRITER) for i in range(self._width)]
+    carry = self._Wire(ConnectionPoint.WRITER)
+    sums = [self._Wire(ConnectionPoint.READER) for i in range(self._width)]
+    for i in range(self._width):
+      partial, overflow_1, overflow_2 = Wire(), Wire(), Wire()
+      carry_out = i == self._width - 1 and self._Wire(ConnectionPoint.READER) or Wire()
+      self._Sum(a[i], b[i], partial, overflow_1)
+      self._Sum(partial, carry, sums[i], overflow_2)
+      self._Sum(overflow_1, overflow_2, carry_out, Wire())
+      carry = carry_out
+
+  def _Sum(self, in1, in2, out, overflow):
+    gate = GateSum()
+    gate.SetInputWire1(in1)
+    gate.SetInputWire2(in2)
+    gate.SetOutputWire(out)
+    gate.SetOverflowWire(overflow)
+
+  def Add(self, a, b, carry=NEUTRAL):
+    """Returns the sum of two TritWords as a TritWord, and the carry out trit."""
+    if a._width != self._width or b._width != self._width:
+      raise ValueError('Expected %d trit words' % self._width)
+    if carry not in VALID_STATES:
+      raise BadStateException(carry)
+    if self._mode != STRUCTURAL:
+      value = a._value + b._value + carry
+      carry_out = NEUTRAL
+      if value > self._limit:
+        value -= self._modulus
+        carry_out = PLUS
+      elif value < -self._limit:
+        value += self._modulus
+        carry_out = MINUS
+      result = (_Word(type(a), value, self._width), carry_out)
+      if self._mode == BEHAVIOURAL:
+        return result
+    readings = self._Drive(a.Trits() + b.Trits() + [carry])
+    structural = (type(a)(TritsValue(readings[:self._width]), self._width), readings[self._width])
+    if self._mode == CROSS_CHECK:
+      self._Check(structural, result, (a, b, carry))
+    return structural
+
+
+# sign(a - b) for two trits.
+COMPARE_TABLE = tuple(CompareValues(a, b) for a in TRITS for b in TRITS)
+# The more significant result if it is decided, otherwise the less significant.
+PRIORITY_TABLE = tuple(high or low for high in TRITS for low in TRITS)
+
+
+class Comparator(_Datapath):
+  """
+  Compares two N-trit words, giving (+) if the first is larger, (-) if it is
+  smaller and (0) if they are equal. In STRUCTURAL mode each trit pair is a
+  GateTable comparing the two trits, chained from the most significant trit
+  by GateTables that keep the first decided result.
+  """
+  def _Build(self):
+    a = [self._Wire(ConnectionPoint.WRITER) for i in range(self._width)]
+    b = [self._Wire(ConnectionPoint.WRITER) for i in range(self._width)]
+    result = None
+    for i in reversed(range(self._width)):
+      compare = GateTable(COMPARE_TABLE)
+      compare.SetInputWires([a[i], b[i]])
+      trit = i == 0 and result is None and self._Wire(ConnectionPoint.READER) or Wire()
+      compare.SetOutputWire(trit)
+      if result is not None:
+        priority = GateTable(PRIORITY_TABLE)
+        priority.SetInputWires([result, trit])
+        trit = i == 0 and self._Wire(ConnectionPoint.READER) or Wire()
+        priority.SetOutputWire(trit)
+      result = trit
+
+  def Compare(self, a, b):
+    if a._width != self._width or b._width != self._width:
+      raise ValueError('Expected %d trit words' % self._width)
+    if self._mode != STRUCTURAL:
+      result = (a._value > b._value) - (a._value < b._value)
+      if self._mode == BEHAVIOURAL:
+        return result
+    structural = self._Drive(a.Trits() + b.Trits())[0]
+    if self._mode == CROSS_CHECK:
+      self._Check(structural, result, (a, b))
+    return structural
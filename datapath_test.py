@@ -0,0 +1,111 @@
+from datapath import *
+import itertools
+import random
+import unittest
+
+
+class TestTritWord(unittest.TestCase):
+  def testTrits(self):
+    self.assertEqual([PLUS, MINUS, NEUTRAL], TritWord(-2, 3).Trits())
+    self.assertEqual([MINUS, MINUS, MINUS], TritWord(-13, 3).Trits())
+    self.assertEqual(PLUS, TritWord(-2, 3).Trit(0))
+    self.assertEqual(MINUS, TritWord(-2, 3).Trit(1))
+
+  def testRoundTrip(self):
+    for value in range(-121, 122):
+      word = TritWord(value, 5)
+      self.assertEqual(word, FromTrits(word.Trits()))
+
+  def testOverflow_Raises(self):
+    with self.assertRaises(OverflowError):
+      TritWord(14, 3)
+    with self.assertRaises(OverflowError):
+      ToTrits(-14, 3)
+
+  def testTryteWord(self):
+    word = TryteWord(9841)
+    self.assertEqual([PLUS] * 9, word.Trits())
+    self.assertEqual(TryteWord(-9841), -word)
+    self.assertEqual('TryteWord<--------->', str(-word))
+    with self.assertRaises(ValueError):
+      TryteWord(0, 27)
+
+  def testBadTrit_Raises(self):
+    with self.assertRaises(BadStateException):
+      FromTrits([PLUS, 2])
+
+
+class TestRippleAdder(unittest.TestCase):
+  def testAllPairs_CrossChecked(self):
+    adder = RippleAdder(2, CROSS_CHECK)
+    for (a, b, carry) in itertools.product(range(-4, 5), range(-4, 5), TRITS):
+      (result, carry_out) = adder.Add(TritWord(a, 2), TritWord(b, 2), carry)
+      self.assertEqual(a + b + carry, result.Value() + 9 * carry_out)
+
+  def testTryte_CrossChecked(self):
+    adder = RippleAdder(9, CROSS_CHECK)
+    rng = random.Random(12)
+    for i in range(200):
+      a = TryteWord(rng.randint(-9841, 9841))
+      b = TryteWord(rng.randint(-9841, 9841))
+      (result, carry) = adder.Add(a, b)
+      self.assertIsInstance(result, TryteWord)
+      self.assertEqual(a.Value() + b.Value(), result.Value() + 3 ** 9 * carry)
+
+  def test27Trits_CrossChecked(self):
+    adder = RippleAdder(27, CROSS_CHECK)
+    limit = (3 ** 27 - 1) // 2
+    rng = random.Random(27)
+    for i in range(50):
+      a = rng.randint(-limit, limit)
+      b = rng.randint(-limit, limit)
+      (result, carry) = adder.Add(TritWord(a, 27), TritWord(b, 27))
+      self.assertEqual(a + b, result.Value() + 3 ** 27 * carry)
+
+  def testBehavioural_Wraps(self):
+    adder = RippleAdder(9)
+    self.assertEqual((TryteWord(-9840), PLUS), adder.Add(TryteWord(9841), TryteWord(1), PLUS))
+    self.assertEqual((TryteWord(1), MINUS), adder.Add(TryteWord(-9841), TryteWord(-9841)))
+
+  def testMismatch_Raises(self):
+    adder = RippleAdder(3, CROSS_CHECK)
+    # Break the least significant sum wire so it always reads (+).
+    adder._readers[0]._wire.Disconnect(adder._readers[0])
+    adder._readers[0]._state = PLUS
+    with self.assertRaises(MismatchError):
+      adder.Add(TritWord(0, 3), TritWord(0, 3))
+
+  def testBadArguments_Raise(self):
+    with self.assertRaises(ValueError):
+      RippleAdder(9, 'fast')
+    with self.assertRaises(ValueError):
+      RippleAdder(9).Add(TritWord(0, 3), TritWord(0, 3))
+    for mode in (STRUCTURAL, BEHAVIOURAL, CROSS_CHECK):
+      with self.assertRaises(BadStateException):
+        RippleAdder(3, mode).Add(TritWord(1, 3), TritWord(1, 3), carry=2)
+
+
+class TestComparator(unittest.TestCase):
+  def testAllPairs_CrossChecked(self):
+    comparator = Comparator(2, CROSS_CHECK)
+    for (a, b) in itertools.product(range(-4, 5), repeat=2):
+      self.assertEqual((a > b) - (a < b), comparator.Compare(TritWord(a, 2), TritWord(b, 2)))
+
+  def test27Trits_Structural(self):
+    comparator = Comparator(27, STRUCTURAL)
+    limit = (3 ** 27 - 1) // 2
+    rng = random.Random(7)
+    for i in range(50):
+      a = rng.randint(-limit, limit)
+      b = rng.choice([a, rng.randint(-limit, limit), a + rng.choice([-1, 1])])
+      b = max(-limit, min(limit, b))
+      self.assertEqual(CompareValues(a, b), comparator.Compare(TritWord(a, 27), TritWord(b, 27)))
+
+  def testSingleTrit(self):
+    comparator = Comparator(1, STRUCTURAL)
+    for (a, b) in itertools.product(TRITS, repeat=2):
+      self.assertEqual(CompareValues(a, b), comparator.Compare(TritWord(a, 1), TritWord(b, 1)))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import random
+
+from packed import *
+
+MAX_EXHAUSTIVE = 20
+CHUNK_TRITS = 8
+
+
+class EquivalenceResult:
+  """
+  The outcome of comparing two circuits. When they differ, `counterexample` is
+  the first input vector found whose outputs differ, and `outputs` holds the
+  outputs of each circuit for it.
+  """
+  def __init__(self, equivalent, checked, total, exhaustive, counterexample=None, outputs=None):
+    self.equivalent = equivalent
+    self.checked = checked
+    self.total = total
+    self.exhaustive = exhaustive
+    self.counterexample = counterexample
+    self.outputs = outputs
+
+  def __bool__(self):
+    return self.equivalent
+
+  def __str__(self):
+    how = self.exhaustive and 'exhaustive' or 'sampled'
+    if self.equivalent:
+      return '%s<equivalent, %d/%d vectors %s>' % (type(self).__name__,
+          self.checked, self.total, how)
+    return '%s<differ at %s: %s != %s, after %d/%d vectors %s>' % (type(self).__name__,
+        ''.join(STATE_NAME[t][1] for t in self.counterexample),
+        ''.join(STATE_NAME[t][1] for t in self.outputs[0]),
+        ''.join(STATE_NAME[t][1] for t in self.outputs[1]),
+        self.checked, self.total, how)
+
+
+class _Checker:
+  """
+  Evaluates both circuits over chunks of input vectors, one vector per
+  PackedTrits lane. Exhaustive chunk k holds the 3 ** chunk_trits vectors
+  whose leading free inputs spell k in base 3, so chunks and lanes run in
+  TableIndex order. Sampled chunk k draws its vectors from its own seed.
+  """
+  def __init__(self, a, b, fixed, free, width, exhaustive, seed):
+    self._a = a
+    self._b = b
+    self._fixed = fixed
+    self._free = free
+    self._width = width
+    self._exhaustive = exhaustive
+    self._seed = seed
+    if exhaustive:
+      count = 0
+      while 3 ** count < width:
+        count += 1
+      self._low = AllPacked(count)
+      self._high = len(free) - count
+
+  def Inputs(self, chunk, width):
+    inputs = [None] * len(self._a.input_ids)
+    for (idx, value) in self._fixed.items():
+      inputs[idx] = Broadcast(value, width)
+    if self._exhaustive:
+      for (i, idx) in enumerate(reversed(self._free[:self._high])):
+        inputs[idx] = Broadcast(chunk // 3 ** i % 3 - 1, width)
+      for (idx, packed) in zip(self._free[self._high:], self._low):
+        inputs[idx] = packed
+    else:
+      rng = random.Random('%s:%d' % (self._seed, chunk))
+      for idx in self._free:
+        inputs[idx] = Pack(rng.choices(TRITS, k=width))
+    return inputs
+
+  def Check(self, chunk, width):
+    """None when both circuits agree on every lane of `chunk`, otherwise the
+    first differing vector and the outputs of each circuit for it."""
+    inputs = self.Inputs(chunk, width)
+    outputs_a = EvaluatePacked(self._a, inputs)
+    outputs_b = EvaluatePacked(self._b, inputs)
+    diff = 0
+    for (x, y) in zip(outputs_a, outputs_b):
+      diff |= (x.plus ^ y.plus) | (x.minus ^ y.minus)
+    if not diff:
+      return None
+    lane = (diff & -diff).bit_length() - 1
+    return (tuple(packed.Get(lane) for packed in inputs),
+        (tuple(packed.Get(lane) for packed in outputs_a),
+         tuple(packed.Get(lane) for packed in outputs_b)))
+
+
+_checker = None
+
+def _StartWorker(*args):
+  global _checker
+  _checker = _Checker(*args)
+
+def _CheckChunk(task):
+  (chunk, width) = task
+  return width, _checker.Check(chunk, width)
+
+
+def Equivalent(a, b, fixed=None, max_exhaustive=MAX_EXHAUSTIVE, samples=1 << 16,
+    seed=0, chunk_trits=CHUNK_TRITS, processes=1, progress=None):
+  """
+  Checks whether compiled Circuits `a` and `b` give the same outputs for the
+  same inputs, each evaluated from its current state as EvaluatePacked does.
+  Returns an EquivalenceResult, stopping at the first counterexample.
+
+  Inputs in `fixed`, a dict of input index to state, are held there. With at
+  most `max_exhaustive` other inputs every combination of them is checked;
+  with more, `samples` random vectors are drawn from `seed`. Vectors are
+  evaluated 3 ** chunk_trits at a time, with chunks spread over a
+  multiprocessing pool of `processes` workers (None for one per CPU).
+  `progress`, when given, is called with (vectors checked, total) after each
+  chunk.
+  """
+  if len(a.input_ids) != len(b.input_ids):
+    raise ConnectionError('Input counts differ: %d != %d' % (len(a.input_ids), len(b.input_ids)))
+  if len(a.output_ids) != len(b.output_ids):
+    raise ConnectionError('Output counts differ: %d != %d' % (len(a.output_ids), len(b.output_ids)))
+  fixed = dict(fixed or {})
+  for (idx, value) in fixed.items():
+    if not 0 <= idx < len(a.input_ids):
+      raise ConnectionError('No input %d' % idx)
+    if value not in TRITS:
+      raise BadStateException(value)
+  free = [idx for idx in range(len(a.input_ids)) if idx not in fixed]
+
+  exhaustive = len(free) <= max_exhaustive
+  if exhaustive:
+    total = 3 ** len(free)
+    width = 3 ** min(len(free), chunk_trits)
+  else:
+    total = samples
+    width = min(samples, 3 ** chunk_trits)
+  tasks = [(k, min(width, total - k * width)) for k in range(-(-total // width))]
+
+  processes = processes or os.cpu_count() or 1
+  args = (a, b, fixed, free, width, exhaustive, seed)
+  pool = None
+  if processes == 1 or len(tasks) == 1:
+    _StartWorker(*args)
+    results = map(_CheckChunk, tasks)
+  else:
+    pool = multiprocessing.Pool(min(processes, len(tasks)), _StartWorker, args)
+    results = pool.imap(_CheckChunk, tasks)
+  checked = 0
+  try:
+    for (lanes, found) in results:
+      if found:
+        (vector, outputs) = found
+        return EquivalenceResult(False, checked + lanes, total, exhaustive, vector, outputs)
+      checked += lanes
+      if progress:
+        progress(checked, total)
+  finally:
+    if pool:
+      pool.terminate()
+      pool.join()
+  return EquivalenceResult(True, checked, total, exhaustive)
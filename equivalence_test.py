@@ -0,0 +1,122 @@
+from equivalence import *
+import itertools
+import unittest
+
+
+def Wired(gate, count):
+  """A compiled gate with `count` inputs, output first then any overflow."""
+  inputs = [Wire() for i in range(count)]
+  outputs = [Wire(), Wire()]
+  if count == 1:
+    gate.SetInputWire(inputs[0])
+  else:
+    gate.SetInputWire1(inputs[0])
+    gate.SetInputWire2(inputs[1])
+  gate.SetOutputWire(outputs[0])
+  if isinstance(gate, GateSum):
+    gate.SetOverflowWire(outputs[1])
+  else:
+    outputs.pop()
+  return Compile(inputs, outputs)
+
+def Chain(cls, length):
+  """`length` gates of `cls` in a row, each also reading its own input."""
+  inputs = [Wire() for i in range(length + 1)]
+  wire = inputs[0]
+  for i in range(length):
+    gate = cls()
+    gate.SetInputWire1(wire)
+    gate.SetInputWire2(inputs[i + 1])
+    wire = Wire()
+    gate.SetOutputWire(wire)
+  return Compile(inputs, [wire])
+
+
+def Outputs(circuit, vector):
+  return tuple(packed.Get(0) for packed in EvaluatePacked(circuit, [Pack([v]) for v in vector]))
+
+
+class TestEquivalence(unittest.TestCase):
+  def testSumAlternate(self):
+    result = Equivalent(Wired(GateSum(), 2), Wired(GateSumAlternate(), 2))
+    self.assertTrue(result)
+    self.assertEqual((9, 9, True), (result.checked, result.total, result.exhaustive))
+    self.assertIn('equivalent, 9/9 vectors exhaustive', str(result))
+
+  def testCounterexample_IsFirst(self):
+    result = Equivalent(Wired(GateAnd(), 2), Wired(GateConsensus(), 2))
+    self.assertFalse(result)
+    expected = next(vector for vector in itertools.product(TRITS, repeat=2)
+        if TruthTable(GateAnd)[TableIndex(vector)] != TruthTable(GateConsensus)[TableIndex(vector)])
+    self.assertEqual(expected, result.counterexample)
+    self.assertEqual(((TruthTable(GateAnd)[TableIndex(expected)],),
+        (TruthTable(GateConsensus)[TableIndex(expected)],)), result.outputs)
+    self.assertIn('differ at', str(result))
+
+  def testChunks_StopAtCounterexample(self):
+    a = Chain(GateXor, 7)
+    b = Chain(GateXor, 7)
+    self.assertTrue(Equivalent(a, b, chunk_trits=3))
+    b.tables = [TruthTable(GateXnor) if table == TruthTable(GateXor) else table for table in b.tables]
+    seen = []
+    result = Equivalent(a, b, chunk_trits=3, progress=lambda done, total: seen.append(done))
+    self.assertFalse(result)
+    self.assertEqual(result.outputs, (Outputs(a, result.counterexample), Outputs(b, result.counterexample)))
+    self.assertNotEqual(*result.outputs)
+    self.assertEqual(27 * (len(seen) + 1), result.checked)
+    self.assertLess(result.checked, result.total)
+
+  def testProgress(self):
+    seen = []
+    result = Equivalent(Chain(GateOr, 4), Chain(GateOr, 4), chunk_trits=2,
+        progress=lambda done, total: seen.append((done, total)))
+    self.assertTrue(result)
+    self.assertEqual([(9 * k, 243) for k in range(1, 28)], seen)
+
+  def testFixed(self):
+    a = Wired(GateAnd(), 2)
+    b = Wired(GateOr(), 2)
+    self.assertFalse(Equivalent(a, b))
+    result = Equivalent(a, b, fixed={0: PLUS})
+    self.assertEqual((PLUS, MINUS), result.counterexample)
+    self.assertEqual(3, result.total)
+    with self.assertRaises(ConnectionError):
+      Equivalent(a, b, fixed={2: PLUS})
+    with self.assertRaises(BadStateException):
+      Equivalent(a, b, fixed={0: 2})
+
+  def testSampling(self):
+    a = Chain(GateXor, 9)
+    b = Chain(GateXor, 9)
+    result = Equivalent(a, b, max_exhaustive=4, samples=1000, chunk_trits=5)
+    self.assertTrue(result)
+    self.assertEqual((1000, 1000, False), (result.checked, result.total, result.exhaustive))
+    self.assertIn('sampled', str(result))
+
+    b.tables = [TruthTable(GateXnor) if table == TruthTable(GateXor) else table for table in b.tables]
+    result = Equivalent(a, b, max_exhaustive=4, samples=1000, chunk_trits=5)
+    self.assertFalse(result)
+    self.assertFalse(result.exhaustive)
+    self.assertEqual(10, len(result.counterexample))
+
+  def testProcessPool(self):
+    a = Chain(GateXor, 5)
+    b = Chain(GateXor, 5)
+    self.assertTrue(Equivalent(a, b, chunk_trits=2, processes=2))
+    b.tables = list(b.tables)
+    b.tables[b.cell_codes[0]] = TruthTable(GateXnor)
+    serial = Equivalent(a, b, chunk_trits=2, processes=1)
+    parallel = Equivalent(a, b, chunk_trits=2, processes=2)
+    self.assertFalse(parallel)
+    self.assertEqual(serial.counterexample, parallel.counterexample)
+    self.assertEqual(serial.checked, parallel.checked)
+
+  def testMismatchedCircuits_Raise(self):
+    with self.assertRaises(ConnectionError):
+      Equivalent(Wired(GateNegate(), 1), Wired(GateAnd(), 2))
+    with self.assertRaises(ConnectionError):
+      Equivalent(Wired(GateSum(), 2), Wired(GateAnd(), 2))
+
+
+if __name__ == '__main__':
+  unittest.main()
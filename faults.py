@@ -0,0 +1,177 @@
+import multiprocessing
+import os
+
+from packed import *
+
+
+def Faults(circuit):
+  """Every stuck-at fault of a compiled Circuit as (wire id, stuck state): each
+  input and each cell output stuck at (-), (0) and (+)."""
+  wires = dict.fromkeys(circuit.input_ids)
+  wires.update(dict.fromkeys(circuit.cell_outputs))
+  return [(wire, state) for wire in wires for state in TRITS]
+
+
+class FaultReport:
+  """
+  The faults a set of test vectors detects. `detected` maps each detected fault
+  to the index of the first vector whose outputs differ from the good circuit.
+  """
+  def __init__(self, faults, detected, vector_count):
+    self.faults = list(faults)
+    self.detected = detected
+    self.vector_count = vector_count
+
+  def Undetected(self):
+    return [fault for fault in self.faults if fault not in self.detected]
+
+  def Coverage(self):
+    return self.faults and len(self.detected) / len(self.faults) or 1.0
+
+  def __str__(self):
+    return '%s<%d/%d faults detected (%.1f%%) by %d vectors>' % (type(self).__name__,
+        len(self.detected), len(self.faults), 100 * self.Coverage(), self.vector_count)
+
+
+class _FaultSimulator:
+  """
+  Evaluates every test vector at once, one per PackedTrits lane, first for the
+  good circuit and then once per fault over only the cells the faulty wire
+  reaches. Each vector is evaluated from the circuit's current state, as
+  EvaluatePacked does.
+  """
+  def __init__(self, parts, vectors):
+    (wire_count, tables, cell_codes, cell_inputs, cell_outputs, input_ids,
+        output_ids, state) = parts
+    self._outputs = output_ids
+    self._program = []
+    for (code, ins, out) in zip(cell_codes, cell_inputs, cell_outputs):
+      table = tables[code]
+      self._program.append((PLANE_OPS.get(table), table, ins, out))
+    self._readers = {}
+    for (i, ins) in enumerate(cell_inputs):
+      for wire in ins:
+        self._readers.setdefault(wire, []).append(i)
+
+    width = len(vectors)
+    self._mask = (1 << width) - 1
+    inputs = [Pack([vector[j] for vector in vectors]) for j in range(len(input_ids))]
+    self._plus = [value == PLUS and self._mask or 0 for value in state]
+    self._minus = [value == MINUS and self._mask or 0 for value in state]
+    for (idx, packed) in zip(input_ids, inputs):
+      self._plus[idx] = packed.plus
+      self._minus[idx] = packed.minus
+    # Cells reading their own output (GateMem) read the value held before.
+    self._held = dict((out, (self._plus[out], self._minus[out]))
+        for (op, table, ins, out) in self._program if out in ins)
+    self._Evaluate(range(len(self._program)), self._plus, self._minus)
+
+  def _Evaluate(self, cells, plus, minus, stuck=None):
+    mask = self._mask
+    for i in cells:
+      (op, table, ins, out) = self._program[i]
+      if out == stuck:
+        continue
+      if op:
+        planes = []
+        for w in ins:
+          planes.append(plus[w])
+          planes.append(minus[w])
+        plus[out], minus[out] = op(*planes, mask)
+      else:
+        plus[out], minus[out] = TablePlanes(table, [(plus[w], minus[w]) for w in ins], mask)
+
+  def _Cone(self, wire):
+    """The cells reading `wire`, directly or through other cells, in order."""
+    cells = set()
+    pending = [wire]
+    while pending:
+      for i in self._readers.get(pending.pop(), ()):
+        if i not in cells:
+          cells.add(i)
+          pending.append(self._program[i][3])
+    return sorted(cells)
+
+  def Detect(self, fault):
+    """The first vector detecting `fault`, or None."""
+    (wire, state) = fault
+    plus = _Overlay(self._plus)
+    minus = _Overlay(self._minus)
+    plus[wire] = state == PLUS and self._mask or 0
+    minus[wire] = state == MINUS and self._mask or 0
+    if plus[wire] == self._plus[wire] and minus[wire] == self._minus[wire]:
+      return None
+    cone = self._Cone(wire)
+    for i in cone:
+      out = self._program[i][3]
+      if out in self._held and out != wire:
+        (plus[out], minus[out]) = self._held[out]
+    self._Evaluate(cone, plus, minus, wire)
+    diff = 0
+    for out in self._outputs:
+      diff |= (plus[out] ^ self._plus[out]) | (minus[out] ^ self._minus[out])
+    if not diff:
+      return None
+    return (diff & -diff).bit_length() - 1
+
+
+class _Overlay(dict):
+  """Changed wire planes over the good circuit's, which are left untouched."""
+  def __init__(self, base):
+    self.base = base
+
+  def __missing__(self, wire):
+    return self.base[wire]
+
+
+def _Parts(circuit):
+  # The picklable parts of a Circuit; its Wires stay behind.
+  return (circuit.wire_count, circuit.tables, circuit.cell_codes, circuit.cell_inputs,
+      circuit.cell_outputs, circuit.input_ids, circuit.output_ids, circuit.state)
+
+_worker = None
+
+def _StartWorker(parts, vectors):
+  global _worker
+  _worker = _FaultSimulator(parts, vectors)
+
+def _DetectChunk(faults):
+  return [(fault, _worker.Detect(fault)) for fault in faults]
+
+
+def Simulate(circuit, vectors, faults=None, processes=None, chunk_size=256):
+  """
+  Simulates stuck-at `faults` (by default every fault from Faults) of a
+  compiled Circuit against test `vectors`, one tuple of input states each, and
+  returns a FaultReport.
+
+  Faults are sharded in chunks across a multiprocessing pool of `processes`
+  workers, by default one per CPU. With a single process they are simulated
+  here.
+  """
+  if faults is None:
+    faults = Faults(circuit)
+  for vector in vectors:
+    if len(vector) != len(circuit.input_ids):
+      raise ConnectionError('Expected %d inputs, got %d' % (len(circuit.input_ids), len(vector)))
+  detected = {}
+  if not vectors:
+    return FaultReport(faults, detected, 0)
+
+  processes = processes or os.cpu_count() or 1
+  chunks = [faults[i:i + chunk_size] for i in range(0, len(faults), chunk_size)]
+  if processes == 1 or len(chunks) == 1:
+    _StartWorker(_Parts(circuit), vectors)
+    results = map(_DetectChunk, chunks)
+  else:
+    pool = multiprocessing.Pool(min(processes, len(chunks)), _StartWorker, (_Parts(circuit), vectors))
+    try:
+      results = pool.map(_DetectChunk, chunks)
+    finally:
+      pool.close()
+      pool.join()
+  for chunk in results:
+    for (fault, vector) in chunk:
+      if vector is not None:
+        detected[fault] = vector
+  return FaultReport(faults, detected, len(vectors))
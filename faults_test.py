@@ -0,0 +1,93 @@
+from faults import *
+import itertools
+import random
+import unittest
+
+
+def ReferenceDetect(circuit, fault, vectors):
+  """The first vector detecting `fault`, evaluating one vector at a time."""
+  (wire, stuck) = fault
+  for (n, vector) in enumerate(vectors):
+    good = list(circuit.state)
+    bad = list(circuit.state)
+    for (idx, value) in zip(circuit.input_ids, vector):
+      good[idx] = bad[idx] = value
+    bad[wire] = stuck
+    for (code, ins, out) in zip(circuit.cell_codes, circuit.cell_inputs, circuit.cell_outputs):
+      table = circuit.tables[code]
+      good[out] = table[TableIndex(good[i] for i in ins)]
+      if out != wire:
+        bad[out] = table[TableIndex(bad[i] for i in ins)]
+    if any(good[o] != bad[o] for o in circuit.output_ids):
+      return n
+  return None
+
+
+class TestFaults(unittest.TestCase):
+  def assertMatchesReference(self, circuit, vectors, processes=1):
+    report = Simulate(circuit, vectors, processes=processes, chunk_size=5)
+    expected = {}
+    for fault in Faults(circuit):
+      vector = ReferenceDetect(circuit, fault, vectors)
+      if vector is not None:
+        expected[fault] = vector
+    self.assertEqual(expected, report.detected)
+    return report
+
+  def setupAlternate(self):
+    gate = GateSumAlternate()
+    inputs = [Wire(), Wire()]
+    outputs = [Wire(), Wire()]
+    gate.SetInputWire1(inputs[0])
+    gate.SetInputWire2(inputs[1])
+    gate.SetOutputWire(outputs[0])
+    gate.SetOverflowWire(outputs[1])
+    return Compile(inputs, outputs)
+
+  def testFaults(self):
+    circuit = CompileGate(GateAnd())
+    self.assertEqual([(0, MINUS), (0, NEUTRAL), (0, PLUS), (1, MINUS), (1, NEUTRAL),
+        (1, PLUS), (2, MINUS), (2, NEUTRAL), (2, PLUS)], Faults(circuit))
+
+  def testGateSumAlternate_AllVectors(self):
+    circuit = self.setupAlternate()
+    report = self.assertMatchesReference(circuit, list(itertools.product(TRITS, repeat=2)))
+    self.assertEqual(1.0, report.Coverage())
+    self.assertEqual([], report.Undetected())
+
+  def testGateSumAlternate_FewVectors(self):
+    circuit = self.setupAlternate()
+    report = self.assertMatchesReference(circuit, [(NEUTRAL, NEUTRAL), (PLUS, MINUS)])
+    self.assertLess(report.Coverage(), 1.0)
+    self.assertIn('faults detected', str(report))
+
+  def testTableAndMem(self):
+    rng = random.Random(20)
+    table = GateTable(tuple(rng.choice(TRITS) for i in range(27)))
+    mem = GateMem()
+    inputs = [Wire() for i in range(4)]
+    (middle, output) = (Wire(), Wire())
+    table.SetInputWires(inputs[:3])
+    table.SetOutputWire(middle)
+    mem.SetInputWire1(middle)
+    mem.SetInputWire2(inputs[3])
+    mem.SetOutputWire(output)
+    mem._output._state = PLUS
+    circuit = Compile(inputs, [output])
+    vectors = [tuple(rng.choice(TRITS) for i in range(4)) for j in range(20)]
+    self.assertMatchesReference(circuit, vectors)
+
+  def testProcessPool(self):
+    circuit = self.setupAlternate()
+    vectors = list(itertools.product(TRITS, repeat=2))[::2]
+    serial = Simulate(circuit, vectors, processes=1, chunk_size=4)
+    parallel = Simulate(circuit, vectors, processes=2, chunk_size=4)
+    self.assertEqual(serial.detected, parallel.detected)
+
+  def testBadVector_Raises(self):
+    with self.assertRaises(ConnectionError):
+      Simulate(CompileGate(GateAnd()), [(PLUS,)])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -1,3 +1,4 @@
+import heapq
 import warnings
 from threading import Timer
 
@@ -14,6 +15,8 @@ STATE_NAME = {
 }
 
 DELAY_ENABLED = False
+# Propagate through a worklist of dirty gates rather than nested calls.
+WORKLIST_ENABLED = False
 
 class BadStateException(Exception):
   def __init__(self, badState):
@@ -24,6 +27,7 @@ class ConnectionError(ValueError):
 
 
 class ConnectionPoint:
+  __slots__ = ('_io', '_state', '_controller', '_wire')
   READER = MINUS
   WRITER = PLUS
   HIGH_IMPEDANCE = NEUTRAL
@@ -71,7 +75,10 @@ class ConnectionPoint:
     if self.IsReader():
       self._state = state
       if (self._controller):
-        self._controller.Update()
+        if WORKLIST_ENABLED:
+          WORKLIST.Mark(self._controller)
+        else:
+          self._controller.Update()
     else:
       warning.warn('Attempting to set the state of a write/high impedance')
 
@@ -80,6 +87,8 @@ class ConnectionPoint:
       self._state = state
       if self.HasWire():
         self._wire.Update()
+        if WORKLIST_ENABLED:
+          WORKLIST.Settle()
     else:
       warnings.warn('Attempting to SetStateWrite on a non-reading connection point')
 
@@ -88,52 +97,347 @@ class ConnectionPoint:
     return 'ConnectionPoint<%s,%s>' % (io, self.State())
 
 class Wire:
-  """Connection point of everything. """
+  """
+  Connection point of everything. Readers and writers are kept apart and
+  indexed as they connect, so an update goes straight from the driving writer
+  to the readers.
+  """
+  __slots__ = ('_connections', '_readers', '_writers', '_driver')
   def __init__(self):
-    self._connections = []
+    # Every connection in the order it was made, with readers and writers
+    # also indexed by role. Dicts keep that order with O(1) removal.
+    self._connections = {}
+    self._readers = {}
+    self._writers = {}
+    self._driver = None
 
   def Update(self):
-    write_states = [c.GetState() for c in self._connections if c.IsWriter()]
-    # No readers
-    if not write_states:
+    driver = self._driver
+    # No writers
+    if driver is None:
       return
 
-    if len(write_states) > 2:
+    if len(self._writers) > 2:
       warnings.warn('More than one writer on this wire, defaulting to first found value')
 
-    write_state = write_states[0]
-    for connection in self._connections:
-      if connection.IsReader():
-        connection.SetStateWire(write_state)
+    write_state = driver.GetState()
+    for reader in self._readers:
+      reader.SetStateWire(write_state)
+
+  def Driver(self):
+    """The writer whose state the wire carries: the first one connected."""
+    return self._driver
+
+  def Readers(self):
+    return list(self._readers)
+
+  def Writers(self):
+    return list(self._writers)
 
   # TODO: Consider doing checks here so that connections are determined
   # beforehand. This way we can disconnect or reconnect things as necessary.
   def Connect(self, connectable):
     if connectable in self._connections:
       raise ConnectionError('%s is already connected' % connectable)
-    self._connections.append(connectable)
     connectable.Connect(self)
+    self._connections[connectable] = None
+    if connectable.IsReader():
+      self._readers[connectable] = None
+    elif connectable.IsWriter():
+      self._writers[connectable] = None
+      if self._driver is None:
+        self._driver = connectable
 
   def Disconnect(self, connectable):
     if connectable not in self._connections:
       raise ConnectionError('%s is not connected' % connectable)
-    self._connections.pop(self._connections.index(connectable))
+    del self._connections[connectable]
+    self._readers.pop(connectable, None)
+    if connectable in self._writers:
+      del self._writers[connectable]
+      if connectable is self._driver:
+        self._driver = next(iter(self._writers), None)
     connectable.Disconnect()
 
   def DisconnectAll(self):
     for connection in self._connections:
       connection.Disconnect()
     self._connections.clear()
+    self._readers.clear()
+    self._writers.clear()
+    self._driver = None
 
   def __str__(self):
     return 'Wire<%d conns>' % len(self._connections)
 
 
+class Worklist:
+  """
+  Propagation used when WORKLIST_ENABLED is set. Readers mark their gates dirty
+  instead of updating them, and Settle drains the dirty gates one delta cycle
+  at a time: every gate marked during a cycle is updated once in the next, in
+  the order it was marked. The stack stays flat however deep the circuit is.
+  """
+  __slots__ = ('_dirty', '_settling', '_held')
+  def __init__(self):
+    self._dirty = {}
+    self._settling = False
+    self._held = 0
+
+  def Mark(self, gate):
+    self._dirty[gate] = None
+
+  def Settle(self):
+    """
+    Updates dirty gates until none are left. Returns the number of delta
+    cycles, or 0 when called while already settling or held.
+    """
+    if self._settling or self._held:
+      return 0
+    self._settling = True
+    deltas = 0
+    try:
+      while self._dirty:
+        dirty = self._dirty
+        self._dirty = {}
+        deltas += 1
+        for gate in dirty:
+          gate.Update()
+    finally:
+      self._settling = False
+    return deltas
+
+  def Hold(self):
+    """Makes Settle do nothing until a matching Release."""
+    self._held += 1
+
+  def Release(self):
+    self._held -= 1
+
+WORKLIST = Worklist()
+
+
+class Batch:
+  """
+  Propagates every write made inside `with Batch():` once, when the block
+  ends, instead of once per write. Writes mark the gates reading them dirty on
+  the worklist and the gates are updated in a single Settle, so a gate reading
+  several written wires is evaluated only with all of them set. Batches nest;
+  the outermost one settles.
+  """
+  __slots__ = ('_enabled', 'deltas')
+  def __init__(self):
+    self.deltas = 0
+
+  def __enter__(self):
+    global WORKLIST_ENABLED
+    self._enabled = WORKLIST_ENABLED
+    WORKLIST_ENABLED = True
+    WORKLIST.Hold()
+    return self
+
+  def __exit__(self, *exc_info):
+    global WORKLIST_ENABLED
+    WORKLIST.Release()
+    try:
+      self.deltas = WORKLIST.Settle()
+    finally:
+      WORKLIST_ENABLED = self._enabled
+
+def SetMany(states):
+  """
+  Writes {writer connection point or wire: state} in one Batch. A wire is
+  written through its driver. Returns the number of delta cycles it took to
+  settle.
+  """
+  writes = []
+  for (target, state) in states.items():
+    if state not in VALID_STATES:
+      raise BadStateException(state)
+    if isinstance(target, Wire):
+      if target.Driver() is None:
+        raise ConnectionError('%s has no writer' % target)
+      target = target.Driver()
+    elif not target.IsWriter():
+      raise ConnectionError('%s is not a writer' % target)
+    writes.append((target, state))
+  with Batch() as batch:
+    for (point, state) in writes:
+      point.SetStateWrite(state)
+  return batch.deltas
+
+
+class Scheduler:
+  """
+  Single threaded discrete event queue keyed on simulated time. Used for gate
+  delays when DELAY_ENABLED is set, and runs as fast as the events allow.
+
+  Writes to a connection point can use transport delay, where every change is
+  delivered in order, or inertial delay, where a new change cancels any still
+  pending on the same point so pulses shorter than the delay are swallowed.
+  """
+  def __init__(self):
+    self._now = 0
+    self._queue = []
+    self._count = 0
+    # point -> [generation, pending writes, last scheduled state]
+    self._pending = {}
+
+  def Now(self):
+    return self._now
+
+  def Pending(self):
+    return len(self._queue)
+
+  def ScheduleCall(self, delay, fn):
+    self._count += 1
+    heapq.heappush(self._queue, (self._now + delay, self._count, None, fn, 0))
+
+  def ScheduleWrite(self, point, state, delay, inertial=False):
+    entry = self._pending.get(point)
+    if inertial:
+      # Drop whatever is still in flight for this point.
+      if entry:
+        del self._pending[point]
+        entry = None
+      if point.GetState() == state: return
+    elif (entry[2] if entry else point.GetState()) == state:
+      return
+
+    self._count += 1
+    if not entry:
+      entry = self._pending[point] = [self._count, 0, state]
+    entry[1] += 1
+    entry[2] = state
+    heapq.heappush(self._queue, (self._now + delay, self._count, point, state, entry[0]))
+
+  def Step(self):
+    """Runs the next event. Returns False if there was nothing to run."""
+    while self._queue:
+      (time, _, point, action, generation) = heapq.heappop(self._queue)
+      if point is None:
+        self._now = time
+        action()
+        return True
+      entry = self._pending.get(point)
+      if not entry or entry[0] != generation:
+        # Cancelled by an inertial write.
+        continue
+      entry[1] -= 1
+      if not entry[1]:
+        del self._pending[point]
+      self._now = time
+      point.SetStateWrite(action)
+      return True
+    return False
+
+  def _NextTime(self):
+    """
+    The time of the next event to run, or None. Writes cancelled by an inertial
+    write are dropped from the head of the queue first, so they never stand
+    in for a later event.
+    """
+    queue = self._queue
+    while queue:
+      (time, _, point, action, generation) = queue[0]
+      if point is not None:
+        entry = self._pending.get(point)
+        if not entry or entry[0] != generation:
+          heapq.heappop(queue)
+          continue
+      return time
+    return None
+
+  def Skip(self, delay):
+    """Moves simulated time and every pending event forward by `delay`."""
+    self._now += delay
+    self._queue = [(event[0] + delay,) + event[1:] for event in self._queue]
+
+  def Run(self, until=None):
+    """
+    Runs events in time order, up to and including `until`, or until the queue
+    is empty. Returns the number of events run.
+    """
+    count = 0
+    while True:
+      time = self._NextTime()
+      if time is None or (until is not None and time > until):
+        break
+      count += self.Step()
+    if until is not None and until > self._now:
+      self._now = until
+    return count
+
+  def __str__(self):
+    return '%s<now: %s, pending: %d>' % (type(self).__name__, self._now, self.Pending())
+
+SCHEDULER = Scheduler()
+
+
+def ReachablePoints(wires):
+  """
+  Every connection point reachable from `wires` through wires and the gates
+  controlling them, in discovery order. Returns None if a controller does not
+  list its ConnectionPoints.
+  """
+  points = {}
+  seen = set()
+  pending = list(wires)
+  while pending:
+    wire = pending.pop()
+    if wire in seen:
+      continue
+    seen.add(wire)
+    for point in wire._connections:
+      if point in points:
+        continue
+      points[point] = None
+      if not point._controller:
+        continue
+      if not hasattr(point._controller, 'ConnectionPoints'):
+        return None
+      for p in point._controller.ConnectionPoints():
+        points[p] = None
+        if p.HasWire():
+          pending.append(p._wire)
+  return list(points)
+
+def Unhook(obj, layer):
+  """
+  Takes the class hooked in as `layer` out of the class of `obj`, keeping the
+  hooks put over it since. Tools like the Tracer and Profiler hook objects by
+  swapping in a subclass with `_hook_layer` set, and `_hook_build` building
+  the same hook over another class. Does nothing if `layer` is not hooked.
+  """
+  above = []
+  cls = type(obj)
+  while cls.__dict__.get('_hook_layer') != layer:
+    if '_hook_layer' not in cls.__dict__:
+      return
+    above.append(cls)
+    cls = cls.__base__
+  cls = cls.__base__
+  for hooked in reversed(above):
+    cls = hooked._hook_build(cls)
+  obj.__class__ = cls
+
+
 class GateMonadic:
+  __slots__ = ('_input', '_output', '_delay', '_inertial')
   def __init__(self):
     self._input = ConnectionPoint(ConnectionPoint.READER, self)
     self._output = ConnectionPoint(ConnectionPoint.WRITER, self)
     self._delay = 0
+    self._inertial = False
+
+  def SetDelay(self, delay, inertial=False):
+    """
+    Args:
+      delay: Simulated time between an input change and the output change.
+      inertial: Whether output changes shorter than the delay are swallowed.
+    """
+    self._delay = delay
+    self._inertial = inertial
 
   def SetInputWire(self, wire):
     wire.Connect(self._input)
@@ -142,17 +446,20 @@ class GateMonadic:
     wire.Connect(self._output)
 
   def SetOutputState(self, state):
+    if DELAY_ENABLED:
+      SCHEDULER.ScheduleWrite(self._output, state, self._delay, self._inertial)
+      return
+
     # Output is already at the current state, no need to do anything.
     if self._output.GetState() == state: return
-
-    if DELAY_ENABLED:
-      Timer(self._delay, lambda: self._output.SetStateWrite(state))
-    else:
-      self._output.SetStateWrite(state)
+    self._output.SetStateWrite(state)
 
   def ReadOutput(self):
     return self._output.GetState()
 
+  def ConnectionPoints(self):
+    return (self._input, self._output)
+
   def Update(self):
     raise NotImplementedError('Update not implemented for %s' % type(self).__name__)
 
@@ -161,6 +468,12 @@ class GateMonadic:
         (type(self).__name__, self._input.State(), self._output.State())
 
 class GateIdentity(GateMonadic):
+  __slots__ = ()
+  LOGIC_MAP = {
+    PLUS: PLUS,
+    NEUTRAL: NEUTRAL,
+    MINUS: MINUS,
+  }
   def Update(self):
     val = self._input.GetState()
     self.SetOutputState(val)
@@ -172,6 +485,7 @@ class GateIncrement(GateMonadic):
   (0) | (+)
   (+) | (-)
   """
+  __slots__ = ()
   LOGIC_MAP = {
     PLUS: MINUS,
     NEUTRAL: PLUS,
@@ -188,6 +502,7 @@ class GateDecrement(GateMonadic):
   (0) | (-)
   (+) | (0)
   """
+  __slots__ = ()
   LOGIC_MAP = {
     PLUS: NEUTRAL,
     NEUTRAL: MINUS,
@@ -204,6 +519,7 @@ class GateNegate(GateMonadic):
   (0) | (0)
   (+) | (-)
   """
+  __slots__ = ()
   LOGIC_MAP = {
     PLUS: MINUS,
     NEUTRAL: NEUTRAL,
@@ -220,6 +536,7 @@ class GateIsHigh(GateMonadic):
   (0) | (-)
   (+) | (+)
   """
+  __slots__ = ()
   LOGIC_MAP = {
     PLUS: PLUS,
     NEUTRAL: MINUS,
@@ -236,6 +553,7 @@ class GateIsNeutral(GateMonadic):
   (0) | (+)
   (+) | (-)
   """
+  __slots__ = ()
   LOGIC_MAP = {
     PLUS: MINUS,
     NEUTRAL: PLUS,
@@ -252,6 +570,7 @@ class GateIsLow(GateMonadic):
   (0) | (-)
   (+) | (-)
   """
+  __slots__ = ()
   LOGIC_MAP = {
     PLUS: MINUS,
     NEUTRAL: MINUS,
@@ -263,11 +582,22 @@ class GateIsLow(GateMonadic):
 
 
 class GateDiadic:
+  __slots__ = ('_input1', '_input2', '_output', '_delay', '_inertial')
   def __init__(self):
     self._input1 = ConnectionPoint(ConnectionPoint.READER, self)
     self._input2 = ConnectionPoint(ConnectionPoint.READER, self)
     self._output = ConnectionPoint(ConnectionPoint.WRITER, self)
     self._delay = 0
+    self._inertial = False
+
+  def SetDelay(self, delay, inertial=False):
+    """
+    Args:
+      delay: Simulated time between an input change and the output change.
+      inertial: Whether output changes shorter than the delay are swallowed.
+    """
+    self._delay = delay
+    self._inertial = inertial
 
   def SetInputWire1(self, wire):
     wire.Connect(self._input1)
@@ -279,17 +609,20 @@ class GateDiadic:
     wire.Connect(self._output)
 
   def SetOutputState(self, state):
+    if DELAY_ENABLED:
+      SCHEDULER.ScheduleWrite(self._output, state, self._delay, self._inertial)
+      return
+
     # Output is already at the current state, no need to do anything.
     if self._output.GetState() == state: return
-
-    if DELAY_ENABLED:
-      Timer(self._delay, lambda: self._output.SetStateWrite(state))
-    else:
-      self._output.SetStateWrite(state)
+    self._output.SetStateWrite(state)
 
   def ReadOutput(self):
     return self._output.GetState()
 
+  def ConnectionPoints(self):
+    return (self._input1, self._input2, self._output)
+
   def Update(self):
     raise NotImplementedError('Update not implemented for %s' % type(self).__name__)
 
@@ -307,18 +640,26 @@ class GateAnd(GateDiadic):
   (0) | (0) (0) (-)
   (-) | (-) (-) (-)
   """
+  __slots__ = ()
+  LOGIC_MAP = {
+    (PLUS, PLUS): PLUS,
+    (PLUS, NEUTRAL): NEUTRAL,
+    (PLUS, MINUS): MINUS,
+    (NEUTRAL, PLUS): NEUTRAL,
+    (NEUTRAL, NEUTRAL): NEUTRAL,
+    (NEUTRAL, MINUS): MINUS,
+    (MINUS, PLUS): MINUS,
+    (MINUS, NEUTRAL): MINUS,
+    (MINUS, MINUS): MINUS,
+  }
   def Update(self):
     read1 = self._input1.GetState()
     read2 = self._input2.GetState()
-    value = PLUS
-    if read1 is MINUS or read2 is MINUS:
-      value = MINUS
-    elif read1 is NEUTRAL or read2 is NEUTRAL:
-      value = NEUTRAL
-    self.SetOutputState(value)
+    self.SetOutputState(GateAnd.LOGIC_MAP[(read1, read2)])
 
 
 class GateNand(GateAnd):
+  __slots__ = ()
   def SetOutputState(self, value):
     super().SetOutputState(GateNegate.LOGIC_MAP[value])
 
@@ -331,17 +672,25 @@ class GateOr(GateDiadic):
   (0) | (+) (0) (0)
   (-) | (+) (0) (-)
   """
+  __slots__ = ()
+  LOGIC_MAP = {
+    (PLUS, PLUS): PLUS,
+    (PLUS, NEUTRAL): PLUS,
+    (PLUS, MINUS): PLUS,
+    (NEUTRAL, PLUS): PLUS,
+    (NEUTRAL, NEUTRAL): NEUTRAL,
+    (NEUTRAL, MINUS): NEUTRAL,
+    (MINUS, PLUS): PLUS,
+    (MINUS, NEUTRAL): NEUTRAL,
+    (MINUS, MINUS): MINUS,
+  }
   def Update(self):
     read1 = self._input1.GetState()
     read2 = self._input2.GetState()
-    value = MINUS
-    if read1 is PLUS or read2 is PLUS:
-      value = PLUS
-    elif read1 is NEUTRAL or read2 is NEUTRAL:
-      value = NEUTRAL
-    self.SetOutputState(value)
+    self.SetOutputState(GateOr.LOGIC_MAP[(read1, read2)])
 
 class GateNor(GateOr):
+  __slots__ = ()
   def SetOutputState(self, value):
     super().SetOutputState(GateNegate.LOGIC_MAP[value])
 
@@ -356,17 +705,25 @@ class GateXor(GateDiadic):
   (0) | (0) (0) (0)
   (-) | (+) (0) (-)
   """
+  __slots__ = ()
+  LOGIC_MAP = {
+    (PLUS, PLUS): MINUS,
+    (PLUS, NEUTRAL): NEUTRAL,
+    (PLUS, MINUS): PLUS,
+    (NEUTRAL, PLUS): NEUTRAL,
+    (NEUTRAL, NEUTRAL): NEUTRAL,
+    (NEUTRAL, MINUS): NEUTRAL,
+    (MINUS, PLUS): PLUS,
+    (MINUS, NEUTRAL): NEUTRAL,
+    (MINUS, MINUS): MINUS,
+  }
   def Update(self):
     read1 = self._input1.GetState()
     read2 = self._input2.GetState()
-    value = MINUS
-    if read1 is NEUTRAL or read2 is NEUTRAL:
-      value = NEUTRAL
-    elif read1 is not read2:
-      value = PLUS
-    self.SetOutputState(value)
+    self.SetOutputState(GateXor.LOGIC_MAP[(read1, read2)])
 
 class GateXnor(GateXor):
+  __slots__ = ()
   def SetOutputState(self, value):
     super().SetOutputState(GateNegate.LOGIC_MAP[value])
 
@@ -383,11 +740,22 @@ class GateConsensus(GateDiadic):
   (0) | (0) (0) (0)
   (-) | (0) (0) (-)
   """
+  __slots__ = ()
+  LOGIC_MAP = {
+    (PLUS, PLUS): PLUS,
+    (PLUS, NEUTRAL): NEUTRAL,
+    (PLUS, MINUS): NEUTRAL,
+    (NEUTRAL, PLUS): NEUTRAL,
+    (NEUTRAL, NEUTRAL): NEUTRAL,
+    (NEUTRAL, MINUS): NEUTRAL,
+    (MINUS, PLUS): NEUTRAL,
+    (MINUS, NEUTRAL): NEUTRAL,
+    (MINUS, MINUS): MINUS,
+  }
   def Update(self):
     read1 = self._input1.GetState()
     read2 = self._input2.GetState()
-    value = read1 == read2 and read1 or NEUTRAL
-    self.SetOutputState(value)
+    self.SetOutputState(GateConsensus.LOGIC_MAP[(read1, read2)])
 
 
 class GateSum(GateDiadic):
@@ -407,6 +775,7 @@ class GateSum(GateDiadic):
   (-) | (0) (0) (-)
 
   """
+  __slots__ = ('_overflow',)
   LOGIC_MAP = {
     (PLUS, PLUS): MINUS,
     (PLUS, NEUTRAL): PLUS,
@@ -421,11 +790,14 @@ class GateSum(GateDiadic):
 
   def __init__(self):
     super().__init__()
-    self._overflow = ConnectionPoint(ConnectionPoint.WRITER)
+    self._overflow = ConnectionPoint(ConnectionPoint.WRITER, self)
 
   def SetOverflowWire(self, wire):
     wire.Connect(self._overflow)
 
+  def ConnectionPoints(self):
+    return (self._input1, self._input2, self._output, self._overflow)
+
   def Update(self):
     read1 = self._input1.GetState()
     read2 = self._input2.GetState()
@@ -434,13 +806,13 @@ class GateSum(GateDiadic):
     self.SetOverflowState(overflow)
 
   def SetOverflowState(self, state):
+    if DELAY_ENABLED:
+      SCHEDULER.ScheduleWrite(self._overflow, state, self._delay, self._inertial)
+      return
+
     # Output is already at the current state, no need to do anything.
     if self._overflow.GetState() == state: return
-
-    if DELAY_ENABLED:
-      Timer(self._delay, lambda: self._overflow.SetStateWrite(state))
-    else:
-      self._overflow.SetStateWrite(state)
+    self._overflow.SetStateWrite(state)
 
 
 class GateSumAlternate(GateSum):
@@ -462,6 +834,7 @@ class GateSumAlternate(GateSum):
   sum = ((a = -1) ^ (b - 1)) v ((a = 0) ^ b) v ((a = 1) ^ (b + 1))
   overflow = consensus(a, b)
   """
+  __slots__ = ('_identity_a', '_identity_b', '_output_gate', '_overflow_gate')
   def __init__(self):
     super().__init__()
     wires = [Wire() for i in range(11)]
@@ -552,6 +925,7 @@ class GateMem(GateDiadic):
   (-) | (-) (0) (+)
 
   """
+  __slots__ = ()
   def Update(self):
     read2 = self._input2.GetState()
     if read2 == NEUTRAL:
@@ -563,7 +937,145 @@ class GateMem(GateDiadic):
     else:
       self.SetOutputState(GateNegate.LOGIC_MAP[read1])
 
+
+# Truth tables are flat tuples indexed by the base 3 encoding of the inputs,
+# first input most significant, with (-) as 0, (0) as 1 and (+) as 2.
+TRITS = (MINUS, NEUTRAL, PLUS)
+
+def TableIndex(values):
+  idx = 0
+  for value in values:
+    idx = 3 * idx + value + 1
+  return idx
+
+def MonadicTable(logic_map):
+  return tuple(logic_map[a] for a in TRITS)
+
+def DiadicTable(logic_map):
+  return tuple(logic_map[(a, b)] for a in TRITS for b in TRITS)
+
+def Compose(monadic_table, table):
+  """Table of `table` followed by the monadic gate `monadic_table`."""
+  return tuple(monadic_table[t + 1] for t in table)
+
+NEGATE_TABLE = MonadicTable(GateNegate.LOGIC_MAP)
+
+# Inputs are (input1, input2, previous output).
+MEM_TABLE = tuple(
+    prev if i2 == NEUTRAL else i1 if i2 == PLUS else GateNegate.LOGIC_MAP[i1]
+    for i1 in TRITS for i2 in TRITS for prev in TRITS)
+
+TRUTH_TABLES = {
+  GateIdentity: MonadicTable(GateIdentity.LOGIC_MAP),
+  GateIncrement: MonadicTable(GateIncrement.LOGIC_MAP),
+  GateDecrement: MonadicTable(GateDecrement.LOGIC_MAP),
+  GateNegate: NEGATE_TABLE,
+  GateIsHigh: MonadicTable(GateIsHigh.LOGIC_MAP),
+  GateIsNeutral: MonadicTable(GateIsNeutral.LOGIC_MAP),
+  GateIsLow: MonadicTable(GateIsLow.LOGIC_MAP),
+  GateAnd: DiadicTable(GateAnd.LOGIC_MAP),
+  GateNand: Compose(NEGATE_TABLE, DiadicTable(GateAnd.LOGIC_MAP)),
+  GateOr: DiadicTable(GateOr.LOGIC_MAP),
+  GateNor: Compose(NEGATE_TABLE, DiadicTable(GateOr.LOGIC_MAP)),
+  GateXor: DiadicTable(GateXor.LOGIC_MAP),
+  GateXnor: Compose(NEGATE_TABLE, DiadicTable(GateXor.LOGIC_MAP)),
+  GateConsensus: DiadicTable(GateConsensus.LOGIC_MAP),
+  GateSum: DiadicTable(GateSum.LOGIC_MAP),
+  GateMem: MEM_TABLE,
+}
+
+def TruthTable(gate_type):
+  """
+  The flat truth table of a gate class. GateSum's is its sum output, its
+  overflow being GateConsensus. GateMem's has a third input for the value it
+  holds, which is its own output. Raises KeyError for classes without one.
+  """
+  for cls in gate_type.__mro__:
+    if cls in TRUTH_TABLES:
+      return TRUTH_TABLES[cls]
+  raise KeyError('No truth table for %s' % gate_type.__name__)
+
+def Fuse(gate_type, monadic_type):
+  """The table of `gate_type` followed by a `monadic_type` gate."""
+  return Compose(TruthTable(monadic_type), TruthTable(gate_type))
+
+
+class GateTable:
+  """
+  A gate with any number of inputs whose output is looked up in a flat truth
+  table. Every gate above can be built as one, e.g. GateTable(TruthTable(GateAnd))
+  or GateTable(Fuse(GateAnd, GateNegate)) for a GateNand.
+  """
+  __slots__ = ('_inputs', '_output', '_table', '_delay', '_inertial')
+  def __init__(self, table):
+    count = 0
+    while 3 ** count < len(table):
+      count += 1
+    if not count or 3 ** count != len(table):
+      raise ValueError('Table length %d is not a power of 3' % len(table))
+    for state in table:
+      if state not in VALID_STATES:
+        raise BadStateException(state)
+    self._table = tuple(table)
+    self._inputs = tuple(ConnectionPoint(ConnectionPoint.READER, self) for i in range(count))
+    self._output = ConnectionPoint(ConnectionPoint.WRITER, self)
+    self._delay = 0
+    self._inertial = False
+
+  def Table(self):
+    return self._table
+
+  def InputCount(self):
+    return len(self._inputs)
+
+  def SetDelay(self, delay, inertial=False):
+    self._delay = delay
+    self._inertial = inertial
+
+  def SetInputWireAt(self, idx, wire):
+    try:
+      point = self._inputs[idx]
+    except IndexError as e:
+      raise ConnectionError('Index not in range [0,%d]: %d' % (len(self._inputs) - 1, idx))
+    wire.Connect(point)
+
+  def SetInputWires(self, wires):
+    if len(wires) > len(self._inputs):
+      raise ConnectionError('Cannot attach %d wires to %d inputs' % (len(wires), len(self._inputs)))
+    for (wire, point) in zip(wires, self._inputs):
+      wire.Connect(point)
+
+  def SetOutputWire(self, wire):
+    wire.Connect(self._output)
+
+  def SetOutputState(self, state):
+    if DELAY_ENABLED:
+      SCHEDULER.ScheduleWrite(self._output, state, self._delay, self._inertial)
+      return
+
+    # Output is already at the current state, no need to do anything.
+    if self._output.GetState() == state: return
+    self._output.SetStateWrite(state)
+
+  def ReadOutput(self):
+    return self._output.GetState()
+
+  def ConnectionPoints(self):
+    return self._inputs + (self._output,)
+
+  def Update(self):
+    idx = 0
+    for point in self._inputs:
+      idx = 3 * idx + point._state + 1
+    self.SetOutputState(self._table[idx])
+
+  def __str__(self):
+    return '%s<I: %s, O: %s>' % (type(self).__name__,
+        ','.join(point.State() for point in self._inputs), self._output.State())
+
+
 class Tryte:
+  __slots__ = ('_mems', '_read')
   def __init__(self):
     self._mems = [GateMem() for i in range(9)]
     self._read = GateIdentity()
@@ -614,29 +1126,90 @@ class Oscillator:
 
   Default frequency is 19683 (3 ** 9)Hz.
   """
+  __slots__ = ('_period', '_output', '_idx', '_ticks', '_debug', '_timer_class', '_scheduler')
   PATTERN = [NEUTRAL, PLUS, NEUTRAL, MINUS]
 
-  def __init__(self, frequency=3**9, timer=Timer, debug=False):
+  def __init__(self, frequency=3**9, timer=Timer, debug=False, scheduler=None):
+    """
+    Args:
+      frequency: Full cycles per second.
+      timer: Timer class used to schedule the next tick in real time. If None
+        the clock only moves when RunCycles is called.
+      scheduler: A Scheduler to tick on in simulated time instead of a timer.
+    """
     self._period = 1 / frequency / len(Oscillator.PATTERN)
     self._output = ConnectionPoint(ConnectionPoint.WRITER)
     self._idx = 0
+    self._ticks = 0
     self._debug = debug
     self._timer_class = timer
+    self._scheduler = scheduler
     self.Update()
 
   def Update(self):
-    self._timer_class(self._period, self.Update).start()
+    if self._scheduler:
+      self._scheduler.ScheduleCall(self._period, self.Update)
+    elif self._timer_class:
+      self._timer_class(self._period, self.Update).start()
+    self.Tick()
+
+  def Tick(self):
     self._output.SetStateWrite(Oscillator.PATTERN[self._idx])
     self._idx = (self._idx + 1) % len(Oscillator.PATTERN)
+    self._ticks += 1
     if (self._debug):
       print(STATE_NAME[self._output.GetState()])
 
+  def RunCycles(self, cycles, fast_forward=False):
+    """
+    Advances the clock by `cycles` full periods without any threads, either on
+    its scheduler or by ticking directly.
+
+    With fast_forward, once a whole cycle ends with every downstream connection
+    point in the same state as the cycle before (and no delayed writes in
+    flight) the circuit is known to repeat itself, so the remaining cycles are
+    skipped.
+    """
+    ticks_per_cycle = len(Oscillator.PATTERN)
+    target = self._ticks + cycles * ticks_per_cycle
+    points = None
+    if fast_forward and self._output.HasWire():
+      points = ReachablePoints([self._output._wire])
+    last = None
+    checked = None
+    while self._ticks < target:
+      if points is not None and self._ticks != checked and \
+          (target - self._ticks) % ticks_per_cycle == 0:
+        checked = self._ticks
+        current = [p._state for p in points]
+        if current == last and self._Idle():
+          self._Skip(target - self._ticks)
+          break
+        last = current
+      if self._scheduler:
+        if not self._scheduler.Step():
+          break
+      else:
+        self.Tick()
+
+  def _Idle(self):
+    # Only the next tick may be waiting.
+    return not self._scheduler or self._scheduler.Pending() == 1
+
+  def _Skip(self, ticks):
+    self._ticks += ticks
+    if self._scheduler:
+      self._scheduler.Skip(ticks * self._period)
+
   def SetOutputWire(self, wire):
     wire.Connect(self._output)
 
   def ReadOutput(self):
     return self._output.GetState()
 
+  def Ticks(self):
+    return self._ticks
+
   def __str__(self):
     return '%s<period: %d, state: %s>' % (type(self).__name__, self._period, STATE_NAME[self.ReadOutput()])
 
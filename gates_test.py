@@ -1,4 +1,6 @@
 from gates import *
+import gates
+import itertools
 import unittest
 
 class TestConnections(unittest.TestCase):
@@ -17,6 +19,64 @@ class TestConnections(unittest.TestCase):
     self.assertEqual(NEUTRAL, reading.GetState(), 'Reader should change to writer value')
     self.assertEqual(MINUS, ignoring.GetState(), 'High Impedance should not change')
 
+  def testWire_FirstWriterDrives(self):
+    writer_1 = ConnectionPoint(ConnectionPoint.WRITER, state=PLUS)
+    writer_2 = ConnectionPoint(ConnectionPoint.WRITER, state=MINUS)
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    wire = Wire()
+    wire.Connect(reader)
+    wire.Connect(writer_1)
+    wire.Connect(writer_2)
+    self.assertIs(writer_1, wire.Driver())
+
+    writer_2.SetStateWrite(MINUS)
+    self.assertEqual(PLUS, reader.GetState(), 'First writer should drive the wire')
+
+    wire.Disconnect(writer_1)
+    self.assertIs(writer_2, wire.Driver())
+    writer_2.SetStateWrite(NEUTRAL)
+    self.assertEqual(NEUTRAL, reader.GetState(), 'Remaining writer should drive the wire')
+
+    wire.Disconnect(writer_2)
+    self.assertIsNone(wire.Driver())
+
+  def testWire_Disconnect(self):
+    writer = ConnectionPoint(ConnectionPoint.WRITER)
+    readers = [ConnectionPoint(ConnectionPoint.READER) for i in range(1000)]
+    wire = Wire()
+    wire.Connect(writer)
+    for reader in readers:
+      wire.Connect(reader)
+    for reader in readers[::2]:
+      wire.Disconnect(reader)
+    self.assertEqual(501, len(wire.Writers() + wire.Readers()))
+
+    writer.SetStateWrite(PLUS)
+    self.assertEqual([NEUTRAL, PLUS] * 500, [reader.GetState() for reader in readers])
+    self.assertFalse(readers[0].HasWire())
+
+    with self.assertRaises(ConnectionError):
+      wire.Disconnect(readers[0])
+    with self.assertRaises(ConnectionError):
+      wire.Connect(readers[1])
+
+  def testWire_ConnectFailureLeavesWireUnchanged(self):
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    Wire().Connect(reader)
+    wire = Wire()
+    with self.assertRaises(ConnectionError):
+      wire.Connect(reader)
+    self.assertEqual([], wire.Readers())
+
+  def testSlots_NoInstanceDict(self):
+    objects = [ConnectionPoint(), Wire(), Tryte(), Oscillator(1, timer=None)]
+    objects.extend(gate_type() for gate_type in [
+        GateIdentity, GateIncrement, GateDecrement, GateNegate, GateIsHigh,
+        GateIsNeutral, GateIsLow, GateAnd, GateNand, GateOr, GateNor, GateXor,
+        GateXnor, GateConsensus, GateSum, GateSumAlternate, GateMem])
+    for obj in objects:
+      self.assertFalse(hasattr(obj, '__dict__'), '%s has an instance __dict__' % type(obj).__name__)
+
 
 class TestMonadicGates(unittest.TestCase):
   def setupMonadic(self, gate_class):
@@ -240,6 +300,98 @@ class TestDiadicGates(unittest.TestCase):
       self.assertEqual(out, result, '%s expected %s' %  (gate, STATE_NAME[out]))
 
 
+class TestGateTable(unittest.TestCase):
+  def setupTable(self, table):
+    gate = GateTable(table)
+    writers = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(gate.InputCount())]
+    inwires = [Wire() for writer in writers]
+    for (writer, wire) in zip(writers, inwires):
+      wire.Connect(writer)
+    gate.SetInputWires(inwires)
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    outwire = Wire()
+    outwire.Connect(reader)
+    gate.SetOutputWire(outwire)
+    return (writers, reader, gate)
+
+  def testMonadicGates_AsTables(self):
+    for gate_type in [GateIdentity, GateIncrement, GateDecrement, GateNegate,
+        GateIsHigh, GateIsNeutral, GateIsLow]:
+      writers, reader, gate = self.setupTable(TruthTable(gate_type))
+      for value in (PLUS, NEUTRAL, MINUS):
+        writers[0].SetStateWrite(value)
+        self.assertEqual(gate_type.LOGIC_MAP[value], reader.GetState(), gate)
+
+  def testDiadicGates_AsTables(self):
+    for gate_type in [GateAnd, GateOr, GateXor, GateConsensus, GateSum]:
+      writers, reader, gate = self.setupTable(TruthTable(gate_type))
+      for in1 in (PLUS, NEUTRAL, MINUS):
+        for in2 in (PLUS, NEUTRAL, MINUS):
+          writers[0].SetStateWrite(in1)
+          writers[1].SetStateWrite(in2)
+          self.assertEqual(gate_type.LOGIC_MAP[(in1, in2)], reader.GetState(), gate)
+
+  def testGateMem_AsTableWithFeedback(self):
+    gate = GateTable(TruthTable(GateMem))
+    writers = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(2)]
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    wires = [Wire() for i in range(3)]
+    for (wire, point) in zip(wires, writers + [reader]):
+      wire.Connect(point)
+    # The held value is fed back from the output.
+    gate.SetInputWires(wires)
+    gate.SetOutputWire(wires[2])
+    expectations = [
+        (NEUTRAL, NEUTRAL, NEUTRAL),
+        (PLUS,    NEUTRAL, NEUTRAL),
+        (PLUS,    PLUS,    PLUS),
+        (PLUS,    MINUS,   MINUS),
+        (NEUTRAL, MINUS,   NEUTRAL),
+        (MINUS,   MINUS,   PLUS),
+        (MINUS,   NEUTRAL, PLUS),
+        (NEUTRAL, NEUTRAL, PLUS),
+        (NEUTRAL, PLUS,    NEUTRAL),
+        (MINUS,   PLUS,    MINUS),
+        (MINUS,   NEUTRAL, MINUS),
+        (NEUTRAL, NEUTRAL, MINUS),
+    ]
+    for (in1, in2, out) in expectations:
+      writers[0].SetStateWrite(in1)
+      writers[1].SetStateWrite(in2)
+      self.assertEqual(out, reader.GetState(), gate)
+
+  def testFuse(self):
+    self.assertEqual(TruthTable(GateNand), Fuse(GateAnd, GateNegate))
+    self.assertEqual(TruthTable(GateIdentity), Fuse(GateIncrement, GateDecrement))
+
+  def testNoTable_Raises(self):
+    class GateCustom(GateDiadic):
+      __slots__ = ()
+    with self.assertRaises(KeyError):
+      TruthTable(GateCustom)
+    with self.assertRaises(KeyError):
+      Fuse(GateAnd, GateCustom)
+
+  def testThreeInputs(self):
+    # Minimum of three inputs.
+    table = [min(a, b, c) for a in TRITS for b in TRITS for c in TRITS]
+    writers, reader, gate = self.setupTable(table)
+    self.assertEqual(3, gate.InputCount())
+    for (writer, value) in zip(writers, (PLUS, MINUS, NEUTRAL)):
+      writer.SetStateWrite(value)
+    self.assertEqual(MINUS, reader.GetState())
+    writers[1].SetStateWrite(PLUS)
+    self.assertEqual(NEUTRAL, reader.GetState())
+
+  def testBadTable_Raises(self):
+    with self.assertRaises(ValueError):
+      GateTable([PLUS] * 4)
+    with self.assertRaises(BadStateException):
+      GateTable([PLUS, NEUTRAL, 2])
+    with self.assertRaises(ConnectionError):
+      GateTable(TruthTable(GateAnd)).SetInputWireAt(2, Wire())
+
+
 class TestTryte(unittest.TestCase):
   def setupTryte(self):
     tryte = Tryte()
@@ -298,6 +450,207 @@ class TestTryte(unittest.TestCase):
       self.assertEqual(MINUS, reader.GetState(), 'Everything should still be (-)')
 
 
+class TestScheduler(unittest.TestCase):
+  def setUp(self):
+    gates.DELAY_ENABLED = True
+    gates.SCHEDULER = self.scheduler = Scheduler()
+
+  def tearDown(self):
+    gates.DELAY_ENABLED = False
+    gates.SCHEDULER = Scheduler()
+
+  def setupChain(self, length, delay, inertial=False):
+    wires = [Wire() for i in range(length + 1)]
+    writer = ConnectionPoint(ConnectionPoint.WRITER)
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    wires[0].Connect(writer)
+    wires[-1].Connect(reader)
+    for i in range(length):
+      gate = GateNegate()
+      gate.SetDelay(delay, inertial)
+      gate.SetInputWire(wires[i])
+      gate.SetOutputWire(wires[i + 1])
+    return (writer, reader)
+
+  def testDelay_OutputChangesAfterDelay(self):
+    writer, reader = self.setupChain(3, 2)
+    writer.SetStateWrite(PLUS)
+    self.scheduler.Run(until=5)
+    self.assertEqual(NEUTRAL, reader.GetState(), 'Output should not change before 6')
+    self.scheduler.Run(until=6)
+    self.assertEqual(MINUS, reader.GetState(), 'Output should change at 6')
+    self.assertEqual(0, self.scheduler.Pending())
+
+  def testTransport_KeepsShortPulses(self):
+    writer, reader = self.setupChain(1, 3)
+    changes = []
+    watcher = ConnectionPoint(ConnectionPoint.READER, Watcher(changes, reader, self.scheduler))
+    reader._wire.Connect(watcher)
+    writer.SetStateWrite(PLUS)
+    self.scheduler.Run(until=1)
+    writer.SetStateWrite(NEUTRAL)
+    self.scheduler.Run()
+    self.assertEqual([(3, MINUS), (4, NEUTRAL)], changes)
+
+  def testInertial_SwallowsShortPulses(self):
+    writer, reader = self.setupChain(1, 3, inertial=True)
+    changes = []
+    watcher = ConnectionPoint(ConnectionPoint.READER, Watcher(changes, reader, self.scheduler))
+    reader._wire.Connect(watcher)
+    writer.SetStateWrite(PLUS)
+    self.scheduler.Run(until=1)
+    writer.SetStateWrite(NEUTRAL)
+    self.scheduler.Run()
+    self.assertEqual([], changes)
+
+    self.scheduler.Run(until=4)
+    writer.SetStateWrite(MINUS)
+    self.scheduler.Run(until=10)
+    writer.SetStateWrite(PLUS)
+    self.scheduler.Run(until=11)
+    writer.SetStateWrite(MINUS)
+    self.scheduler.Run()
+    self.assertEqual([(7, PLUS)], changes)
+
+  def testRunUntil_SkipsCancelledWrites(self):
+    (cancelled, later) = (ConnectionPoint(ConnectionPoint.WRITER), ConnectionPoint(ConnectionPoint.WRITER))
+    self.scheduler.ScheduleWrite(cancelled, PLUS, 1, inertial=True)
+    self.scheduler.ScheduleWrite(cancelled, MINUS, 2, inertial=True)
+    self.scheduler.ScheduleWrite(later, PLUS, 10)
+    self.assertEqual(0, self.scheduler.Run(until=1.5))
+    self.assertEqual(1.5, self.scheduler.Now())
+    self.assertEqual(NEUTRAL, cancelled.GetState())
+    self.assertEqual(1, self.scheduler.Run(until=2))
+    self.assertEqual((2, MINUS), (self.scheduler.Now(), cancelled.GetState()))
+    self.assertEqual(NEUTRAL, later.GetState())
+    self.assertEqual(1, self.scheduler.Run())
+    self.assertEqual(10, self.scheduler.Now())
+
+  def testGateSum_DelaysOverflow(self):
+    writer_1 = ConnectionPoint(ConnectionPoint.WRITER)
+    writer_2 = ConnectionPoint(ConnectionPoint.WRITER)
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    overflow = ConnectionPoint(ConnectionPoint.READER)
+    wires = [Wire() for i in range(4)]
+    for (wire, point) in zip(wires, [writer_1, writer_2, reader, overflow]):
+      wire.Connect(point)
+    gate = GateSum()
+    gate.SetInputWire1(wires[0])
+    gate.SetInputWire2(wires[1])
+    gate.SetOutputWire(wires[2])
+    gate.SetOverflowWire(wires[3])
+    gate.SetDelay(1)
+    writer_1.SetStateWrite(PLUS)
+    writer_2.SetStateWrite(PLUS)
+    self.assertEqual((NEUTRAL, NEUTRAL), (reader.GetState(), overflow.GetState()))
+    self.scheduler.Run()
+    self.assertEqual((MINUS, PLUS), (reader.GetState(), overflow.GetState()))
+    self.assertEqual(1, self.scheduler.Now())
+
+  def testLongChain_IsDeterministic(self):
+    writer, reader = self.setupChain(200, 1)
+    for i in range(50):
+      writer.SetStateWrite((PLUS, MINUS)[i % 2])
+      self.scheduler.Run(until=self.scheduler.Now() + 1)
+    self.scheduler.Run()
+    self.assertEqual(MINUS, reader.GetState())
+    self.assertEqual(249, self.scheduler.Now())
+
+
+class CountingNegate(GateNegate):
+  __slots__ = ()
+  updates = 0
+  def Update(self):
+    CountingNegate.updates += 1
+    super().Update()
+
+
+class TestWorklist(TestDiadicGates):
+  """Runs the diadic gate tests again with worklist propagation."""
+  def setUp(self):
+    gates.WORKLIST_ENABLED = True
+
+  def tearDown(self):
+    gates.WORKLIST_ENABLED = False
+
+  def setupChain(self, length, gate_type=GateNegate):
+    wires = [Wire() for i in range(length + 1)]
+    writer = ConnectionPoint(ConnectionPoint.WRITER)
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    wires[0].Connect(writer)
+    wires[-1].Connect(reader)
+    for i in range(length):
+      gate = gate_type()
+      gate.SetInputWire(wires[i])
+      gate.SetOutputWire(wires[i + 1])
+    return (writer, reader)
+
+  def testDeepChain_Settles(self):
+    writer, reader = self.setupChain(5001)
+    writer.SetStateWrite(PLUS)
+    self.assertEqual(MINUS, reader.GetState())
+    writer.SetStateWrite(MINUS)
+    self.assertEqual(PLUS, reader.GetState())
+
+  def testDeepChain_RecursiveOverflows(self):
+    gates.WORKLIST_ENABLED = False
+    writer, reader = self.setupChain(5001)
+    with self.assertRaises(RecursionError):
+      writer.SetStateWrite(PLUS)
+
+  def testReconvergentPaths_UpdateOncePerDelta(self):
+    # Both inputs of the AND change in the same delta cycle.
+    source = Wire()
+    left = Wire()
+    right = Wire()
+    out = Wire()
+    writer = ConnectionPoint(ConnectionPoint.WRITER)
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    source.Connect(writer)
+    out.Connect(reader)
+    for wire in (left, right):
+      negate = GateNegate()
+      negate.SetInputWire(source)
+      negate.SetOutputWire(wire)
+    counting = CountingNegate()
+    and_gate = GateAnd()
+    and_gate.SetInputWire1(left)
+    and_gate.SetInputWire2(right)
+    mid = Wire()
+    and_gate.SetOutputWire(mid)
+    counting.SetInputWire(mid)
+    counting.SetOutputWire(out)
+
+    CountingNegate.updates = 0
+    writer.SetStateWrite(MINUS)
+    self.assertEqual(MINUS, reader.GetState())
+    self.assertEqual(1, CountingNegate.updates)
+
+  def testGates_MatchRecursive(self):
+    for gate_type in [GateAnd, GateOr, GateXor, GateSum, GateSumAlternate, GateMem]:
+      results = []
+      for enabled in (False, True):
+        gates.WORKLIST_ENABLED = enabled
+        (i1, i2, o, g) = self.setupDiadicGate(gate_type)
+        trace = []
+        for in1 in (PLUS, NEUTRAL, MINUS):
+          for in2 in (PLUS, NEUTRAL, MINUS):
+            i1.SetStateWrite(in1)
+            i2.SetStateWrite(in2)
+            trace.append(o.GetState())
+        results.append(trace)
+      self.assertEqual(results[0], results[1], gate_type.__name__)
+
+
+class Watcher:
+  def __init__(self, changes, point, scheduler):
+    self.changes = changes
+    self.point = point
+    self.scheduler = scheduler
+  def Update(self):
+    self.changes.append((self.scheduler.Now(), self.point.GetState()))
+
+
 class MockTimer:
   nextfn = False
   expected_period = False
@@ -332,6 +685,130 @@ class TestOscillator(unittest.TestCase):
           '%s at time %d expected %s' % (oscillator, i, STATE_NAME[expected_values[i]]))
       MockTimer.RunFunc()
 
+  def setupMemory(self, oscillator):
+    # A GateMem that stores (+) on the high tick and its negation on the low one.
+    clock = Wire()
+    data = Wire()
+    out = Wire()
+    writer = ConnectionPoint(ConnectionPoint.WRITER)
+    reader = ConnectionPoint(ConnectionPoint.READER)
+    data.Connect(writer)
+    out.Connect(reader)
+    mem = GateMem()
+    mem.SetInputWire1(data)
+    mem.SetInputWire2(clock)
+    mem.SetOutputWire(out)
+    oscillator.SetOutputWire(clock)
+    writer.SetStateWrite(PLUS)
+    return reader
+
+  def testRunCycles_WithoutTimer(self):
+    oscillator = Oscillator(1, timer=None)
+    reader = self.setupMemory(oscillator)
+    oscillator.RunCycles(2)
+    self.assertEqual(9, oscillator.Ticks())
+    self.assertEqual(NEUTRAL, oscillator.ReadOutput())
+    self.assertEqual(MINUS, reader.GetState())
+    oscillator.Tick()
+    self.assertEqual(PLUS, reader.GetState())
+
+  def testRunCycles_OnScheduler(self):
+    scheduler = Scheduler()
+    oscillator = Oscillator(1, scheduler=scheduler)
+    reader = self.setupMemory(oscillator)
+    oscillator.RunCycles(3)
+    self.assertEqual(13, oscillator.Ticks())
+    self.assertAlmostEqual(3, scheduler.Now())
+    self.assertEqual(MINUS, reader.GetState())
+    self.assertEqual(1, scheduler.Pending())
+
+  def testRunCycles_FastForward(self):
+    scheduler = Scheduler()
+    oscillator = Oscillator(1, scheduler=scheduler)
+    reader = self.setupMemory(oscillator)
+    oscillator.RunCycles(10 ** 9, fast_forward=True)
+    self.assertEqual(4 * 10 ** 9 + 1, oscillator.Ticks())
+    self.assertAlmostEqual(10 ** 9, scheduler.Now())
+    self.assertEqual(MINUS, reader.GetState())
+    scheduler.Step()
+    self.assertEqual(PLUS, oscillator.ReadOutput())
+    self.assertEqual(PLUS, reader.GetState())
+
+    direct = Oscillator(1, timer=None)
+    reader = self.setupMemory(direct)
+    direct.RunCycles(10 ** 9, fast_forward=True)
+    self.assertEqual(4 * 10 ** 9 + 1, direct.Ticks())
+    self.assertEqual(MINUS, reader.GetState())
+
+
+def Digit(values):
+  """The balanced trit of the sum of `values`, which any single change moves."""
+  return (sum(values) + 1) % 3 - 1
+
+class TestBatch(unittest.TestCase):
+  def setUp(self):
+    self.wires = [Wire() for i in range(3)]
+    self.writers = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(3)]
+    for (wire, writer) in zip(self.wires, self.writers):
+      wire.Connect(writer)
+    table = GateTable(tuple(Digit(v) for v in itertools.product(TRITS, repeat=3)))
+    table.SetInputWires(self.wires)
+    middle = Wire()
+    table.SetOutputWire(middle)
+    negate = CountingNegate()
+    negate.SetInputWire(middle)
+    out = Wire()
+    negate.SetOutputWire(out)
+    self.reader = ConnectionPoint(ConnectionPoint.READER)
+    out.Connect(self.reader)
+    CountingNegate.updates = 0
+
+  def testSetMany_SettlesOnce(self):
+    self.assertEqual(2, SetMany(dict(zip(self.writers, (PLUS, PLUS, MINUS)))))
+    self.assertEqual(1, CountingNegate.updates)
+    self.assertEqual(-Digit((PLUS, PLUS, MINUS)), self.reader.GetState())
+    self.assertFalse(gates.WORKLIST_ENABLED)
+
+    for (writer, state) in zip(self.writers, (MINUS, NEUTRAL, PLUS)):
+      writer.SetStateWrite(state)
+    self.assertEqual(4, CountingNegate.updates)
+
+  def testSetMany_Wires(self):
+    SetMany(dict(zip(self.wires, (NEUTRAL, MINUS, MINUS))))
+    self.assertEqual(1, CountingNegate.updates)
+    self.assertEqual(-Digit((NEUTRAL, MINUS, MINUS)), self.reader.GetState())
+
+  def testSetMany_Raises(self):
+    with self.assertRaises(BadStateException):
+      SetMany({self.writers[0]: 2})
+    with self.assertRaises(ConnectionError):
+      SetMany({self.reader: PLUS})
+    with self.assertRaises(ConnectionError):
+      SetMany({Wire(): PLUS})
+    self.assertEqual(0, CountingNegate.updates)
+
+  def testBatch_Nested(self):
+    with Batch() as outer:
+      self.writers[0].SetStateWrite(PLUS)
+      with Batch() as inner:
+        self.writers[1].SetStateWrite(PLUS)
+      self.assertEqual(0, inner.deltas)
+      self.assertEqual(0, CountingNegate.updates)
+      self.writers[2].SetStateWrite(NEUTRAL)
+    self.assertEqual(2, outer.deltas)
+    self.assertEqual(1, CountingNegate.updates)
+    self.assertFalse(gates.WORKLIST_ENABLED)
+
+  def testBatch_Tryte(self):
+    (tryte, writers, readflag, readers) = TestTryte().setupTryte()
+    readflag.SetStateWrite(PLUS)
+    word = [(-1) ** i for i in range(9)]
+    with Batch():
+      for (writer, state) in zip(writers, word):
+        writer.SetStateWrite(state)
+      self.assertEqual([NEUTRAL] * 9, [reader.GetState() for reader in readers])
+    self.assertEqual(word, [reader.GetState() for reader in readers])
+
 
 if __name__ == '__main__':
   unittest.main()
\ No newline at end of file
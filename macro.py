@@ -0,0 +1,160 @@
+import collections
+import itertools
+
+from circuit import *
+
+
+class MacroCell:
+  """
+  A compiled subcircuit used as a single black-box gate. Each distinct input
+  is evaluated once and its outputs memoized, so the cell behaves exactly like
+  the expanded gates but costs one lookup per update.
+
+  Values held by GateMems inside the subcircuit are part of the key, and come
+  back as part of the result. When inputs and held values together have at most
+  `max_table` combinations every result is computed up front; otherwise results
+  are kept in an LRU cache of `cache_size` entries.
+  """
+  __slots__ = ('_circuit', '_inputs', '_outputs', '_held', '_held_state',
+      '_table', '_cache', '_cache_size', '_hits', '_misses')
+  def __init__(self, circuit, max_table=3**8, cache_size=4096):
+    self._circuit = circuit
+    self._inputs = tuple(ConnectionPoint(ConnectionPoint.READER, self) for i in circuit.input_ids)
+    self._outputs = tuple(ConnectionPoint(ConnectionPoint.WRITER, self) for i in circuit.output_ids)
+    # Wires driven by cells that read their own output.
+    self._held = [out for (ins, out) in zip(circuit.cell_inputs, circuit.cell_outputs) if out in ins]
+    self._held_state = tuple(circuit.state[idx] for idx in self._held)
+    self._cache = collections.OrderedDict()
+    self._cache_size = cache_size
+    self._hits = 0
+    self._misses = 0
+    self._table = None
+    # Evaluating overwrites the circuit state, so the outputs start from it as
+    # it was before precomputing.
+    initial = list(circuit.state)
+    if 3 ** (len(self._inputs) + len(self._held)) <= max_table:
+      self._table = {}
+      for key in itertools.product(TRITS, repeat=len(self._inputs) + len(self._held)):
+        self._table[key] = self._Evaluate(key)
+    circuit.state[:] = initial
+    for (point, state) in zip(self._outputs, circuit.ReadOutputs()):
+      point._state = state
+
+  def _Evaluate(self, key):
+    circuit = self._circuit
+    count = len(self._inputs)
+    for (idx, state) in zip(self._held, key[count:]):
+      circuit.state[idx] = state
+    outputs = circuit.Step(key[:count])
+    return outputs, tuple(circuit.state[idx] for idx in self._held)
+
+  def Lookup(self, key):
+    """The (outputs, held values) for inputs followed by held values."""
+    if self._table is not None:
+      self._hits += 1
+      return self._table[key]
+    cache = self._cache
+    if key in cache:
+      self._hits += 1
+      cache.move_to_end(key)
+      return cache[key]
+    self._misses += 1
+    result = cache[key] = self._Evaluate(key)
+    if len(cache) > self._cache_size:
+      cache.popitem(last=False)
+    return result
+
+  def Update(self):
+    key = tuple(point._state for point in self._inputs) + self._held_state
+    (outputs, self._held_state) = self.Lookup(key)
+    for (point, state) in zip(self._outputs, outputs):
+      if point.GetState() != state:
+        point.SetStateWrite(state)
+
+  def SaveState(self):
+    """The values held by the GateMems inside, for snapshots."""
+    return self._held_state
+
+  def LoadState(self, state):
+    if len(state) != len(self._held):
+      raise ValueError('Expected %d held values, got %d' % (len(self._held), len(state)))
+    self._held_state = tuple(state)
+
+  def IsPrecomputed(self):
+    return self._table is not None
+
+  def Hits(self):
+    return self._hits
+
+  def Misses(self):
+    return self._misses
+
+  def CacheSize(self):
+    return len(self._cache)
+
+  def ConnectionPoints(self):
+    return self._inputs + self._outputs
+
+  def SetInputWireAt(self, idx, wire):
+    try:
+      point = self._inputs[idx]
+    except IndexError as e:
+      raise ConnectionError('Index not in range [0,%d]: %d' % (len(self._inputs) - 1, idx))
+    wire.Connect(point)
+
+  def SetOutputWireAt(self, idx, wire):
+    try:
+      point = self._outputs[idx]
+    except IndexError as e:
+      raise ConnectionError('Index not in range [0,%d]: %d' % (len(self._outputs) - 1, idx))
+    wire.Connect(point)
+
+  def SetInputWires(self, wires):
+    for (idx, wire) in enumerate(wires):
+      self.SetInputWireAt(idx, wire)
+
+  def SetOutputWires(self, wires):
+    for (idx, wire) in enumerate(wires):
+      self.SetOutputWireAt(idx, wire)
+
+  # The ports of the gate a MacroCell was built from with Memoize.
+  def SetInputWire(self, wire):
+    self.SetInputWireAt(0, wire)
+
+  def SetInputWire1(self, wire):
+    self.SetInputWireAt(0, wire)
+
+  def SetInputWire2(self, wire):
+    self.SetInputWireAt(1, wire)
+
+  def SetOutputWire(self, wire):
+    self.SetOutputWireAt(0, wire)
+
+  def SetOverflowWire(self, wire):
+    self.SetOutputWireAt(1, wire)
+
+  def ReadOutput(self):
+    return self._outputs[0].GetState()
+
+  def __str__(self):
+    return '%s<I: %s, O: %s>' % (type(self).__name__,
+        ','.join(point.State() for point in self._inputs),
+        ','.join(point.State() for point in self._outputs))
+
+
+def Memoize(gate, max_table=3**8, cache_size=4096):
+  """
+  Builds a MacroCell from a single gate, e.g. a GateSumAlternate, with the same
+  ports, so it can be wired in place of the gate.
+  """
+  return MacroCell(CompileGate(gate), max_table, cache_size)
+
+
+def _MacroCells(cell):
+  if cell._held or cell._table is None:
+    raise CompileError('Cannot compile %s: it holds state or is not precomputed' % cell)
+  keys = list(itertools.product(TRITS, repeat=len(cell._inputs)))
+  return [(tuple(cell._table[key][0][j] for key in keys), cell._inputs, point)
+      for (j, point) in enumerate(cell._outputs)]
+
+CELL_BUILDERS[MacroCell] = _MacroCells
@@ -0,0 +1,110 @@
+from macro import *
+import itertools
+import random
+import unittest
+
+
+class TestMacroCell(unittest.TestCase):
+  def setupSum(self, gate):
+    writers = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(2)]
+    readers = [ConnectionPoint(ConnectionPoint.READER) for i in range(2)]
+    wires = [Wire() for i in range(4)]
+    for (wire, point) in zip(wires, writers + readers):
+      wire.Connect(point)
+    gate.SetInputWire1(wires[0])
+    gate.SetInputWire2(wires[1])
+    gate.SetOutputWire(wires[2])
+    gate.SetOverflowWire(wires[3])
+    return (writers, readers)
+
+  def testGateSumAlternate_SwappedIn(self):
+    macro = Memoize(GateSumAlternate())
+    self.assertTrue(macro.IsPrecomputed())
+    reference = self.setupSum(GateSum())
+    memoized = self.setupSum(macro)
+    for (in1, in2) in itertools.product(TRITS, repeat=2):
+      for (writers, readers) in (reference, memoized):
+        writers[0].SetStateWrite(in1)
+        writers[1].SetStateWrite(in2)
+      self.assertEqual([r.GetState() for r in reference[1]], [r.GetState() for r in memoized[1]],
+          '%s with inputs %s' % (macro, (in1, in2)))
+    self.assertEqual(0, macro.Misses())
+
+  def testFirstUpdate_FromInitialState(self):
+    for max_table in (3**8, 0):
+      reference = self.setupSum(GateSum())
+      memoized = self.setupSum(Memoize(GateSumAlternate(), max_table=max_table))
+      self.assertEqual([NEUTRAL, NEUTRAL], [r.GetState() for r in memoized[1]])
+      for (writers, readers) in (reference, memoized):
+        writers[1].SetStateWrite(MINUS)
+      self.assertEqual([MINUS, NEUTRAL], [r.GetState() for r in reference[1]])
+      self.assertEqual([MINUS, NEUTRAL], [r.GetState() for r in memoized[1]])
+
+  def testLru_CountsHitsAndMisses(self):
+    macro = Memoize(GateSumAlternate(), max_table=0, cache_size=4)
+    self.assertFalse(macro.IsPrecomputed())
+    writers, readers = self.setupSum(macro)
+    for value in (PLUS, MINUS, PLUS, MINUS):
+      writers[0].SetStateWrite(value)
+    self.assertEqual(2, macro.Misses())
+    self.assertEqual(2, macro.Hits())
+    for (in1, in2) in itertools.product(TRITS, repeat=2):
+      writers[0].SetStateWrite(in1)
+      writers[1].SetStateWrite(in2)
+      self.assertEqual(GateSum.LOGIC_MAP[(in1, in2)], readers[0].GetState())
+    self.assertEqual(4, macro.CacheSize())
+
+  def testTryte_HeldValues(self):
+    tryte = Tryte()
+    inwires = [Wire() for i in range(9)]
+    outwires = [Wire() for i in range(9)]
+    readwire = Wire()
+    tryte.SetInputWires(inwires)
+    tryte.SetOutputWires(outwires)
+    tryte.SetReadWire(readwire)
+    macro = MacroCell(Compile(inwires + [readwire], outwires), cache_size=64)
+    self.assertFalse(macro.IsPrecomputed())
+
+    writers = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(10)]
+    readers = [ConnectionPoint(ConnectionPoint.READER) for i in range(9)]
+    wires = [Wire() for i in range(19)]
+    for (wire, point) in zip(wires, writers + readers):
+      wire.Connect(point)
+    macro.SetInputWires(wires[:10])
+    macro.SetOutputWires(wires[10:])
+
+    word = (PLUS, MINUS, NEUTRAL) * 3
+    for (writer, value) in zip(writers, word + (PLUS,)):
+      writer.SetStateWrite(value)
+    self.assertEqual(list(word), [r.GetState() for r in readers])
+    writers[9].SetStateWrite(NEUTRAL)
+    for writer in writers[:9]:
+      writer.SetStateWrite(MINUS)
+    self.assertEqual(list(word), [r.GetState() for r in readers], 'Tryte should hold its value')
+    writers[9].SetStateWrite(MINUS)
+    self.assertEqual([PLUS] * 9, [r.GetState() for r in readers])
+
+  def testCompile_InlinesPrecomputedTable(self):
+    macro = Memoize(GateSumAlternate())
+    inputs = [Wire(), Wire()]
+    outputs = [Wire(), Wire()]
+    macro.SetInputWires(inputs)
+    macro.SetOutputWires(outputs)
+    circuit = Compile(inputs, outputs)
+    self.assertEqual(2, circuit.CellCount())
+    for values in itertools.product(TRITS, repeat=2):
+      self.assertEqual((GateSum.LOGIC_MAP[values], GateConsensus.LOGIC_MAP[values]),
+          circuit.Step(values))
+
+  def testCompile_HeldOrUncachedRaises(self):
+    for macro in (Memoize(GateMem()), Memoize(GateSumAlternate(), max_table=0)):
+      inputs = [Wire() for point in macro._inputs]
+      outputs = [Wire() for point in macro._outputs]
+      macro.SetInputWires(inputs)
+      macro.SetOutputWires(outputs)
+      with self.assertRaises(CompileError):
+        Compile(inputs, outputs)
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,176 @@
+import mmap
+import os
+
+from gates import *
+
+TRITS_PER_BYTE = 5
+# The trits packed in each byte value, least significant first. A trit t is
+# stored as the base-3 digit t % 3, so a zeroed store reads as all (0).
+BYTE_TRITS = tuple(tuple((byte // 3 ** k + 1) % 3 - 1 for k in range(TRITS_PER_BYTE))
+    for byte in range(3 ** TRITS_PER_BYTE))
+
+
+def PackTrits(trits):
+  """Packs trits into bytes, 5 to a byte."""
+  packed = bytearray((len(trits) + TRITS_PER_BYTE - 1) // TRITS_PER_BYTE)
+  for (i, trit) in enumerate(trits):
+    if trit not in VALID_STATES:
+      raise BadStateException(trit)
+    packed[i // TRITS_PER_BYTE] += trit % 3 * 3 ** (i % TRITS_PER_BYTE)
+  return bytes(packed)
+
+def UnpackTrits(packed, count):
+  trits = []
+  for byte in packed:
+    trits.extend(BYTE_TRITS[byte])
+  return trits[:count]
+
+
+class TernaryMemory:
+  """
+  A RAM of `words` words of `width` trits, wired like an array of Trytes with an
+  address port. Words are packed 5 trits to a byte in a bytearray or, given a
+  `path`, in a memory-mapped file that is created or opened in place.
+
+  The address is read as a balanced ternary number, trit 0 least significant,
+  offset so the lowest address is word 0. When the write wire is (+) the data
+  inputs are stored at the address and when it is (-) their negation is, like
+  a GateMem. While the read wire is (+) the data outputs show the word at the
+  address; otherwise they keep their last value.
+  """
+  __slots__ = ('_words', '_width', '_stride', '_store', '_file', '_address',
+      '_inputs', '_outputs', '_write', '_read')
+  def __init__(self, words, width=9, address_width=None, path=None):
+    if address_width is None:
+      address_width = 0
+      while 3 ** address_width < words:
+        address_width += 1
+    if words > 3 ** address_width:
+      raise ValueError('%d words cannot be addressed by %d trits' % (words, address_width))
+    self._words = words
+    self._width = width
+    self._stride = (width + TRITS_PER_BYTE - 1) // TRITS_PER_BYTE
+    self._file = None
+    size = words * self._stride
+    if path is None:
+      self._store = bytearray(size)
+    else:
+      self._file = open(path, os.path.exists(path) and 'r+b' or 'w+b')
+      if os.fstat(self._file.fileno()).st_size < size:
+        self._file.truncate(size)
+      self._store = mmap.mmap(self._file.fileno(), size)
+
+    self._address = tuple(ConnectionPoint(ConnectionPoint.READER, self) for i in range(address_width))
+    self._inputs = tuple(ConnectionPoint(ConnectionPoint.READER, self) for i in range(width))
+    self._outputs = tuple(ConnectionPoint(ConnectionPoint.WRITER, self) for i in range(width))
+    self._write = ConnectionPoint(ConnectionPoint.READER, self)
+    self._read = ConnectionPoint(ConnectionPoint.READER, self)
+
+  def Words(self):
+    return self._words
+
+  def Width(self):
+    return self._width
+
+  def Store(self):
+    """The packed words: a bytearray, or an mmap when backed by a file."""
+    return self._store
+
+  def Read(self, address):
+    """The trits of the word at `address`, least significant first."""
+    if not 0 <= address < self._words:
+      raise IndexError('Address not in range [0,%d]: %d' % (self._words - 1, address))
+    start = address * self._stride
+    return UnpackTrits(self._store[start:start + self._stride], self._width)
+
+  def Write(self, address, trits):
+    if not 0 <= address < self._words:
+      raise IndexError('Address not in range [0,%d]: %d' % (self._words - 1, address))
+    if len(trits) != self._width:
+      raise ValueError('Expected %d trits, got %d' % (self._width, len(trits)))
+    start = address * self._stride
+    self._store[start:start + self._stride] = PackTrits(trits)
+
+  def SaveState(self):
+    """The packed words as immutable bytes, for snapshots."""
+    return bytes(self._store)
+
+  def LoadState(self, state):
+    if len(state) != len(self._store):
+      raise ValueError('Expected %d bytes, got %d' % (len(self._store), len(state)))
+    self._store[:] = state
+
+  def Flush(self):
+    if self._file:
+      self._store.flush()
+
+  def Close(self):
+    if self._file:
+      self._store.close()
+      self._file.close()
+      self._file = None
+
+  def Address(self):
+    address = 0
+    for point in reversed(self._address):
+      address = 3 * address + point._state + 1
+    return address
+
+  def Update(self):
+    address = self.Address()
+    if address >= self._words:
+      return
+    write = self._write._state
+    if write != NEUTRAL:
+      self.Write(address, [write * point._state for point in self._inputs])
+    if self._read._state == PLUS:
+      for (point, state) in zip(self._outputs, self.Read(address)):
+        if point.GetState() != state:
+          point.SetStateWrite(state)
+
+  def ConnectionPoints(self):
+    return self._address + self._inputs + self._outputs + (self._write, self._read)
+
+  def _Connect(self, points, idx, wire):
+    try:
+      point = points[idx]
+    except IndexError as e:
+      raise ConnectionError('Index not in range [0,%d]: %d' % (len(points) - 1, idx))
+    wire.Connect(point)
+
+  def SetAddressWireAt(self, idx, wire):
+    self._Connect(self._address, idx, wire)
+
+  def SetAddressWires(self, wires):
+    if len(wires) > len(self._address):
+      raise ConnectionError('Cannot attach %d wires to %d address inputs' % (len(wires), len(self._address)))
+    for (idx, wire) in enumerate(wires):
+      self._Connect(self._address, idx, wire)
+
+  def SetInputWireAt(self, idx, wire):
+    self._Connect(self._inputs, idx, wire)
+
+  def SetInputWires(self, wires):
+    if len(wires) > len(self._inputs):
+      raise ConnectionError('Cannot attach %d wires to %d memory inputs' % (len(wires), len(self._inputs)))
+    for (idx, wire) in enumerate(wires):
+      self._Connect(self._inputs, idx, wire)
+
+  def SetOutputWireAt(self, idx, wire):
+    self._Connect(self._outputs, idx, wire)
+
+  def SetOutputWires(self, wires):
+    if len(wires) > len(self._outputs):
+      raise ConnectionError('Cannot attach %d wires to %d memory outputs' % (len(wires), len(self._outputs)))
+    for (idx, wire) in enumerate(wires):
+      self._Connect(self._outputs, idx, wire)
+
+  def SetWriteWire(self, wire):
+    wire.Connect(self._write)
+
+  def SetReadWire(self, wire):
+    wire.Connect(self._read)
+
+  def __str__(self):
+    return '%s<words: %d, width: %d, address: %d>' % (type(self).__name__,
+        self._words, self._width, self.Address())
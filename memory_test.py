@@ -0,0 +1,121 @@
+from memory import *
+import itertools
+import os
+import random
+import tempfile
+import unittest
+
+
+class TestPacking(unittest.TestCase):
+  def testRoundTrip(self):
+    for trits in itertools.product(TRITS, repeat=6):
+      packed = PackTrits(trits)
+      self.assertEqual(2, len(packed))
+      self.assertEqual(list(trits), UnpackTrits(packed, 6))
+
+  def testZeroIsNeutral(self):
+    self.assertEqual([NEUTRAL] * 9, UnpackTrits(bytes(2), 9))
+
+  def testBadState_Raises(self):
+    with self.assertRaises(BadStateException):
+      PackTrits([PLUS, 2])
+
+
+class TestTernaryMemory(unittest.TestCase):
+  def setupMemory(self, memory):
+    self.address = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(len(memory._address))]
+    self.inputs = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(memory.Width())]
+    self.outputs = [ConnectionPoint(ConnectionPoint.READER) for i in range(memory.Width())]
+    self.write = ConnectionPoint(ConnectionPoint.WRITER)
+    self.read = ConnectionPoint(ConnectionPoint.WRITER)
+    memory.SetAddressWires([self.attach(point) for point in self.address])
+    memory.SetInputWires([self.attach(point) for point in self.inputs])
+    memory.SetOutputWires([self.attach(point) for point in self.outputs])
+    memory.SetWriteWire(self.attach(self.write))
+    memory.SetReadWire(self.attach(self.read))
+
+  def attach(self, point):
+    wire = Wire()
+    wire.Connect(point)
+    return wire
+
+  def drive(self, points, states):
+    for (point, state) in zip(points, states):
+      point.SetStateWrite(state)
+
+  def outputStates(self):
+    return [point.GetState() for point in self.outputs]
+
+  def testReadWrite(self):
+    memory = TernaryMemory(100)
+    self.assertEqual(5, len(memory._address))
+    rng = random.Random(13)
+    words = [[rng.choice(TRITS) for i in range(9)] for j in range(100)]
+    for (address, word) in enumerate(words):
+      memory.Write(address, word)
+    for (address, word) in enumerate(words):
+      self.assertEqual(word, memory.Read(address))
+    self.assertEqual(200, len(memory.Store()))
+
+  def testBadAccess_Raises(self):
+    memory = TernaryMemory(10, 3)
+    with self.assertRaises(IndexError):
+      memory.Read(10)
+    with self.assertRaises(ValueError):
+      memory.Write(0, [PLUS])
+    with self.assertRaises(ValueError):
+      TernaryMemory(10, address_width=2)
+
+  def testWired(self):
+    memory = TernaryMemory(9, 3)
+    self.setupMemory(memory)
+    # Address (-)(-) is word 0, (+)(0) is word 5.
+    self.drive(self.address, [MINUS, MINUS])
+    self.drive(self.inputs, [PLUS, MINUS, NEUTRAL])
+    self.write.SetStateWrite(PLUS)
+    self.write.SetStateWrite(NEUTRAL)
+    self.assertEqual([PLUS, MINUS, NEUTRAL], memory.Read(0))
+    self.assertEqual([NEUTRAL] * 3, self.outputStates())
+
+    self.drive(self.address, [PLUS, NEUTRAL])
+    self.write.SetStateWrite(MINUS)
+    self.write.SetStateWrite(NEUTRAL)
+    self.assertEqual([MINUS, PLUS, NEUTRAL], memory.Read(5))
+
+    self.read.SetStateWrite(PLUS)
+    self.assertEqual([MINUS, PLUS, NEUTRAL], self.outputStates())
+    self.drive(self.address, [MINUS, MINUS])
+    self.assertEqual([PLUS, MINUS, NEUTRAL], self.outputStates())
+
+    # Outputs hold while the read wire is not (+).
+    self.read.SetStateWrite(NEUTRAL)
+    self.drive(self.address, [NEUTRAL, NEUTRAL])
+    self.assertEqual([PLUS, MINUS, NEUTRAL], self.outputStates())
+
+  def testWired_AddressOutOfRange(self):
+    memory = TernaryMemory(4, 2, address_width=2)
+    self.setupMemory(memory)
+    self.drive(self.inputs, [PLUS, PLUS])
+    self.drive(self.address, [PLUS, PLUS])
+    self.write.SetStateWrite(PLUS)
+    self.assertEqual([[NEUTRAL] * 2] * 4, [memory.Read(i) for i in range(4)])
+
+  def testMemoryMapped(self):
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'image.mem')
+      memory = TernaryMemory(3 ** 7, 9, path=path)
+      memory.Write(1000, [PLUS] * 9)
+      memory.Write(3 ** 7 - 1, [MINUS, NEUTRAL, PLUS] * 3)
+      memory.Flush()
+      memory.Close()
+      self.assertEqual(3 ** 7 * 2, os.path.getsize(path))
+
+      memory = TernaryMemory(3 ** 7, 9, path=path)
+      self.assertEqual([PLUS] * 9, memory.Read(1000))
+      self.assertEqual([MINUS, NEUTRAL, PLUS] * 3, memory.Read(3 ** 7 - 1))
+      self.assertEqual([NEUTRAL] * 9, memory.Read(0))
+      memory.Close()
+
+
+if __name__ == '__main__':
+  unittest.main()
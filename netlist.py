@@ -0,0 +1,365 @@
+import array
+import mmap
+import struct
+import sys
+
+from circuit import *
+
+MAGIC = b'TNET'
+VERSION = 1
+ALIGNMENT = 8
+
+# Gate classes that can be saved, by name. A gate is recorded by the points
+# it lists in ConnectionPoints, in that order.
+GATE_TYPES = dict((cls.__name__, cls) for cls in list(TRUTH_TABLES) + [GateTable])
+
+# Sections in file order, with their array typecodes. Gate and wire counts
+# are the lengths of `gate_types` and `wire_states`.
+SECTIONS = (
+  ('names', 'B'),          # utf-8 class names, one per line
+  ('gate_types', 'B'),     # index into names
+  ('gate_tables', 'i'),    # index into tables, or -1
+  ('gate_delays', 'd'),
+  ('gate_inertial', 'B'),
+  ('gate_ports', 'I'),     # offsets into the port sections, one per gate plus one
+  ('port_io', 'b'),
+  ('port_states', 'b'),
+  ('wire_states', 'b'),
+  ('wire_ports', 'I'),     # offsets into wire_points, one per wire plus one
+  ('wire_points', 'i'),    # ports in the order they were connected to each wire
+  ('table_offsets', 'I'),  # offsets into table_data, one per table plus one
+  ('table_data', 'b'),
+  ('inputs', 'i'),
+  ('outputs', 'i'),
+)
+_HEADER = struct.Struct('<4sHH')
+_SECTION = struct.Struct('<QQ')
+
+
+class NetlistError(ValueError):
+  pass
+
+
+def Dump(inputs, outputs):
+  """
+  Serializes every gate reachable from the `inputs` and `outputs` wires, with
+  their wires, connections, delays and states. Connection points that belong
+  to no gate, like the ones driving the inputs, are not saved.
+  """
+  return Serialize(inputs, outputs)[0]
+
+def Serialize(inputs, outputs):
+  """As Dump, also returning the wires in the order of their saved ids."""
+  points = ReachablePoints(list(inputs) + list(outputs))
+  if points is None:
+    raise NetlistError('A gate does not list its ConnectionPoints')
+
+  names = {}
+  tables = {}
+  columns = dict((name, array.array(code)) for (name, code) in SECTIONS)
+  port_ids = {}
+  for point in points:
+    gate = point._controller
+    if not gate or point in port_ids:
+      continue
+    name = type(gate).__name__
+    if GATE_TYPES.get(name) is not type(gate):
+      raise NetlistError('Cannot save %s' % gate)
+    columns['gate_types'].append(names.setdefault(name, len(names)))
+    if isinstance(gate, GateTable):
+      columns['gate_tables'].append(tables.setdefault(gate.Table(), len(tables)))
+    else:
+      columns['gate_tables'].append(-1)
+    columns['gate_delays'].append(gate._delay)
+    columns['gate_inertial'].append(bool(gate._inertial))
+    columns['gate_ports'].append(len(port_ids))
+    for p in gate.ConnectionPoints():
+      port_ids[p] = len(port_ids)
+      columns['port_io'].append(p._io)
+      columns['port_states'].append(p._state)
+  columns['gate_ports'].append(len(port_ids))
+
+  wires = dict.fromkeys(inputs)
+  wires.update(dict.fromkeys(outputs))
+  for point in port_ids:
+    if point.HasWire():
+      wires[point._wire] = None
+  wire_ids = dict((wire, i) for (i, wire) in enumerate(wires))
+  for wire in wires:
+    driver = wire.Driver()
+    columns['wire_states'].append(driver and driver.GetState() or NEUTRAL)
+    columns['wire_ports'].append(len(columns['wire_points']))
+    columns['wire_points'].extend(port_ids[p] for p in wire._connections if p in port_ids)
+  columns['wire_ports'].append(len(columns['wire_points']))
+
+  for table in tables:
+    columns['table_offsets'].append(len(columns['table_data']))
+    columns['table_data'].extend(table)
+  columns['table_offsets'].append(len(columns['table_data']))
+  columns['names'].frombytes('\n'.join(names).encode('utf-8'))
+  columns['inputs'].extend(wire_ids[w] for w in inputs)
+  columns['outputs'].extend(wire_ids[w] for w in outputs)
+
+  header_size = _HEADER.size + len(SECTIONS) * _SECTION.size
+  offset = _Align(header_size)
+  header = [_HEADER.pack(MAGIC, VERSION, len(SECTIONS))]
+  body = []
+  for (name, code) in SECTIONS:
+    column = columns[name]
+    if sys.byteorder != 'little':
+      column.byteswap()
+    data = column.tobytes()
+    header.append(_SECTION.pack(offset, len(data)))
+    body.append(data + bytes(_Align(len(data)) - len(data)))
+    offset += len(body[-1])
+  header = b''.join(header)
+  return header + bytes(_Align(header_size) - header_size) + b''.join(body), list(wires)
+
+def Save(path, inputs, outputs):
+  with open(path, 'wb') as f:
+    f.write(Dump(inputs, outputs))
+
+def _Align(size):
+  return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+class Netlist:
+  """
+  A saved netlist read in place from a buffer, such as an mmap. Each section
+  is a typed view of the buffer, so opening a netlist parses nothing per gate.
+  """
+  def __init__(self, buffer, mapped=None):
+    self._mapped = mapped
+    self._view = view = memoryview(buffer)
+    if len(view) < _HEADER.size:
+      raise NetlistError('Netlist is truncated')
+    (magic, version, count) = _HEADER.unpack_from(view)
+    if magic != MAGIC:
+      raise NetlistError('Not a netlist')
+    if version != VERSION:
+      raise NetlistError('Netlist version %d, expected %d' % (version, VERSION))
+    if count != len(SECTIONS):
+      raise NetlistError('Netlist has %d sections, expected %d' % (count, len(SECTIONS)))
+    self._sections = []
+    for (i, (name, code)) in enumerate(SECTIONS):
+      (offset, size) = _SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size)
+      if offset + size > len(view):
+        raise NetlistError('Netlist is truncated')
+      section = view[offset:offset + size]
+      if sys.byteorder != 'little':
+        section = array.array(code, section.tobytes())
+        section.byteswap()
+      else:
+        section = section.cast(code)
+      self._sections.append(section)
+      setattr(self, name, section)
+    self.names = self.names and bytes(self.names).decode('utf-8').split('\n') or []
+
+  def GateCount(self):
+    return len(self.gate_types)
+
+  def WireCount(self):
+    return len(self.wire_states)
+
+  def Table(self, idx):
+    return tuple(self.table_data[self.table_offsets[idx]:self.table_offsets[idx + 1]])
+
+  def Build(self):
+    """
+    Builds the object model. Returns the input wires, the output wires and the
+    gates, in the order they were saved.
+    """
+    classes = [_GateType(name) for name in self.names]
+    tables = {}
+    gates = []
+    points = []
+    for (kind, table, delay, inertial) in zip(self.gate_types, self.gate_tables,
+        self.gate_delays, self.gate_inertial):
+      if table < 0:
+        gate = classes[kind]()
+      else:
+        if table not in tables:
+          tables[table] = self.Table(table)
+        gate = GateTable(tables[table])
+      if delay or inertial:
+        gate.SetDelay(delay, bool(inertial))
+      gates.append(gate)
+      points.extend(gate.ConnectionPoints())
+    if len(points) != len(self.port_states):
+      raise NetlistError('Saved ports do not match the gates')
+    for (point, state) in zip(points, self.port_states):
+      point._state = state
+
+    wire_ports = self.wire_ports
+    wire_points = self.wire_points
+    wires = []
+    for i in range(self.WireCount()):
+      wire = Wire()
+      for port in wire_points[wire_ports[i]:wire_ports[i + 1]]:
+        wire.Connect(points[port])
+      wires.append(wire)
+    return [wires[i] for i in self.inputs], [wires[i] for i in self.outputs], gates
+
+  def Compile(self):
+    """
+    Compiles straight from the saved arrays, as Compile would compile the
+    built object model.
+    """
+    classes = [_GateType(name) for name in self.names]
+    port_wire = [-1] * len(self.port_io)
+    driver = [-1] * self.WireCount()
+    wire_ports = self.wire_ports
+    wire_points = self.wire_points
+    port_io = self.port_io
+    for i in range(self.WireCount()):
+      for port in wire_points[wire_ports[i]:wire_ports[i + 1]]:
+        port_wire[port] = i
+        if driver[i] < 0 and port_io[port] == ConnectionPoint.WRITER:
+          driver[i] = port
+    state = list(self.wire_states)
+    inputs = set(self.inputs)
+    port_states = self.port_states
+    gate_ports = self.gate_ports
+
+    def Id(port):
+      # An input point without a wire keeps reading its own state.
+      if port_wire[port] < 0:
+        port_wire[port] = len(state)
+        state.append(port_states[port])
+      return port_wire[port]
+
+    tables = []
+    codes = {}
+    cell_codes = []
+    cell_inputs = []
+    cell_outputs = []
+    for (i, (kind, table)) in enumerate(zip(self.gate_types, self.gate_tables)):
+      first = gate_ports[i]
+      count = gate_ports[i + 1] - first
+      for (cell_table, ins, out) in _Cells(classes[kind], table >= 0 and self.Table(table), count):
+        out += first
+        wire = port_wire[out]
+        if wire < 0 or driver[wire] != out or wire in inputs:
+          continue
+        if cell_table not in codes:
+          codes[cell_table] = len(tables)
+          tables.append(cell_table)
+        cell_codes.append(codes[cell_table])
+        cell_inputs.append(tuple(Id(first + p) for p in ins))
+        cell_outputs.append(wire)
+
+    return Circuit(len(state), tables, cell_codes, cell_inputs, cell_outputs,
+        list(self.inputs), list(self.outputs), state)
+
+  def Text(self):
+    """A line per wire and per gate, for reading and diffing."""
+    lines = ['netlist v%d: %d gates, %d wires' % (VERSION, self.GateCount(), self.WireCount())]
+    lines.append('inputs: %s' % ' '.join('w%d' % i for i in self.inputs))
+    lines.append('outputs: %s' % ' '.join('w%d' % i for i in self.outputs))
+    for i in range(len(self.table_offsets) - 1):
+      lines.append('table t%d: %s' % (i, ''.join(STATE_NAME[t][1] for t in self.Table(i))))
+    port_wire = {}
+    for i in range(self.WireCount()):
+      ports = self.wire_points[self.wire_ports[i]:self.wire_ports[i + 1]]
+      for port in ports:
+        port_wire[port] = i
+      lines.append('wire w%d %s: %s' % (i, STATE_NAME[self.wire_states[i]],
+          ' '.join('p%d' % port for port in ports)))
+    for i in range(self.GateCount()):
+      fields = ['gate g%d %s' % (i, self.names[self.gate_types[i]])]
+      if self.gate_tables[i] >= 0:
+        fields.append('t%d' % self.gate_tables[i])
+      if self.gate_delays[i] or self.gate_inertial[i]:
+        fields.append('delay=%g%s' % (self.gate_delays[i], self.gate_inertial[i] and ' inertial' or ''))
+      for port in range(self.gate_ports[i], self.gate_ports[i + 1]):
+        fields.append('p%d:%s%s=%s' % (port, self.port_io[port] == ConnectionPoint.WRITER and 'out' or 'in',
+            STATE_NAME[self.port_states[port]], port in port_wire and 'w%d' % port_wire[port] or '-'))
+      lines.append(' '.join(fields))
+    return '\n'.join(lines) + '\n'
+
+  def Close(self):
+    for (name, code) in SECTIONS:
+      if hasattr(self, name):
+        delattr(self, name)
+    for section in self._sections:
+      if isinstance(section, memoryview):
+        section.release()
+    self._sections = []
+    self._view.release()
+    if self._mapped:
+      self._mapped.close()
+      self._mapped = None
+
+
+def Load(path):
+  """Maps a netlist file and opens it in place."""
+  with open(path, 'rb') as f:
+    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+  return Netlist(mapped, mapped)
+
+
+def _GateType(name):
+  if name not in GATE_TYPES:
+    raise NetlistError('Unknown gate type: %s' % name)
+  return GATE_TYPES[name]
+
+def _Cells(cls, table, count):
+  """The cells of a gate as (table, input ports, output port), ports counted
+  from the gate's first."""
+  if cls is GateTable:
+    return [(table, tuple(range(count - 1)), count - 1)]
+  if issubclass(cls, GateMem):
+    return [(MEM_TABLE, (0, 1, 2), 2)]
+  if issubclass(cls, GateSum):
+    return [(TruthTable(GateSum), (0, 1), 2), (TruthTable(GateConsensus), (0, 1), 3)]
+  if issubclass(cls, GateMonadic):
+    return [(TruthTable(cls), (0,), 1)]
+  return [(TruthTable(cls), (0, 1), 2)]
+
+
+def Benchmark(build, repeat=3):
+  """
+  Times building a design with `build`, which returns its (inputs, outputs)
+  wires, against loading it from a saved netlist as an object model and as a
+  compiled Circuit. Returns the best times in seconds.
+  """
+  import os
+  import tempfile
+  import time
+
+  def Best(fn):
+    best = None
+    for i in range(repeat):
+      start = time.perf_counter()
+      fn()
+      elapsed = time.perf_counter() - start
+      best = best is None and elapsed or min(best, elapsed)
+    return best
+
+  (inputs, outputs) = build()
+  with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, 'design.tnet')
+    Save(path, inputs, outputs)
+    results = {
+      'build': Best(build),
+      'compile': Best(lambda: Compile(*build())),
+      'load': Best(lambda: Load(path).Build()),
+      'load_compiled': Best(lambda: Load(path).Compile()),
+      'bytes': os.path.getsize(path),
+    }
+  return results
+
+
+if __name__ == '__main__':
+  from datapath import RippleAdder, STRUCTURAL
+
+  def BuildAdders():
+    inputs, outputs = [], []
+    for i in range(20):
+      adder = RippleAdder(27, STRUCTURAL)
+      inputs.extend(point._wire for point in adder._writers)
+      outputs.extend(point._wire for point in adder._readers)
+    return inputs, outputs
+
+  for (name, value) in Benchmark(BuildAdders).items():
+    print('%s: %s' % (name, isinstance(value, float) and '%.4fs' % value or value))
@@ -0,0 +1,122 @@
+from macro import Memoize
+from netlist import *
+import itertools
+import os
+import tempfile
+import unittest
+
+
+class TestNetlist(unittest.TestCase):
+  def setupSum(self, gate):
+    inputs = [Wire(), Wire()]
+    outputs = [Wire(), Wire()]
+    gate.SetInputWire1(inputs[0])
+    gate.SetInputWire2(inputs[1])
+    gate.SetOutputWire(outputs[0])
+    gate.SetOverflowWire(outputs[1])
+    return inputs, outputs
+
+  def attach(self, wires, io):
+    points = []
+    for wire in wires:
+      points.append(ConnectionPoint(io))
+      wire.Connect(points[-1])
+    return points
+
+  def assertSameBehaviour(self, inputs, outputs, loaded_inputs, loaded_outputs):
+    writers = self.attach(inputs, ConnectionPoint.WRITER)
+    readers = self.attach(outputs, ConnectionPoint.READER)
+    loaded_writers = self.attach(loaded_inputs, ConnectionPoint.WRITER)
+    loaded_readers = self.attach(loaded_outputs, ConnectionPoint.READER)
+    for values in itertools.product(TRITS, repeat=len(inputs)):
+      for (writer, loaded, value) in zip(writers, loaded_writers, values):
+        writer.SetStateWrite(value)
+        loaded.SetStateWrite(value)
+      self.assertEqual([r.GetState() for r in readers], [r.GetState() for r in loaded_readers],
+          'Inputs %s' % (values,))
+
+  def testGateSumAlternate_RoundTrip(self):
+    (inputs, outputs) = self.setupSum(GateSumAlternate())
+    netlist = Netlist(Dump(inputs, outputs))
+    self.assertEqual(13, netlist.GateCount())
+    (loaded_inputs, loaded_outputs, gates) = netlist.Build()
+    self.assertEqual(13, len(gates))
+    self.assertSameBehaviour(inputs, outputs, loaded_inputs, loaded_outputs)
+
+  def testCompile_MatchesCompile(self):
+    (inputs, outputs) = self.setupSum(GateSumAlternate())
+    expected = Compile(inputs, outputs)
+    circuit = Netlist(Dump(inputs, outputs)).Compile()
+    self.assertEqual(expected.CellCount(), circuit.CellCount())
+    self.assertEqual(expected.LevelCount(), circuit.LevelCount())
+    for values in itertools.product(TRITS, repeat=2):
+      self.assertEqual(expected.Step(values), circuit.Step(values))
+
+  def testTableDelayAndState(self):
+    gate = GateTable(Fuse(GateXor, GateIncrement))
+    gate.SetDelay(2.5, True)
+    mem = GateMem()
+    inputs = [Wire(), Wire(), Wire()]
+    output = Wire()
+    gate.SetInputWires(inputs[:2])
+    gate.SetOutputWire(output)
+    mem.SetInputWire1(output)
+    mem.SetInputWire2(inputs[2])
+    mem.SetOutputWire(Wire())
+    mem._output._state = MINUS
+
+    (loaded_inputs, loaded_outputs, gates) = Netlist(Dump(inputs, [output])).Build()
+    self.assertEqual(gate.Table(), gates[0].Table())
+    self.assertEqual((2.5, True), (gates[0]._delay, gates[0]._inertial))
+    self.assertEqual(MINUS, gates[1].ReadOutput())
+    self.assertEqual(3, len(loaded_inputs))
+
+    circuit = Netlist(Dump(inputs, [output])).Compile()
+    self.assertEqual(Compile(inputs, [output]).state, circuit.state)
+
+  def testLoad_MemoryMapped(self):
+    (inputs, outputs) = self.setupSum(GateSum())
+    with tempfile.TemporaryDirectory() as directory:
+      path = os.path.join(directory, 'sum.tnet')
+      Save(path, inputs, outputs)
+      netlist = Load(path)
+      self.assertEqual(['GateSum'], netlist.names)
+      (loaded_inputs, loaded_outputs, gates) = netlist.Build()
+      netlist.Close()
+    self.assertSameBehaviour(inputs, outputs, loaded_inputs, loaded_outputs)
+
+  def testText(self):
+    inputs = [Wire(), Wire()]
+    output = Wire()
+    gate = GateAnd()
+    gate.SetInputWire1(inputs[0])
+    gate.SetInputWire2(inputs[1])
+    gate.SetOutputWire(output)
+    self.assertEqual(
+        'netlist v1: 1 gates, 3 wires\n'
+        'inputs: w0 w1\n'
+        'outputs: w2\n'
+        'wire w0 (0): p0\n'
+        'wire w1 (0): p1\n'
+        'wire w2 (0): p2\n'
+        'gate g0 GateAnd p0:in(0)=w0 p1:in(0)=w1 p2:out(0)=w2\n',
+        Netlist(Dump(inputs, [output])).Text())
+
+  def testBadFile_Raises(self):
+    data = Dump(*self.setupSum(GateSum()))
+    with self.assertRaises(NetlistError):
+      Netlist(b'XNET' + data[4:])
+    with self.assertRaises(NetlistError):
+      Netlist(data[:4] + struct.pack('<H', VERSION + 1) + data[6:])
+    with self.assertRaises(NetlistError):
+      Netlist(data[:len(data) // 2])
+
+  def testUnsupportedGate_Raises(self):
+    wire = Wire()
+    Memoize(GateNegate()).SetOutputWire(wire)
+    with self.assertRaises(NetlistError):
+      Dump([], [wire])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,214 @@
+import itertools
+
+from circuit import *
+
+
+class OptimizeReport:
+  def __init__(self, cells_before):
+    self.cells_before = cells_before
+    self.cells_after = cells_before
+    self.removed = 0
+    self.folded = 0
+    self.collapsed = 0
+    self.merged = 0
+
+  def __str__(self):
+    return '%s<cells: %d -> %d, removed: %d, folded: %d, collapsed: %d, merged: %d>' % \
+        (type(self).__name__, self.cells_before, self.cells_after, self.removed,
+         self.folded, self.collapsed, self.merged)
+
+
+def ReduceTable(table, ins, fixed):
+  """
+  Fixes the inputs in `fixed` (wire id -> state) and drops the inputs the table
+  does not depend on. Returns the smaller (table, ins).
+  """
+  count = len(ins)
+  def Lookup(values):
+    return table[TableIndex(values)]
+
+  keep = []
+  for (j, wire) in enumerate(ins):
+    if wire in fixed:
+      continue
+    others = [TRITS] * count
+    for (k, other) in enumerate(ins):
+      if other in fixed:
+        others[k] = (fixed[other],)
+    others[j] = (NEUTRAL,)
+    for values in itertools.product(*others):
+      values = list(values)
+      column = set()
+      for value in TRITS:
+        values[j] = value
+        column.add(Lookup(values))
+      if len(column) > 1:
+        keep.append(j)
+        break
+
+  if len(keep) == count:
+    return table, tuple(ins)
+  base = [fixed.get(wire, NEUTRAL) for wire in ins]
+  reduced = []
+  for values in itertools.product(TRITS, repeat=len(keep)):
+    for (j, value) in zip(keep, values):
+      base[j] = value
+    reduced.append(Lookup(base))
+  return tuple(reduced), tuple(ins[j] for j in keep)
+
+
+def Optimize(circuit, max_support=4):
+  """
+  Returns an optimized copy of a compiled Circuit and an OptimizeReport.
+
+  Every output cone that depends on at most `max_support` inputs, held values
+  or other leaves is collapsed into a single table cell over those leaves. That
+  folds constants, turns chains of monadic gates into one table (or into
+  nothing, for an identity), and removes internal gates. Cells that reach no
+  output are dropped, and cells with the same table and inputs are merged.
+
+  Outputs settle to the same values for any sequence of inputs. Wires inside
+  removed cones are no longer updated.
+  """
+  report = OptimizeReport(circuit.CellCount())
+  cells = [(circuit.tables[code], ins, out) for (code, ins, out) in
+      zip(circuit.cell_codes, circuit.cell_inputs, circuit.cell_outputs)]
+  state = list(circuit.state)
+  output_ids = list(circuit.output_ids)
+  wire_ids = dict(circuit._wire_ids)
+
+  while True:
+    count = len(cells)
+    cells, aliases = _Collapse(cells, state, circuit.input_ids, output_ids, max_support, report)
+    cells = _Merge(cells, aliases, report)
+    output_ids = [_Resolve(aliases, idx) for idx in output_ids]
+    for wire in wire_ids:
+      wire_ids[wire] = _Resolve(aliases, wire_ids[wire])
+    if len(cells) >= count:
+      break
+
+  codes = {}
+  for (table, ins, out) in cells:
+    codes.setdefault(table, len(codes))
+  tables = list(codes)
+  optimized = Circuit(circuit.wire_count, tables, [codes[table] for (table, ins, out) in cells],
+      [ins for (table, ins, out) in cells], [out for (table, ins, out) in cells],
+      circuit.input_ids, output_ids, state, wire_ids)
+  report.cells_after = optimized.CellCount()
+  return optimized, report
+
+
+def _Resolve(aliases, idx):
+  while idx in aliases:
+    idx = aliases[idx]
+  return idx
+
+
+def _Collapse(cells, state, input_ids, output_ids, max_support, report):
+  driver = {}
+  for (i, (table, ins, out)) in enumerate(cells):
+    driver[out] = i
+  inputs = set(input_ids)
+
+  def IsConstant(wire):
+    return wire not in driver and wire not in inputs
+
+  def IsPure(i):
+    return cells[i][2] not in cells[i][1]
+
+  # The leaves each wire depends on, or None if there are too many. Inputs and
+  # held values are leaves, constants are not.
+  support = {}
+  for (i, (table, ins, out)) in enumerate(cells):
+    if not IsPure(i):
+      support[out] = (out,)
+      continue
+    leaves = {}
+    for wire in ins:
+      if wire in support:
+        found = support[wire]
+      else:
+        found = () if IsConstant(wire) else (wire,)
+      if found is None:
+        leaves = None
+        break
+      leaves.update(dict.fromkeys(found))
+      if len(leaves) > max_support:
+        leaves = None
+        break
+    support[out] = None if leaves is None else tuple(leaves)
+
+  new_cells = []
+  aliases = {}
+  needed = set(output_ids)
+  for i in reversed(range(len(cells))):
+    (table, ins, out) = cells[i]
+    if out not in needed:
+      report.removed += 1
+      continue
+    fixed = {wire: state[wire] for wire in ins if IsConstant(wire)}
+    leaves = support[out] if IsPure(i) else None
+    if leaves is None or (not fixed and set(leaves) == set(ins)):
+      # Kept as is, apart from constant inputs.
+      table, ins = ReduceTable(table, ins, fixed)
+    else:
+      table, ins = ReduceTable(_ConeTable(cells, driver, out, leaves, state), leaves, {})
+      report.collapsed += 1
+
+    if not ins:
+      state[out] = table[0]
+      report.folded += 1
+    elif len(ins) == 1 and ins[0] != out and table == TruthTable(GateIdentity):
+      aliases[out] = ins[0]
+      needed.add(ins[0])
+    else:
+      new_cells.append((table, ins, out))
+      needed.update(ins)
+
+  new_cells.reverse()
+  # A wire folded to a constant after its reader was visited is still read
+  # from `state`; the next round folds it into the reader.
+  return [(table, tuple(_Resolve(aliases, w) for w in ins), out)
+      for (table, ins, out) in new_cells], aliases
+
+
+def _ConeTable(cells, driver, out, leaves, state):
+  """Evaluates the cone driving `out` for every combination of its leaves."""
+  leaf_set = set(leaves)
+  cone = set()
+  pending = [out]
+  while pending:
+    wire = pending.pop()
+    if wire in leaf_set or wire not in driver or driver[wire] in cone:
+      continue
+    cone.add(driver[wire])
+    pending.extend(cells[driver[wire]][1])
+  program = [cells[i] for i in sorted(cone)]
+
+  table = []
+  values = dict((wire, state[wire]) for (t, ins, o) in program for wire in ins)
+  for assignment in itertools.product(TRITS, repeat=len(leaves)):
+    values.update(zip(leaves, assignment))
+    for (t, ins, o) in program:
+      values[o] = t[TableIndex(values[w] for w in ins)]
+    table.append(values[out])
+  return tuple(table)
+
+
+def _Merge(cells, aliases, report):
+  """Merges cells with the same table and inputs, until none are left."""
+  while True:
+    seen = {}
+    merged = {}
+    for (table, ins, out) in cells:
+      key = (table, ins)
+      if key in seen and out not in ins:
+        merged[out] = seen[key]
+      else:
+        seen.setdefault(key, out)
+    if not merged:
+      return cells
+    report.merged += len(merged)
+    aliases.update(merged)
+    cells = [(table, tuple(_Resolve(aliases, w) for w in ins), out)
+        for (table, ins, out) in cells if out not in merged]
@@ -0,0 +1,119 @@
+from optimizer import *
+import itertools
+import random
+import unittest
+
+
+def Sequence(circuit, rng, length=200):
+  return [tuple(rng.choice(TRITS) for i in circuit.input_ids) for j in range(length)]
+
+
+class TestOptimize(unittest.TestCase):
+  def assertEquivalent(self, circuit, optimized, vectors):
+    for values in vectors:
+      self.assertEqual(circuit.Step(values), optimized.Step(values), 'Inputs %s' % (values,))
+
+  def testGateSumAlternate_CollapsesToGateSum(self):
+    circuit = CompileGate(GateSumAlternate())
+    optimized, report = Optimize(circuit)
+    self.assertEqual(13, report.cells_before)
+    self.assertEqual(2, report.cells_after)
+    self.assertEqual(sorted([TruthTable(GateSum), TruthTable(GateConsensus)]), sorted(optimized.tables))
+    self.assertEquivalent(circuit, optimized, itertools.product(TRITS, repeat=2))
+
+  def testMonadicChain_CollapsesToIdentity(self):
+    wires = [Wire() for i in range(5)]
+    for (i, gate_type) in enumerate([GateIncrement, GateDecrement, GateNegate, GateNegate]):
+      gate = gate_type()
+      gate.SetInputWire(wires[i])
+      gate.SetOutputWire(wires[i + 1])
+    circuit = Compile(wires[:1], wires[-1:])
+    optimized, report = Optimize(circuit)
+    self.assertEqual(0, optimized.CellCount())
+    self.assertEqual(optimized.input_ids, optimized.output_ids)
+    self.assertEquivalent(circuit, optimized, [(t,) for t in TRITS])
+
+  def testConstants_Fold(self):
+    wire_in, wire_const, wire_mid, wire_out = Wire(), Wire(), Wire(), Wire()
+    constant = ConnectionPoint(ConnectionPoint.WRITER, state=MINUS)
+    wire_const.Connect(constant)
+    negate = GateNegate()
+    negate.SetInputWire(wire_const)
+    negate.SetOutputWire(wire_mid)
+    gate = GateOr()
+    gate.SetInputWire1(wire_in)
+    gate.SetInputWire2(wire_mid)
+    gate.SetOutputWire(wire_out)
+    circuit = Compile([wire_in], [wire_out])
+    optimized, report = Optimize(circuit)
+    self.assertEqual(0, optimized.CellCount())
+    self.assertEqual([PLUS], [optimized.state[idx] for idx in optimized.output_ids])
+    self.assertEquivalent(circuit, optimized, [(t,) for t in TRITS])
+
+  def testDeadGates_Removed(self):
+    wire_in, wire_out, wire_dead = Wire(), Wire(), Wire()
+    for (gate_type, out) in [(GateNegate, wire_out), (GateIncrement, wire_dead)]:
+      gate = gate_type()
+      gate.SetInputWire(wire_in)
+      gate.SetOutputWire(out)
+    optimized, report = Optimize(Compile([wire_in], [wire_out]))
+    self.assertEqual(1, optimized.CellCount())
+    self.assertEqual(1, report.removed)
+
+  def testDuplicates_Merged(self):
+    # Two identical sums of the same wires feeding a consensus.
+    a, b, s1, s2, out = Wire(), Wire(), Wire(), Wire(), Wire()
+    for s in (s1, s2):
+      gate = GateXor()
+      gate.SetInputWire1(a)
+      gate.SetInputWire2(b)
+      gate.SetOutputWire(s)
+    mem = GateMem()
+    mem.SetInputWire1(s1)
+    mem.SetInputWire2(s2)
+    mem.SetOutputWire(out)
+    circuit = Compile([a, b], [out])
+    optimized, report = Optimize(circuit, max_support=1)
+    self.assertEqual(1, report.merged)
+    self.assertEqual(2, optimized.CellCount())
+    self.assertEquivalent(circuit, optimized, Sequence(circuit, random.Random(1)))
+
+  def testTryte_KeepsState(self):
+    tryte = Tryte()
+    inwires = [Wire() for i in range(9)]
+    outwires = [Wire() for i in range(9)]
+    readwire = Wire()
+    tryte.SetInputWires(inwires)
+    tryte.SetOutputWires(outwires)
+    tryte.SetReadWire(readwire)
+    circuit = Compile(inwires + [readwire], outwires)
+    optimized, report = Optimize(circuit)
+    self.assertEqual(9, optimized.CellCount())
+    self.assertEquivalent(circuit, optimized, Sequence(circuit, random.Random(2)))
+
+  def testRandomCircuits_Equivalent(self):
+    rng = random.Random(5)
+    gate_types = [GateIdentity, GateIncrement, GateDecrement, GateNegate, GateIsHigh,
+        GateIsLow, GateAnd, GateNand, GateOr, GateXor, GateConsensus, GateSum, GateMem]
+    for trial in range(20):
+      wires = [Wire() for i in range(4)]
+      inputs = list(wires)
+      for i in range(30):
+        gate = rng.choice(gate_types)()
+        out = Wire()
+        if isinstance(gate, GateMonadic):
+          gate.SetInputWire(rng.choice(wires))
+        else:
+          gate.SetInputWire1(rng.choice(wires))
+          gate.SetInputWire2(rng.choice(wires))
+        gate.SetOutputWire(out)
+        wires.append(out)
+      outputs = rng.sample(wires[4:], 3)
+      circuit = Compile(inputs, outputs)
+      optimized, report = Optimize(circuit, max_support=rng.choice([1, 2, 3, 4]))
+      self.assertLessEqual(report.cells_after, report.cells_before)
+      self.assertEquivalent(circuit, optimized, Sequence(circuit, rng, 50))
+
+
+if __name__ == '__main__':
+  unittest.main()
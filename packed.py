@@ -0,0 +1,228 @@
+from circuit import *
+
+
+class PackedTrits:
+  """
+  Many independent trit lanes stored as two bitplanes in Python ints. Bit i of
+  `plus` is set when lane i is (+) and bit i of `minus` when it is (-). A lane
+  with neither bit set is (0).
+  """
+  def __init__(self, plus, minus, width):
+    if plus & minus:
+      raise BadStateException('both (+) and (-) in lanes %s' % bin(plus & minus))
+    self.plus = plus
+    self.minus = minus
+    self.width = width
+
+  def Mask(self):
+    return (1 << self.width) - 1
+
+  def Neutral(self):
+    return ~(self.plus | self.minus) & self.Mask()
+
+  def Get(self, lane):
+    return (self.plus >> lane & 1) - (self.minus >> lane & 1)
+
+  def Trits(self):
+    return [self.Get(lane) for lane in range(self.width)]
+
+  def __len__(self):
+    return self.width
+
+  def __eq__(self, other):
+    return isinstance(other, PackedTrits) and \
+        (self.plus, self.minus, self.width) == (other.plus, other.minus, other.width)
+
+  def __str__(self):
+    return '%s<%s>' % (type(self).__name__, ','.join(STATE_NAME[t] for t in self.Trits()))
+
+
+def Pack(values):
+  plus = 0
+  minus = 0
+  for (lane, value) in enumerate(values):
+    if value == PLUS:
+      plus |= 1 << lane
+    elif value == MINUS:
+      minus |= 1 << lane
+    elif value != NEUTRAL:
+      raise BadStateException(value)
+  return PackedTrits(plus, minus, len(values))
+
+def Broadcast(value, width):
+  mask = (1 << width) - 1
+  return PackedTrits(value == PLUS and mask or 0, value == MINUS and mask or 0, width)
+
+def AllPacked(count):
+  """
+  Every combination of `count` trits, one combination per lane. Returns one
+  PackedTrits per input, each 3 ** count lanes wide, with the first input
+  changing slowest.
+  """
+  width = 3 ** count
+  inputs = []
+  for i in range(count):
+    run = 3 ** (count - 1 - i)
+    # One period of (-)*run, (0)*run, (+)*run, repeated across every lane.
+    block = (1 << run) - 1
+    period = 3 * run
+    repeat = sum(1 << (k * period) for k in range(width // period))
+    inputs.append(PackedTrits((block << 2 * run) * repeat, block * repeat, width))
+  return inputs
+
+
+# Bitplane formulas. Each takes the (plus, minus) planes of its inputs and the
+# lane mask, and returns the (plus, minus) planes of the output.
+def _Identity(ap, am, mask):
+  return ap, am
+
+def _Increment(ap, am, mask):
+  return ~(ap | am) & mask, ap
+
+def _Decrement(ap, am, mask):
+  return am, ~(ap | am) & mask
+
+def _Negate(ap, am, mask):
+  return am, ap
+
+def _IsHigh(ap, am, mask):
+  return ap, ~ap & mask
+
+def _IsNeutral(ap, am, mask):
+  return ~(ap | am) & mask, ap | am
+
+def _IsLow(ap, am, mask):
+  return am, ~am & mask
+
+def _And(ap, am, bp, bm, mask):
+  return ap & bp, am | bm
+
+def _Or(ap, am, bp, bm, mask):
+  return ap | bp, am & bm
+
+def _Xor(ap, am, bp, bm, mask):
+  return (ap & bm) | (am & bp), (ap & bp) | (am & bm)
+
+def _Consensus(ap, am, bp, bm, mask):
+  return ap & bp, am & bm
+
+def _Sum(ap, am, bp, bm, mask):
+  az = ~(ap | am) & mask
+  bz = ~(bp | bm) & mask
+  return (ap & bz) | (az & bp) | (am & bm), (am & bz) | (az & bm) | (ap & bp)
+
+def _Negated(fn):
+  def Negated(*planes):
+    p, m = fn(*planes)
+    return m, p
+  return Negated
+
+def _Mem(ap, am, bp, bm, sp, sm, mask):
+  bz = ~(bp | bm) & mask
+  return (bp & ap) | (bm & am) | (bz & sp), (bp & am) | (bm & ap) | (bz & sm)
+
+PLANE_OPS = {
+  TruthTable(GateIdentity): _Identity,
+  TruthTable(GateIncrement): _Increment,
+  TruthTable(GateDecrement): _Decrement,
+  TruthTable(GateNegate): _Negate,
+  TruthTable(GateIsHigh): _IsHigh,
+  TruthTable(GateIsNeutral): _IsNeutral,
+  TruthTable(GateIsLow): _IsLow,
+  TruthTable(GateAnd): _And,
+  TruthTable(GateNand): _Negated(_And),
+  TruthTable(GateOr): _Or,
+  TruthTable(GateNor): _Negated(_Or),
+  TruthTable(GateXor): _Xor,
+  TruthTable(GateXnor): _Negated(_Xor),
+  TruthTable(GateConsensus): _Consensus,
+  TruthTable(GateSum): _Sum,
+  TruthTable(GateMem): _Mem,
+}
+
+def TablePlanes(table, planes, mask):
+  """
+  Evaluates any truth table on bitplanes as a sum of minterms. `planes` holds
+  (plus, minus) pairs, one per input.
+  """
+  literals = []
+  for (p, m) in planes:
+    literals.append((m, ~(p | m) & mask, p))
+  out_p = 0
+  out_m = 0
+  count = len(planes)
+  for (idx, value) in enumerate(table):
+    if value == NEUTRAL:
+      continue
+    term = mask
+    for i in range(count):
+      term &= literals[i][idx // 3 ** (count - 1 - i) % 3]
+      if not term:
+        break
+    if value == PLUS:
+      out_p |= term
+    else:
+      out_m |= term
+  return out_p, out_m
+
+
+def _Apply(fn, *inputs):
+  mask = inputs[0].Mask()
+  planes = []
+  for packed in inputs:
+    planes.extend((packed.plus, packed.minus))
+  p, m = fn(*planes, mask)
+  return PackedTrits(p, m, inputs[0].width)
+
+def Identity(a): return _Apply(_Identity, a)
+def Increment(a): return _Apply(_Increment, a)
+def Decrement(a): return _Apply(_Decrement, a)
+def Negate(a): return _Apply(_Negate, a)
+def IsHigh(a): return _Apply(_IsHigh, a)
+def IsNeutral(a): return _Apply(_IsNeutral, a)
+def IsLow(a): return _Apply(_IsLow, a)
+def And(a, b): return _Apply(_And, a, b)
+def Nand(a, b): return _Apply(_Negated(_And), a, b)
+def Or(a, b): return _Apply(_Or, a, b)
+def Nor(a, b): return _Apply(_Negated(_Or), a, b)
+def Xor(a, b): return _Apply(_Xor, a, b)
+def Xnor(a, b): return _Apply(_Negated(_Xor), a, b)
+def Consensus(a, b): return _Apply(_Consensus, a, b)
+
+def Sum(a, b):
+  """Returns the (sum, overflow) of GateSum."""
+  return _Apply(_Sum, a, b), _Apply(_Consensus, a, b)
+
+def Mem(a, b, held):
+  """GateMem: `a` where `b` is (+), its negation where `b` is (-), else `held`."""
+  return _Apply(_Mem, a, b, held)
+
+
+def EvaluatePacked(circuit, inputs):
+  """
+  Evaluates a compiled Circuit once for every lane of `inputs`, one
+  PackedTrits per circuit input. Lanes start from the circuit's current state
+  and the circuit itself is left untouched. Returns one PackedTrits per output.
+  """
+  if len(inputs) != len(circuit.input_ids):
+    raise ConnectionError('Expected %d inputs, got %d' % (len(circuit.input_ids), len(inputs)))
+  width = inputs and inputs[0].width or 1
+  mask = (1 << width) - 1
+  plus = [value == PLUS and mask or 0 for value in circuit.state]
+  minus = [value == MINUS and mask or 0 for value in circuit.state]
+  for (idx, packed) in zip(circuit.input_ids, inputs):
+    plus[idx] = packed.plus
+    minus[idx] = packed.minus
+
+  for (code, ins, out) in zip(circuit.cell_codes, circuit.cell_inputs, circuit.cell_outputs):
+    table = circuit.tables[code]
+    op = PLANE_OPS.get(table)
+    if op:
+      planes = []
+      for i in ins:
+        planes.append(plus[i])
+        planes.append(minus[i])
+      plus[out], minus[out] = op(*planes, mask)
+    else:
+      plus[out], minus[out] = TablePlanes(table, [(plus[i], minus[i]) for i in ins], mask)
+  return [PackedTrits(plus[idx], minus[idx], width) for idx in circuit.output_ids]
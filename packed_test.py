@@ -0,0 +1,87 @@
+from packed import *
+import itertools
+import unittest
+
+GATE_FUNCTIONS = {
+  GateIdentity: Identity,
+  GateIncrement: Increment,
+  GateDecrement: Decrement,
+  GateNegate: Negate,
+  GateIsHigh: IsHigh,
+  GateIsNeutral: IsNeutral,
+  GateIsLow: IsLow,
+  GateAnd: And,
+  GateNand: Nand,
+  GateOr: Or,
+  GateNor: Nor,
+  GateXor: Xor,
+  GateXnor: Xnor,
+  GateConsensus: Consensus,
+}
+
+
+class TestPackedTrits(unittest.TestCase):
+  def testPack_RoundTrips(self):
+    values = [PLUS, NEUTRAL, MINUS, MINUS, PLUS]
+    packed = Pack(values)
+    self.assertEqual(values, packed.Trits())
+    self.assertEqual(0b00010, packed.Neutral())
+    self.assertEqual(Pack([MINUS] * 3), Broadcast(MINUS, 3))
+
+  def testPack_BadState(self):
+    with self.assertRaises(BadStateException):
+      Pack([PLUS, 2])
+    with self.assertRaises(BadStateException):
+      PackedTrits(1, 1, 1)
+
+  def testAllPacked_MatchesTableIndex(self):
+    inputs = AllPacked(3)
+    for values in itertools.product(TRITS, repeat=3):
+      lane = TableIndex(values)
+      self.assertEqual(values, tuple(packed.Get(lane) for packed in inputs))
+
+
+class TestPackedGates(unittest.TestCase):
+  def testGates_MatchCompiledTables(self):
+    for (gate_type, fn) in GATE_FUNCTIONS.items():
+      circuit = CompileGate(gate_type())
+      inputs = AllPacked(len(circuit.input_ids))
+      self.assertEqual(list(circuit.tables[0]), fn(*inputs).Trits(), gate_type.__name__)
+
+  def testSum(self):
+    a, b = AllPacked(2)
+    total, overflow = Sum(a, b)
+    self.assertEqual(list(DiadicTable(GateSum.LOGIC_MAP)), total.Trits())
+    self.assertEqual(list(DiadicTable(GateConsensus.LOGIC_MAP)), overflow.Trits())
+
+  def testMem(self):
+    self.assertEqual(list(MEM_TABLE), Mem(*AllPacked(3)).Trits())
+
+  def testTablePlanes_MatchesFormulas(self):
+    inputs = AllPacked(3)
+    planes = [(packed.plus, packed.minus) for packed in inputs]
+    mask = inputs[0].Mask()
+    for (table, op) in PLANE_OPS.items():
+      count = {3: 1, 9: 2, 27: 3}[len(table)]
+      self.assertEqual(TablePlanes(table, planes[-count:], mask),
+          op(*[p for pair in planes[-count:] for p in pair], mask))
+
+
+class TestEvaluatePacked(unittest.TestCase):
+  def testGateSumAlternate(self):
+    circuit = CompileGate(GateSumAlternate())
+    outputs = EvaluatePacked(circuit, AllPacked(2))
+    for values in itertools.product(TRITS, repeat=2):
+      lane = TableIndex(values)
+      self.assertEqual(circuit.Step(values), tuple(packed.Get(lane) for packed in outputs))
+
+  def testGateMem_StartsFromCircuitState(self):
+    circuit = CompileGate(GateMem())
+    circuit.Step((MINUS, PLUS))
+    outputs = EvaluatePacked(circuit, [Pack([PLUS, PLUS]), Pack([NEUTRAL, PLUS])])
+    self.assertEqual([MINUS, PLUS], outputs[0].Trits())
+    self.assertEqual((MINUS,), circuit.ReadOutputs())
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,281 @@
+import array
+import collections
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+
+from circuit import *
+
+RUN = 0
+STOP = 1
+TIMEOUT = 60
+
+
+def Partition(circuit, count):
+  """
+  Assigns each cell of a compiled Circuit to one of `count` partitions of
+  about equal size, keeping cells with the cells driving them where possible
+  so that few wires cross between partitions. Returns the partition of each
+  cell.
+  """
+  cells = circuit.CellCount()
+  count = max(1, min(count, cells))
+  capacity = -(-cells // count)
+  driver = dict((out, i) for (i, out) in enumerate(circuit.cell_outputs))
+  readers = {}
+  for (i, ins) in enumerate(circuit.cell_inputs):
+    for w in ins:
+      readers.setdefault(w, []).append(i)
+  neighbours = []
+  for (i, ins) in enumerate(circuit.cell_inputs):
+    cells_near = [driver[w] for w in ins if w in driver]
+    cells_near.extend(readers.get(circuit.cell_outputs[i], ()))
+    neighbours.append([j for j in cells_near if j != i])
+
+  # Walk the cells breadth first through their neighbours, so that connected
+  # cells are close together, and cut the walk into partitions.
+  order = []
+  seen = [False] * cells
+  for start in range(cells):
+    if seen[start]:
+      continue
+    seen[start] = True
+    pending = collections.deque([start])
+    while pending:
+      i = pending.popleft()
+      order.append(i)
+      for j in neighbours[i]:
+        if not seen[j]:
+          seen[j] = True
+          pending.append(j)
+  assignment = [None] * cells
+  for (n, i) in enumerate(order):
+    assignment[i] = n // capacity
+  loads = [assignment.count(p) for p in range(count)]
+
+  # Then move cells to where most of their neighbours are, while there is room.
+  for sweep in range(2):
+    moved = False
+    for i in range(cells):
+      votes = [0] * count
+      for j in neighbours[i]:
+        votes[assignment[j]] += 1
+      part = assignment[i]
+      best = max(range(count), key=lambda p: (votes[p], p == part))
+      if votes[best] > votes[part] and loads[best] < capacity:
+        loads[part] -= 1
+        loads[best] += 1
+        assignment[i] = best
+        moved = True
+    if not moved:
+      break
+  return assignment
+
+def CutWires(circuit, assignment):
+  """The wires driven in one partition and read in another, in id order."""
+  owner = dict((out, assignment[i]) for (i, out) in enumerate(circuit.cell_outputs))
+  cut = set()
+  for (i, ins) in enumerate(circuit.cell_inputs):
+    for w in ins:
+      if w in owner and owner[w] != assignment[i]:
+        cut.add(w)
+  return sorted(cut)
+
+
+def _Worker(memory, barrier, index, program, imports, owned, exports, layout):
+  """
+  Runs one partition. Each round reads the wires it does not drive from the
+  shared state, evaluates its cells in level order on a local copy, waits for
+  every partition to finish reading, then publishes the wires it drives and
+  whether any cut wire changed. Cells holding state only latch in the round
+  committing their rank, and otherwise keep their held value.
+  """
+  (wire_count, flags_offset, control_offset) = layout
+  view = memory.buf
+  state = view[:wire_count].cast('b')
+  flags = view[flags_offset:control_offset].cast('b')
+  control = view[control_offset:control_offset + 16].cast('q')
+  local = state.tolist()
+  try:
+    while True:
+      barrier.wait()
+      if control[0] == STOP:
+        break
+      commit = control[1]
+      for w in imports:
+        local[w] = state[w]
+      for (table, ins, out, rank) in program:
+        if rank is not None and rank != commit:
+          continue
+        if len(ins) == 2:
+          local[out] = table[3 * local[ins[0]] + local[ins[1]] + 4]
+        else:
+          idx = 0
+          for w in ins:
+            idx = 3 * idx + local[w] + 1
+          local[out] = table[idx]
+      barrier.wait()
+      changed = 0
+      for w in owned:
+        if state[w] != local[w]:
+          state[w] = local[w]
+          changed |= w in exports
+      flags[index] = changed
+      barrier.wait()
+  finally:
+    control.release()
+    flags.release()
+    state.release()
+
+
+def HeldRanks(circuit):
+  """
+  For each cell reading its own output, as GateMem does, the number of such
+  cells on the longest path to its inputs; None for the other cells. Cells of
+  one rank latch together once everything before them has settled.
+  """
+  wire_ranks = {}
+  ranks = []
+  for (ins, out) in zip(circuit.cell_inputs, circuit.cell_outputs):
+    rank = max([wire_ranks.get(w, 0) for w in ins if w != out] or [0])
+    if out in ins:
+      ranks.append(rank)
+      wire_ranks[out] = rank + 1
+    else:
+      ranks.append(None)
+      wire_ranks[out] = rank
+  return ranks
+
+
+class PartitionedCircuit:
+  """
+  Runs a compiled Circuit split into partitions, each in its own worker
+  process, with every wire state in one multiprocessing.shared_memory block.
+
+  Partitions settle together in delta cycles separated by barriers: every
+  partition evaluates its cells against the cut wires of the last cycle, then
+  publishes its own, until no cut wire changes. Cells holding state, like
+  GateMem, would latch the stale values of the first cycles, so they keep their
+  held value while the rest settles and latch once per Step, rank by rank (see
+  HeldRanks), each commit cycle followed by settling again. Each Step is a
+  clock barrier: the inputs are set and the circuit settled. Workers run until
+  Close, or until the end of a with block.
+  """
+  def __init__(self, circuit, count=None, assignment=None):
+    self._circuit = circuit
+    if assignment is None:
+      assignment = Partition(circuit, count or os.cpu_count() or 1)
+    self.assignment = list(assignment)
+    count = max(self.assignment) + 1 if self.assignment else 1
+    self.cut_wires = CutWires(circuit, self.assignment)
+    self.cycles = 0
+
+    wire_count = circuit.wire_count
+    flags_offset = (wire_count + 7) // 8 * 8
+    control_offset = flags_offset + (count + 7) // 8 * 8
+    self._memory = shared_memory.SharedMemory(create=True, size=control_offset + 16)
+    self._view = self._memory.buf
+    self._state = self._view[:wire_count].cast('b')
+    self._flags = self._view[flags_offset:control_offset].cast('b')
+    self._control = self._view[control_offset:control_offset + 16].cast('q')
+    self._view[:wire_count] = array.array('b', circuit.state).tobytes()
+    self._barrier = multiprocessing.Barrier(count + 1, timeout=TIMEOUT)
+
+    ranks = HeldRanks(circuit)
+    self._ranks = sorted(set(rank for rank in ranks if rank is not None))
+    programs = [[] for i in range(count)]
+    for (i, part) in enumerate(self.assignment):
+      programs[part].append((circuit.tables[circuit.cell_codes[i]], circuit.cell_inputs[i],
+          circuit.cell_outputs[i], ranks[i]))
+    exports = set(self.cut_wires)
+    self._workers = []
+    for (index, program) in enumerate(programs):
+      owned = sorted(set(cell[2] for cell in program))
+      imports = sorted(set(w for cell in program for w in cell[1]) - set(owned))
+      worker = multiprocessing.Process(target=_Worker, args=(self._memory, self._barrier, index,
+          program, imports, owned, exports, (wire_count, flags_offset, control_offset)))
+      worker.daemon = True
+      worker.start()
+      self._workers.append(worker)
+
+  def PartitionCount(self):
+    return len(self._workers or ())
+
+  def SetInputs(self, values):
+    circuit = self._circuit
+    if len(values) != len(circuit.input_ids):
+      raise ConnectionError('Expected %d inputs, got %d' % (len(circuit.input_ids), len(values)))
+    for value in values:
+      if value not in VALID_STATES:
+        raise BadStateException(value)
+    for (idx, value) in zip(circuit.input_ids, values):
+      self._state[idx] = value
+
+  def _Cycle(self, commit):
+    """Runs one delta cycle, latching held cells of rank `commit`. Returns
+    whether any cut wire changed."""
+    self._control[0] = RUN
+    self._control[1] = commit
+    self._barrier.wait()
+    self._barrier.wait()
+    self._barrier.wait()
+    self.cycles += 1
+    return any(self._flags)
+
+  def Settle(self):
+    """
+    Runs delta cycles until no cut wire changes, and then for each rank of
+    held cells a commit cycle and delta cycles again. Returns the cycle count.
+    """
+    if self._workers is None:
+      raise ConnectionError('%s is closed' % self)
+    start = self.cycles
+    changed = True
+    while changed:
+      changed = self._Cycle(-1)
+    for rank in self._ranks:
+      changed = self._Cycle(rank)
+      while changed:
+        changed = self._Cycle(-1)
+    return self.cycles - start
+
+  def ReadOutputs(self):
+    state = self._state
+    return tuple(state[idx] for idx in self._circuit.output_ids)
+
+  def Step(self, values):
+    """Sets the inputs, settles every partition and returns the outputs."""
+    self.SetInputs(values)
+    self.Settle()
+    return self.ReadOutputs()
+
+  def GetState(self, wire):
+    return self._state[self._circuit.WireId(wire)]
+
+  def State(self):
+    return self._state.tolist()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc_info):
+    self.Close()
+
+  def Close(self):
+    if self._workers is None:
+      return
+    self._control[0] = STOP
+    self._barrier.wait()
+    for worker in self._workers:
+      worker.join()
+    self._workers = None
+    self._control.release()
+    self._flags.release()
+    self._state.release()
+    self._view = None
+    self._memory.close()
+    self._memory.unlink()
+
+  def __str__(self):
+    return '%s<%d partitions, %d cut wires>' % (type(self).__name__,
+        len(self._workers or ()), len(self.cut_wires))
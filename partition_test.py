@@ -0,0 +1,126 @@
+from partition import *
+from datapath import RippleAdder, STRUCTURAL
+import random
+import unittest
+
+
+def Adders(count, width):
+  """`count` independent structural ripple adders, compiled together."""
+  inputs, outputs = [], []
+  for i in range(count):
+    adder = RippleAdder(width, STRUCTURAL)
+    inputs.extend(point._wire for point in adder._writers)
+    outputs.extend(point._wire for point in adder._readers)
+  return Compile(inputs, outputs)
+
+
+class TestPartition(unittest.TestCase):
+  def testPartition_KeepsAddersApart(self):
+    circuit = Adders(2, 6)
+    assignment = Partition(circuit, 2)
+    self.assertEqual(circuit.CellCount(), len(assignment))
+    self.assertEqual([circuit.CellCount() // 2] * 2, [assignment.count(p) for p in range(2)])
+    self.assertEqual([], CutWires(circuit, assignment))
+    self.assertEqual([0] * circuit.CellCount(), Partition(circuit, 1))
+
+  def testCutWires(self):
+    circuit = CompileGate(GateSumAlternate())
+    self.assertEqual([], CutWires(circuit, [0] * circuit.CellCount()))
+    assignment = [i % 2 for i in range(circuit.CellCount())]
+    cut = CutWires(circuit, assignment)
+    self.assertTrue(cut)
+    self.assertTrue(set(cut) <= set(circuit.cell_outputs))
+
+  def testMatchesCircuit(self):
+    rng = random.Random(22)
+    circuit = Adders(3, 4)
+    reference = Circuit(circuit.wire_count, circuit.tables, circuit.cell_codes,
+        circuit.cell_inputs, circuit.cell_outputs, circuit.input_ids, circuit.output_ids,
+        circuit.state, levels=circuit.levels)
+    # A bad split, so that carries cross partitions on every trit.
+    assignment = [i % 3 for i in range(circuit.CellCount())]
+    partitioned = PartitionedCircuit(circuit, assignment=assignment)
+    self.addCleanup(partitioned.Close)
+    self.assertEqual(3, partitioned.PartitionCount())
+    self.assertIn('3 partitions', str(partitioned))
+    for i in range(20):
+      values = [rng.choice(TRITS) for idx in circuit.input_ids]
+      self.assertEqual(reference.Step(values), partitioned.Step(values))
+    self.assertEqual(reference.state, partitioned.State())
+    self.assertGreater(partitioned.cycles, 20)
+
+  def testMemHolds(self):
+    mem = GateMem()
+    (data, clock, output) = (Wire(), Wire(), Wire())
+    mem.SetInputWire1(data)
+    mem.SetInputWire2(clock)
+    mem.SetOutputWire(output)
+    negate = GateNegate()
+    negate.SetInputWire(output)
+    negated = Wire()
+    negate.SetOutputWire(negated)
+    circuit = Compile([data, clock], [output, negated])
+    partitioned = PartitionedCircuit(circuit, assignment=[0, 1])
+    self.addCleanup(partitioned.Close)
+    self.assertEqual((PLUS, MINUS), partitioned.Step([PLUS, PLUS]))
+    self.assertEqual((PLUS, MINUS), partitioned.Step([MINUS, NEUTRAL]))
+    self.assertEqual(2, partitioned.Settle())
+    self.assertEqual(MINUS, partitioned.GetState(negated))
+    self.assertEqual((MINUS, PLUS), partitioned.Step([PLUS, MINUS]))
+
+  def testMemEnableAcrossCut_MatchesCircuit(self):
+    (data, enable, negated, output) = (Wire(), Wire(), Wire(), Wire())
+    negate = GateNegate()
+    negate.SetInputWire(enable)
+    negate.SetOutputWire(negated)
+    mem = GateMem()
+    mem.SetInputWire1(data)
+    mem.SetInputWire2(negated)
+    mem.SetOutputWire(output)
+    second = GateMem()
+    second.SetInputWire1(output)
+    second.SetInputWire2(negated)
+    latched = Wire()
+    second.SetOutputWire(latched)
+    circuit = Compile([data, enable], [output, latched])
+    reference = Circuit(circuit.wire_count, circuit.tables, circuit.cell_codes,
+        circuit.cell_inputs, circuit.cell_outputs, circuit.input_ids, circuit.output_ids,
+        circuit.state, levels=circuit.levels)
+    self.assertEqual([None, 0, 1], HeldRanks(circuit))
+    # Every cell in its own partition, so both enables cross a cut.
+    partitioned = PartitionedCircuit(circuit, assignment=[0, 1, 2])
+    self.addCleanup(partitioned.Close)
+    rng = random.Random(22)
+    vectors = [(PLUS, MINUS), (MINUS, NEUTRAL)]
+    vectors += [(rng.choice(TRITS), rng.choice(TRITS)) for i in range(30)]
+    for values in vectors:
+      self.assertEqual(reference.Step(values), partitioned.Step(values), values)
+
+  def testBadInputs_Raise(self):
+    partitioned = PartitionedCircuit(CompileGate(GateAnd()), 2)
+    self.addCleanup(partitioned.Close)
+    self.assertEqual(1, partitioned.PartitionCount())
+    with self.assertRaises(ConnectionError):
+      partitioned.SetInputs([PLUS])
+    with self.assertRaises(BadStateException):
+      partitioned.SetInputs([PLUS, 2])
+
+  def testClose(self):
+    partitioned = PartitionedCircuit(CompileGate(GateAnd()))
+    partitioned.Close()
+    partitioned.Close()
+    self.assertEqual(0, partitioned.PartitionCount())
+    with self.assertRaises(ConnectionError):
+      partitioned.Settle()
+
+  def testWith_ClosesOnError(self):
+    with self.assertRaises(BadStateException):
+      with PartitionedCircuit(CompileGate(GateAnd())) as partitioned:
+        workers = list(partitioned._workers)
+        partitioned.Step((PLUS, 2))
+    self.assertEqual(0, partitioned.PartitionCount())
+    self.assertFalse(any(worker.is_alive() for worker in workers))
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,188 @@
+import collections
+
+import gates
+from gates import *
+
+# Profiled gates, wires and worklists and the Profiler counting them. Only
+# objects in here have their class swapped, so profiling costs nothing when
+# it is off.
+PROFILED = {}
+_PROFILED_CLASSES = {}
+
+
+def _ProfiledClass(cls, method, wrapper):
+  """A subclass of `cls` with no new slots whose `method` goes through
+  `wrapper(profiler, obj, original)`."""
+  key = (cls, method)
+  if key not in _PROFILED_CLASSES:
+    original = getattr(cls, method)
+    def Profiled(self):
+      return wrapper(PROFILED[self], self, original)
+    def Build(base):
+      return _ProfiledClass(base, method, wrapper)
+    _PROFILED_CLASSES[key] = type('Profiled' + cls.__name__, (cls,),
+        {'__slots__': (), method: Profiled, '__module__': __name__,
+         '_hook_layer': 'Profiler', '_hook_build': staticmethod(Build)})
+  return _PROFILED_CLASSES[key]
+
+
+class Profiler:
+  """
+  Counts, for every gate and wire reachable from some wires, how often they
+  update and what the updates do: gate updates that change an output versus
+  no-ops, the fanout of every wire update, and how deep each write settles.
+  In the recursive mode that is the deepest nesting of gate updates under one
+  write from outside the circuit; with the worklist it is the number of delta
+  cycles.
+
+  Gates and wires are profiled by swapping their class for a subclass with
+  the same slots, and are put back by Detach, keeping any hook put over the
+  profiled class since, such as a Tracer's.
+  """
+  def __init__(self):
+    self._classes = {}
+    self._order = {}
+    self._counts = collections.Counter()
+    self._writers = {}
+    self.Reset()
+
+  def Reset(self):
+    self.gate_updates = collections.Counter()
+    self.gate_changes = collections.Counter()
+    self.wire_updates = collections.Counter()
+    self.fanout = collections.Counter()
+    self.settle_depths = collections.Counter()
+    self.settle_deltas = collections.Counter()
+    self._depth = 0
+    self._max_depth = 0
+
+  def Attach(self, wires):
+    """Profiles every gate and wire reachable from `wires`, and the worklist."""
+    points = ReachablePoints(wires)
+    if points is None:
+      raise ConnectionError('A gate does not list its ConnectionPoints')
+    try:
+      for point in points:
+        gate = point._controller
+        if gate and gate not in self._classes:
+          self._Swap(gate, _ProfiledClass(type(gate), 'Update', Profiler._GateUpdate))
+          self._writers[gate] = tuple(p for p in gate.ConnectionPoints() if p.IsWriter())
+        if point.HasWire() and point._wire not in self._classes:
+          self._Swap(point._wire, _ProfiledClass(type(point._wire), 'Update', Profiler._WireUpdate))
+    except ConnectionError:
+      self.Detach()
+      raise
+    if gates.WORKLIST not in PROFILED:
+      self._Swap(gates.WORKLIST, _ProfiledClass(type(gates.WORKLIST), 'Settle', Profiler._Settle))
+
+  def Detach(self):
+    for obj in self._classes:
+      Unhook(obj, 'Profiler')
+      del PROFILED[obj]
+    self._classes = {}
+    self._order = {}
+    self._counts = collections.Counter()
+    self._writers = {}
+
+  def _Swap(self, obj, cls):
+    if obj in PROFILED:
+      raise ConnectionError('%s is already profiled' % obj)
+    PROFILED[obj] = self
+    self._classes[obj] = type(obj)
+    self._order[obj] = self._counts[type(obj)]
+    self._counts[type(obj)] += 1
+    obj.__class__ = cls
+
+  def _GateUpdate(self, gate, update):
+    writers = self._writers[gate]
+    before = [p._state for p in writers]
+    self._depth += 1
+    if self._depth > self._max_depth:
+      self._max_depth = self._depth
+    try:
+      update(gate)
+    finally:
+      self._depth -= 1
+    self.gate_updates[gate] += 1
+    for (point, state) in zip(writers, before):
+      if point._state != state:
+        self.gate_changes[gate] += 1
+        break
+
+  def _WireUpdate(self, wire, update):
+    self.wire_updates[wire] += 1
+    self.fanout[len(wire._readers)] += 1
+    if self._depth:
+      return update(wire)
+    # A write from outside the circuit.
+    self._max_depth = 0
+    update(wire)
+    self.settle_depths[self._max_depth] += 1
+
+  def _Settle(self, worklist, settle):
+    deltas = settle(worklist)
+    if deltas:
+      self.settle_deltas[deltas] += 1
+    return deltas
+
+  def Name(self, obj):
+    """The original class name of a profiled object and its order of discovery
+    among objects of that class."""
+    return '%s#%d' % (self._classes[obj].__name__, self._order[obj])
+
+  def Report(self):
+    return ProfileReport(self)
+
+
+class ProfileReport:
+  """The counts of a Profiler at one moment, by gate, gate class and wire."""
+  def __init__(self, profiler):
+    self.gate_updates = dict((profiler.Name(g), n) for (g, n) in profiler.gate_updates.items())
+    self.gate_changes = dict((profiler.Name(g), n) for (g, n) in profiler.gate_changes.items())
+    self.wire_updates = dict((profiler.Name(w), n) for (w, n) in profiler.wire_updates.items())
+    self.wire_fanout = dict((profiler.Name(w), len(w._readers)) for w in profiler.wire_updates)
+    self.class_updates = collections.Counter()
+    self.class_changes = collections.Counter()
+    for (gate, n) in profiler.gate_updates.items():
+      name = profiler._classes[gate].__name__
+      self.class_updates[name] += n
+      self.class_changes[name] += profiler.gate_changes[gate]
+    self.fanout = dict(profiler.fanout)
+    self.settle_depths = dict(profiler.settle_depths)
+    self.settle_deltas = dict(profiler.settle_deltas)
+
+  def Updates(self):
+    return sum(self.gate_updates.values())
+
+  def Changes(self):
+    return sum(self.gate_changes.values())
+
+  def HotGates(self, count=10):
+    """The `count` most updated gates as (name, updates, changes)."""
+    hot = sorted(self.gate_updates.items(), key=lambda item: (-item[1], item[0]))[:count]
+    return [(name, n, self.gate_changes.get(name, 0)) for (name, n) in hot]
+
+  def HotWires(self, count=10):
+    """The `count` most updated wires as (name, updates, fanout)."""
+    hot = sorted(self.wire_updates.items(), key=lambda item: (-item[1], item[0]))[:count]
+    return [(name, n, self.wire_fanout[name]) for (name, n) in hot]
+
+  def Table(self, count=10):
+    lines = ['%-24s %10s %10s' % ('gate', 'updates', 'changes')]
+    for (name, n, changes) in self.HotGates(count):
+      lines.append('%-24s %10d %10d' % (name, n, changes))
+    lines.append('')
+    lines.append('%-24s %10s %10s' % ('class', 'updates', 'changes'))
+    for (name, n) in self.class_updates.most_common(count):
+      lines.append('%-24s %10d %10d' % (name, n, self.class_changes[name]))
+    lines.append('')
+    lines.append('%-24s %10s %10s' % ('wire', 'updates', 'fanout'))
+    for (name, n, fanout) in self.HotWires(count):
+      lines.append('%-24s %10d %10d' % (name, n, fanout))
+    return '\n'.join(lines) + '\n'
+
+  def __str__(self):
+    updates = self.Updates()
+    return '%s<updates: %d, changes: %d, no-ops: %d, wire updates: %d>' % (
+        type(self).__name__, updates, self.Changes(), updates - self.Changes(),
+        sum(self.wire_updates.values()))
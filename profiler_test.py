@@ -0,0 +1,106 @@
+from profiler import *
+import gates
+import unittest
+
+
+class TestProfiler(unittest.TestCase):
+  def setupChain(self, length):
+    self.writer = ConnectionPoint(ConnectionPoint.WRITER)
+    self.wires = [Wire() for i in range(length + 1)]
+    self.wires[0].Connect(self.writer)
+    self.gates = []
+    for i in range(length):
+      self.gates.append(GateNegate())
+      self.gates[-1].SetInputWire(self.wires[i])
+      self.gates[-1].SetOutputWire(self.wires[i + 1])
+
+  def testChain(self):
+    self.setupChain(10)
+    profiler = Profiler()
+    self.addCleanup(profiler.Detach)
+    profiler.Attach([self.wires[0]])
+    self.assertEqual('ProfiledGateNegate', type(self.gates[0]).__name__)
+    self.writer.SetStateWrite(PLUS)
+    self.writer.SetStateWrite(MINUS)
+    report = profiler.Report()
+    self.assertEqual(20, report.Updates())
+    self.assertEqual(20, report.Changes())
+    self.assertEqual({'GateNegate': 20}, dict(report.class_updates))
+    self.assertEqual({10: 2}, report.settle_depths)
+    self.assertEqual({1: 20, 0: 2}, report.fanout)
+    self.assertEqual(('GateNegate#0', 2, 2), report.HotGates(1)[0])
+
+    profiler.Detach()
+    self.assertEqual([GateNegate] * 10, [type(gate) for gate in self.gates])
+    self.assertEqual([Wire] * 11, [type(wire) for wire in self.wires])
+    self.assertEqual({}, PROFILED)
+
+  def testNoOps(self):
+    gate = GateAnd()
+    (low, other) = (ConnectionPoint(ConnectionPoint.WRITER), ConnectionPoint(ConnectionPoint.WRITER))
+    wires = [Wire(), Wire(), Wire()]
+    wires[0].Connect(low)
+    wires[1].Connect(other)
+    gate.SetInputWire1(wires[0])
+    gate.SetInputWire2(wires[1])
+    gate.SetOutputWire(wires[2])
+    low.SetStateWrite(MINUS)
+
+    profiler = Profiler()
+    self.addCleanup(profiler.Detach)
+    profiler.Attach(wires[:1])
+    for state in [PLUS, NEUTRAL, MINUS, PLUS]:
+      other.SetStateWrite(state)
+    report = profiler.Report()
+    self.assertEqual(({'GateAnd#0': 4}, {}), (report.gate_updates, report.gate_changes))
+    self.assertEqual({1: 4}, report.settle_depths)
+    self.assertIn('no-ops: 4', str(report))
+
+  def testWorklist_CountsDeltas(self):
+    worklist_enabled = gates.WORKLIST_ENABLED
+    gates.WORKLIST_ENABLED = True
+    try:
+      self.setupChain(5)
+      profiler = Profiler()
+      self.addCleanup(profiler.Detach)
+      profiler.Attach([self.wires[0]])
+      self.writer.SetStateWrite(PLUS)
+      self.assertEqual({5: 1}, profiler.Report().settle_deltas)
+      self.assertEqual(PLUS * (-1) ** 5, self.wires[5].Driver().GetState())
+      profiler.Detach()
+      self.assertIs(Worklist, type(gates.WORKLIST))
+    finally:
+      gates.WORKLIST_ENABLED = worklist_enabled
+
+  def testTable(self):
+    self.setupChain(2)
+    profiler = Profiler()
+    self.addCleanup(profiler.Detach)
+    profiler.Attach([self.wires[0]])
+    self.writer.SetStateWrite(PLUS)
+    self.assertEqual(
+        'gate                        updates    changes\n'
+        'GateNegate#0                      1          1\n'
+        'GateNegate#1                      1          1\n'
+        '\n'
+        'class                       updates    changes\n'
+        'GateNegate                        2          2\n'
+        '\n'
+        'wire                        updates     fanout\n'
+        'Wire#0                            1          1\n'
+        'Wire#1                            1          1\n'
+        'Wire#2                            1          0\n',
+        profiler.Report().Table())
+
+  def testAttachTwice_Raises(self):
+    self.setupChain(1)
+    profiler = Profiler()
+    self.addCleanup(profiler.Detach)
+    profiler.Attach([self.wires[0]])
+    with self.assertRaises(ConnectionError):
+      Profiler().Attach([self.wires[0]])
+    self.assertEqual(set([profiler]), set(PROFILED.values()))
+
+
+if __name__ == '__main__':
+  unittest.main()
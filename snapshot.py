@@ -0,0 +1,104 @@
+import array
+import copy
+
+from circuit import *
+
+
+class Checkpoint:
+  """
+  The state of every connection point reachable from some wires, and of any
+  clocks, in one immutable buffer: a byte per point, padded to 8 bytes, then
+  each clock's position and tick count. Any number of scenarios can be
+  restored from the same checkpoint, and forked processes share it
+  copy-on-write.
+
+  Controllers holding state outside their points, like TernaryMemory, provide
+  SaveState returning it as an immutable value and LoadState taking it back;
+  those values are kept beside the buffer.
+
+  Writes still pending on a Scheduler are not captured, so checkpoints should
+  be taken with the circuit settled.
+  """
+  def __init__(self, points, clocks, data, blocks=()):
+    self._points = points
+    self._clocks = clocks
+    self.data = data
+    self.blocks = blocks
+
+  def PointCount(self):
+    return len(self._points)
+
+  def Restore(self):
+    """
+    Puts every point, clock and controller state back as captured, without
+    propagating.
+    """
+    count = len(self._points)
+    view = memoryview(self.data)
+    for (point, state) in zip(self._points, view[:count].cast('b')):
+      point._state = state
+    clock_view = view[_Padded(count):].cast('q')
+    for (i, clock) in enumerate(self._clocks):
+      clock._idx = clock_view[2 * i]
+      clock._ticks = clock_view[2 * i + 1]
+    for (controller, state) in self.blocks:
+      controller.LoadState(state)
+
+  def __str__(self):
+    return '%s<%d points, %d clocks>' % (type(self).__name__, len(self._points), len(self._clocks))
+
+
+def Snapshot(wires, clocks=()):
+  """
+  Captures the state reachable from `wires`. Oscillators have no controller on
+  their output, so clocks are listed separately.
+  """
+  points = ReachablePoints(wires)
+  if points is None:
+    raise ConnectionError('A gate does not list its ConnectionPoints')
+  return Capture(points, clocks)
+
+def Capture(points, clocks=()):
+  """Captures a known list of points, skipping the walk from the wires."""
+  data = array.array('b', [point._state for point in points]).tobytes()
+  data += bytes(_Padded(len(data)) - len(data))
+  counters = array.array('q')
+  for clock in clocks:
+    counters.extend((clock._idx, clock._ticks))
+  return Checkpoint(points, tuple(clocks), data + counters.tobytes(), _SaveStates(points))
+
+def _SaveStates(points):
+  """(controller, SaveState()) for each controller of `points` providing it."""
+  controllers = {}
+  for point in points:
+    if hasattr(point._controller, 'SaveState'):
+      controllers[point._controller] = None
+  return tuple((controller, controller.SaveState()) for controller in controllers)
+
+def Restore(checkpoint):
+  checkpoint.Restore()
+
+def _Padded(size):
+  return (size + 7) // 8 * 8
+
+
+def SnapshotCircuit(circuit):
+  """The wire states of a compiled Circuit as immutable bytes."""
+  return array.array('b', circuit.state).tobytes()
+
+def RestoreCircuit(circuit, data):
+  if len(data) != circuit.wire_count:
+    raise ConnectionError('Expected %d wire states, got %d' % (circuit.wire_count, len(data)))
+  circuit.state = memoryview(data).cast('b').tolist()
+
+def ForkCircuit(circuit, data=None):
+  """
+  A Circuit sharing the tables and cells of `circuit`, with its own state taken
+  from a snapshot, or from `circuit` itself.
+  """
+  fork = copy.copy(circuit)
+  if data is None:
+    fork.state = list(circuit.state)
+  else:
+    RestoreCircuit(fork, data)
+  return fork
@@ -0,0 +1,127 @@
+from snapshot import *
+from macro import Memoize
+from memory import TernaryMemory
+import unittest
+
+
+class TestSnapshot(unittest.TestCase):
+  def setupTryte(self):
+    tryte = Tryte()
+    self.inputs = [ConnectionPoint(ConnectionPoint.WRITER) for i in range(9)]
+    self.outputs = [ConnectionPoint(ConnectionPoint.READER) for i in range(9)]
+    self.read = ConnectionPoint(ConnectionPoint.WRITER)
+    wires = []
+    for (i, (writer, reader)) in enumerate(zip(self.inputs, self.outputs)):
+      wires.append(Wire())
+      wires[-1].Connect(writer)
+      tryte.SetInputWireAt(i, wires[-1])
+      wires.append(Wire())
+      wires[-1].Connect(reader)
+      tryte.SetOutputWireAt(i, wires[-1])
+    wires.append(Wire())
+    wires[-1].Connect(self.read)
+    tryte.SetReadWire(wires[-1])
+    return wires
+
+  def store(self, values):
+    for (writer, value) in zip(self.inputs, values):
+      writer.SetStateWrite(value)
+    self.read.SetStateWrite(PLUS)
+    self.read.SetStateWrite(NEUTRAL)
+
+  def outputStates(self):
+    return [reader.GetState() for reader in self.outputs]
+
+  def testRestore(self):
+    wires = self.setupTryte()
+    stored = [PLUS, MINUS, NEUTRAL] * 3
+    self.store(stored)
+    checkpoint = Snapshot(wires)
+    self.assertEqual(stored, self.outputStates())
+
+    for scenario in ([MINUS] * 9, [PLUS] * 9):
+      self.store(scenario)
+      self.assertEqual(scenario, self.outputStates())
+      checkpoint.Restore()
+      self.assertEqual(stored, self.outputStates())
+      self.assertEqual(stored, [writer.GetState() for writer in self.inputs])
+
+    # The Tryte still works from the restored state.
+    self.read.SetStateWrite(MINUS)
+    self.assertEqual([-value for value in stored], self.outputStates())
+
+  def testCapture_IsImmutable(self):
+    wires = self.setupTryte()
+    checkpoint = Snapshot(wires)
+    self.assertIsInstance(checkpoint.data, bytes)
+    data = checkpoint.data
+    self.store([PLUS] * 9)
+    self.assertEqual(data, checkpoint.data)
+    self.assertEqual(Snapshot(wires).data, Capture(checkpoint._points).data)
+    self.assertNotEqual(data, Snapshot(wires).data)
+
+  def testClock(self):
+    clock = Oscillator(timer=None)
+    clock.SetOutputWire(Wire())
+    clock.RunCycles(1)
+    checkpoint = Snapshot([clock._output._wire], [clock])
+    clock.Tick()
+    clock.Tick()
+    Restore(checkpoint)
+    self.assertEqual((1, 5), (clock._idx, clock.Ticks()))
+    self.assertEqual(NEUTRAL, clock.ReadOutput())
+
+  def testMemory_RestoresWords(self):
+    memory = TernaryMemory(9, width=3)
+    (address, data, write) = ([Wire(), Wire()], [Wire() for i in range(3)], Wire())
+    memory.SetAddressWires(address)
+    memory.SetInputWires(data)
+    memory.SetWriteWire(write)
+    memory.Write(4, [PLUS, MINUS, NEUTRAL])
+    checkpoint = Snapshot(address)
+    memory.Write(4, [MINUS] * 3)
+    memory.Write(0, [PLUS] * 3)
+    checkpoint.Restore()
+    self.assertEqual([PLUS, MINUS, NEUTRAL], memory.Read(4))
+    self.assertEqual([NEUTRAL] * 3, memory.Read(0))
+    self.assertEqual(1, len(checkpoint.blocks))
+
+  def testMacroCell_RestoresHeldValues(self):
+    macro = Memoize(GateMem())
+    (data, enable, output) = (ConnectionPoint(ConnectionPoint.WRITER),
+        ConnectionPoint(ConnectionPoint.WRITER), ConnectionPoint(ConnectionPoint.READER))
+    wires = [Wire(), Wire(), Wire()]
+    for (wire, point) in zip(wires, (data, enable, output)):
+      wire.Connect(point)
+    macro.SetInputWire1(wires[0])
+    macro.SetInputWire2(wires[1])
+    macro.SetOutputWire(wires[2])
+    data.SetStateWrite(PLUS)
+    enable.SetStateWrite(PLUS)
+    enable.SetStateWrite(NEUTRAL)
+    checkpoint = Snapshot(wires)
+    enable.SetStateWrite(MINUS)
+    enable.SetStateWrite(NEUTRAL)
+    self.assertEqual(MINUS, output.GetState())
+    checkpoint.Restore()
+    data.SetStateWrite(MINUS)
+    self.assertEqual(PLUS, output.GetState())
+
+  def testCircuit_Fork(self):
+    circuit = CompileGate(GateMem())
+    circuit.Step((PLUS, PLUS))
+    data = SnapshotCircuit(circuit)
+    forks = [ForkCircuit(circuit, data) for i in range(3)]
+    forks[0].Step((MINUS, PLUS))
+    forks[1].Step((MINUS, MINUS))
+    self.assertEqual([(MINUS,), (PLUS,), (PLUS,), (PLUS,)],
+        [c.ReadOutputs() for c in forks + [circuit]])
+    RestoreCircuit(forks[0], data)
+    self.assertEqual((PLUS,), forks[0].ReadOutputs())
+    self.assertIs(circuit.cell_inputs, forks[0].cell_inputs)
+    with self.assertRaises(ConnectionError):
+      RestoreCircuit(circuit, data[1:])
+
+
+if __name__ == '__main__':
+  unittest.main()
@@ -0,0 +1,234 @@
+import array
+import struct
+import sys
+
+import gates
+from gates import *
+
+# Traced wires and the (tracer, index) recording them. Only wires in here
+# have their class swapped by _TracedClass, so untraced wires cost nothing.
+TRACED = {}
+_TRACED_CLASSES = {}
+
+
+def _TracedClass(cls):
+  """A subclass of the Wire class `cls` with no new slots, reporting the state
+  of its driver to its Tracer on every update."""
+  if cls not in _TRACED_CLASSES:
+    original = cls.Update
+    def Update(self):
+      driver = self._driver
+      if driver is not None:
+        (tracer, idx) = TRACED[self]
+        tracer.Record(idx, driver._state)
+      original(self)
+    _TRACED_CLASSES[cls] = type('Traced' + cls.__name__, (cls,),
+        {'__slots__': (), 'Update': Update, '__module__': __name__,
+         '_hook_layer': 'Tracer', '_hook_build': staticmethod(_TracedClass)})
+  return _TRACED_CLASSES[cls]
+
+TracedWire = _TracedClass(Wire)
+
+
+class Tracer:
+  """
+  Records the transitions of selected wires in a ring buffer of `capacity`
+  entries. With a `sink` (a VcdWriter or BinaryWriter) the buffer is written out
+  a block at a time whenever it fills, so long runs stream in constant memory;
+  without one the latest `capacity` transitions are kept.
+
+  Times come from `clock`, which defaults to the simulated time of
+  gates.SCHEDULER, divided by `timescale` seconds.
+  """
+  def __init__(self, capacity=1 << 16, sink=None, clock=None, timescale=1e-9):
+    self._capacity = capacity
+    self._sink = sink
+    self._clock = clock or (lambda: gates.SCHEDULER.Now())
+    self._timescale = timescale
+    self._times = array.array('q', bytes(8 * capacity))
+    self._ids = array.array('i', bytes(4 * capacity))
+    self._states = array.array('b', bytes(capacity))
+    self._next = 0
+    self._wrapped = False
+    self._started = False
+    self._wires = []
+    self._names = []
+    self._last = array.array('b')
+
+  def Trace(self, wire, name=None):
+    """Starts recording `wire`, beginning with its current state."""
+    if wire in TRACED:
+      raise ConnectionError('%s is already traced' % wire)
+    if self._started:
+      raise ConnectionError('Cannot trace more wires once the trace is written')
+    idx = len(self._wires)
+    self._wires.append(wire)
+    self._names.append(name or 'w%d' % idx)
+    # Not a state, so the first record always goes in.
+    self._last.append(2)
+    TRACED[wire] = (self, idx)
+    # Built on the current class, so a wire being profiled stays profiled.
+    wire.__class__ = _TracedClass(type(wire))
+    driver = wire.Driver()
+    self.Record(idx, driver and driver.GetState() or NEUTRAL)
+    return idx
+
+  def Untrace(self, wire):
+    if TRACED.get(wire, (None,))[0] is not self:
+      raise ConnectionError('%s is not traced here' % wire)
+    del TRACED[wire]
+    Unhook(wire, 'Tracer')
+
+  def Names(self):
+    return list(self._names)
+
+  def Now(self):
+    return int(round(self._clock() / self._timescale))
+
+  def Record(self, idx, state):
+    if self._last[idx] == state:
+      return
+    self._last[idx] = state
+    pos = self._next
+    self._times[pos] = self.Now()
+    self._ids[pos] = idx
+    self._states[pos] = state
+    pos += 1
+    if pos == self._capacity:
+      if self._sink:
+        self._Write(pos)
+      self._wrapped = True
+      pos = 0
+    self._next = pos
+
+  def Transitions(self):
+    """The buffered (time, name, state) transitions, oldest first."""
+    order = list(range(self._next))
+    if self._wrapped and not self._sink:
+      order = list(range(self._next, self._capacity)) + order
+    return [(self._times[i], self._names[self._ids[i]], self._states[i]) for i in order]
+
+  def Flush(self):
+    """Writes out whatever is buffered."""
+    if self._sink and (self._next or not self._started):
+      self._Write(self._next)
+      self._next = 0
+
+  def Close(self):
+    """Flushes, restores every traced wire and closes the sink."""
+    self.Flush()
+    for wire in self._wires:
+      if TRACED.get(wire, (None,))[0] is self:
+        self.Untrace(wire)
+    if self._sink:
+      self._sink.Close()
+
+  def _Write(self, count):
+    if not self._started:
+      self._sink.Header(self._names, self._timescale)
+      self._started = True
+    self._sink.Write(self._times, self._ids, self._states, count)
+
+  def __str__(self):
+    return '%s<%d wires, %d buffered>' % (type(self).__name__, len(self._wires),
+        self._wrapped and not self._sink and self._capacity or self._next)
+
+
+TIMESCALES = {1: '1s', 1e-3: '1ms', 1e-6: '1us', 1e-9: '1ns', 1e-12: '1ps', 1e-15: '1fs'}
+# Trits as 2 bit two's complement vectors.
+VCD_VALUES = {PLUS: 'b01', NEUTRAL: 'b00', MINUS: 'b11'}
+
+
+class VcdWriter:
+  """Writes a trace as a Value Change Dump, one 2 bit vector per wire."""
+  def __init__(self, f, module='ternary'):
+    self._file = f
+    self._module = module
+    self._codes = []
+    self._time = None
+
+  def Header(self, names, timescale):
+    if timescale not in TIMESCALES:
+      raise ValueError('VCD timescale must be one of %s' % sorted(TIMESCALES))
+    lines = ['$timescale %s $end' % TIMESCALES[timescale], '$scope module %s $end' % self._module]
+    for (i, name) in enumerate(names):
+      self._codes.append(_VcdCode(i))
+      lines.append('$var wire 2 %s %s $end' % (self._codes[i], name))
+    lines.extend(['$upscope $end', '$enddefinitions $end', ''])
+    self._file.write('\n'.join(lines))
+
+  def Write(self, times, ids, states, count):
+    lines = []
+    codes = self._codes
+    for i in range(count):
+      if times[i] != self._time:
+        self._time = times[i]
+        lines.append('#%d' % self._time)
+      lines.append('%s %s' % (VCD_VALUES[states[i]], codes[ids[i]]))
+    lines.append('')
+    self._file.write('\n'.join(lines))
+
+  def Close(self):
+    self._file.close()
+
+def _VcdCode(idx):
+  # Identifiers are made of the 94 printable ASCII characters.
+  code = chr(33 + idx % 94)
+  while idx >= 94:
+    idx = idx // 94 - 1
+    code = chr(33 + idx % 94) + code
+  return code
+
+
+BINARY_MAGIC = b'TTRC'
+BINARY_VERSION = 1
+_BINARY_HEADER = struct.Struct('<4sHdI')
+_BINARY_BLOCK = struct.Struct('<I')
+
+
+class BinaryWriter:
+  """
+  Writes a trace compactly: a header with the wire names, then blocks of
+  little-endian times, wire indexes and trit states.
+  """
+  def __init__(self, f):
+    self._file = f
+
+  def Header(self, names, timescale):
+    data = '\n'.join(names).encode('utf-8')
+    self._file.write(_BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, timescale, len(data)) + data)
+
+  def Write(self, times, ids, states, count):
+    self._file.write(_BINARY_BLOCK.pack(count))
+    for column in (times, ids, states):
+      block = column[:count]
+      if sys.byteorder != 'little':
+        block.byteswap()
+      self._file.write(block.tobytes())
+
+  def Close(self):
+    self._file.close()
+
+
+def ReadBinary(f):
+  """Reads a BinaryWriter trace. Returns the names, timescale and a list of
+  (time, name, state) transitions."""
+  (magic, version, timescale, size) = _BINARY_HEADER.unpack(f.read(_BINARY_HEADER.size))
+  if magic != BINARY_MAGIC or version != BINARY_VERSION:
+    raise ValueError('Not a version %d trace' % BINARY_VERSION)
+  names = f.read(size).decode('utf-8').split('\n')
+  transitions = []
+  while True:
+    header = f.read(_BINARY_BLOCK.size)
+    if not header:
+      break
+    (count,) = _BINARY_BLOCK.unpack(header)
+    columns = []
+    for code in 'qib':
+      column = array.array(code)
+      column.frombytes(f.read(count * column.itemsize))
+      if sys.byteorder != 'little':
+        column.byteswap()
+      columns.append(column)
+    transitions.extend((t, names[i], s) for (t, i, s) in zip(*columns))
+  return names, timescale, transitions
@@ -0,0 +1,180 @@
+from tracer import *
+from profiler import PROFILED, Profiler
+import gates
+import io
+import unittest
+
+
+class TestTracer(unittest.TestCase):
+  def setUp(self):
+    self.delay_enabled = gates.DELAY_ENABLED
+    self.scheduler = gates.SCHEDULER
+    gates.DELAY_ENABLED = True
+    gates.SCHEDULER = Scheduler()
+
+  def tearDown(self):
+    gates.DELAY_ENABLED = self.delay_enabled
+    gates.SCHEDULER = self.scheduler
+
+  def setupChain(self):
+    """A writer driving two GateNegates, each with a delay of 2."""
+    self.writer = ConnectionPoint(ConnectionPoint.WRITER)
+    self.wires = [Wire() for i in range(3)]
+    self.wires[0].Connect(self.writer)
+    for i in range(2):
+      gate = GateNegate()
+      gate.SetDelay(2)
+      gate.SetInputWire(self.wires[i])
+      gate.SetOutputWire(self.wires[i + 1])
+
+  def testTransitions(self):
+    self.setupChain()
+    tracer = Tracer(clock=gates.SCHEDULER.Now, timescale=1)
+    for (i, wire) in enumerate(self.wires):
+      tracer.Trace(wire, 'n%d' % i)
+    self.assertIs(TracedWire, type(self.wires[0]))
+    self.writer.SetStateWrite(PLUS)
+    gates.SCHEDULER.Run()
+    self.writer.SetStateWrite(PLUS)
+    self.writer.SetStateWrite(MINUS)
+    gates.SCHEDULER.Run()
+    self.assertEqual([
+        (0, 'n0', NEUTRAL), (0, 'n1', NEUTRAL), (0, 'n2', NEUTRAL),
+        (0, 'n0', PLUS), (2, 'n1', MINUS), (4, 'n2', PLUS),
+        (4, 'n0', MINUS), (6, 'n1', PLUS), (8, 'n2', MINUS)],
+        tracer.Transitions())
+
+    tracer.Close()
+    self.assertEqual([Wire] * 3, [type(wire) for wire in self.wires])
+    self.assertEqual({}, TRACED)
+
+  def testProfiled_BothCount(self):
+    gates.DELAY_ENABLED = False
+    self.setupChain()
+    profiler = Profiler()
+    self.addCleanup(profiler.Detach)
+    profiler.Attach([self.wires[0]])
+    profiled = type(self.wires[1])
+    tracer = Tracer(clock=gates.SCHEDULER.Now, timescale=1)
+    tracer.Trace(self.wires[1], 'n1')
+    self.assertIsInstance(self.wires[1], profiled)
+    self.writer.SetStateWrite(PLUS)
+    self.assertEqual([(0, 'n1', NEUTRAL), (0, 'n1', MINUS)], tracer.Transitions())
+    self.assertEqual(1, profiler.wire_updates[self.wires[1]])
+
+    tracer.Close()
+    self.assertIs(profiled, type(self.wires[1]))
+    self.writer.SetStateWrite(MINUS)
+    self.assertEqual(2, profiler.wire_updates[self.wires[1]])
+    profiler.Detach()
+    self.assertEqual([Wire] * 3, [type(wire) for wire in self.wires])
+
+  def testHooks_RemovedInAnyOrder(self):
+    gates.DELAY_ENABLED = False
+    self.setupChain()
+    profiler = Profiler()
+    self.addCleanup(profiler.Detach)
+    profiler.Attach([self.wires[0]])
+    tracer = Tracer(clock=gates.SCHEDULER.Now, timescale=1)
+    tracer.Trace(self.wires[1], 'n1')
+    profiler.Detach()
+    self.assertIs(TracedWire, type(self.wires[1]))
+    self.writer.SetStateWrite(PLUS)
+    self.assertEqual([(0, 'n1', NEUTRAL), (0, 'n1', MINUS)], tracer.Transitions())
+    self.assertEqual({}, PROFILED)
+    tracer.Close()
+    self.assertEqual([Wire] * 3, [type(wire) for wire in self.wires])
+
+    tracer = Tracer(clock=gates.SCHEDULER.Now, timescale=1)
+    tracer.Trace(self.wires[1], 'n1')
+    profiler = Profiler()
+    self.addCleanup(profiler.Detach)
+    profiler.Attach([self.wires[0]])
+    tracer.Close()
+    self.assertEqual('ProfiledWire', type(self.wires[1]).__name__)
+    self.writer.SetStateWrite(MINUS)
+    self.assertEqual(1, profiler.wire_updates[self.wires[1]])
+    profiler.Detach()
+    self.assertEqual([Wire] * 3, [type(wire) for wire in self.wires])
+
+  def testRingBuffer_KeepsLatest(self):
+    self.setupChain()
+    tracer = Tracer(capacity=4, clock=gates.SCHEDULER.Now, timescale=1)
+    tracer.Trace(self.wires[2])
+    for state in [PLUS, MINUS, PLUS, MINUS, PLUS]:
+      self.writer.SetStateWrite(state)
+      gates.SCHEDULER.Run()
+    self.assertEqual([(8, MINUS), (12, PLUS), (16, MINUS), (20, PLUS)],
+        [(t[0], t[2]) for t in tracer.Transitions()])
+    tracer.Close()
+
+  def testVcd_StreamsBlocks(self):
+    self.setupChain()
+    out = io.StringIO()
+    out.close = lambda: None
+    tracer = Tracer(capacity=2, sink=VcdWriter(out),
+        clock=lambda: gates.SCHEDULER.Now() * 1e-9, timescale=1e-9)
+    tracer.Trace(self.wires[0], 'in')
+    tracer.Trace(self.wires[2], 'out')
+    self.writer.SetStateWrite(MINUS)
+    gates.SCHEDULER.Run()
+    self.assertEqual(0, tracer._next)
+    tracer.Close()
+    self.assertEqual(
+        '$timescale 1ns $end\n'
+        '$scope module ternary $end\n'
+        '$var wire 2 ! in $end\n'
+        '$var wire 2 " out $end\n'
+        '$upscope $end\n'
+        '$enddefinitions $end\n'
+        '#0\n'
+        'b00 !\n'
+        'b00 "\n'
+        'b11 !\n'
+        '#4\n'
+        'b11 "\n',
+        out.getvalue())
+
+  def testBinary_RoundTrip(self):
+    self.setupChain()
+    out = io.BytesIO()
+    out.close = lambda: None
+    tracer = Tracer(capacity=3, sink=BinaryWriter(out), clock=gates.SCHEDULER.Now, timescale=1)
+    tracer.Trace(self.wires[1], 'mid')
+    for state in [PLUS, MINUS, NEUTRAL, PLUS]:
+      self.writer.SetStateWrite(state)
+      gates.SCHEDULER.Run()
+    tracer.Close()
+    out.seek(0)
+    (names, timescale, transitions) = ReadBinary(out)
+    self.assertEqual((['mid'], 1), (names, timescale))
+    self.assertEqual([(0, 'mid', NEUTRAL), (2, 'mid', MINUS), (6, 'mid', PLUS),
+        (10, 'mid', NEUTRAL), (14, 'mid', MINUS)], transitions)
+
+  def testOscillator_TickClock(self):
+    gates.DELAY_ENABLED = False
+    clock = Oscillator(timer=None)
+    wire = Wire()
+    clock.SetOutputWire(wire)
+    tracer = Tracer(clock=clock.Ticks, timescale=1)
+    tracer.Trace(wire, 'clk')
+    clock.RunCycles(2)
+    # A tick is written before it is counted.
+    self.assertEqual([(1, 'clk', NEUTRAL), (1, 'clk', PLUS), (2, 'clk', NEUTRAL),
+        (3, 'clk', MINUS), (4, 'clk', NEUTRAL), (5, 'clk', PLUS), (6, 'clk', NEUTRAL),
+        (7, 'clk', MINUS), (8, 'clk', NEUTRAL)], tracer.Transitions())
+    tracer.Close()
+
+  def testTraceTwice_Raises(self):
+    wire = Wire()
+    tracer = Tracer()
+    tracer.Trace(wire)
+    with self.assertRaises(ConnectionError):
+      Tracer().Trace(wire)
+    with self.assertRaises(ConnectionError):
+      Tracer().Untrace(wire)
+    tracer.Close()
+
+
+if __name__ == '__main__':
+  unittest.main()